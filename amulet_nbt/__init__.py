@@ -15,6 +15,17 @@ try:
         NBTFile,
         load,
         from_snbt,
+        from_snbt_stream,
+        compile_snbt,
+        diff,
+        patch,
+        patch_inplace,
+        FrozenTag,
+        InternPool,
+        Limits,
+        RawTag,
+        Template,
+        SNBTTemplate,
         BaseValueType,
         BaseArrayType,
         AnyNBT,
@@ -22,6 +33,7 @@ try:
         NBTError,
         NBTLoadError,
         NBTFormatError,
+        NBTLimitError,
         SNBTParseError,
     )
 except (ImportError, ModuleNotFoundError) as e:
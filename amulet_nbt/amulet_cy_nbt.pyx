@@ -1,13 +1,31 @@
 import gzip
 from math import trunc, floor, ceil
 import zlib
+from collections import OrderedDict
 from collections.abc import MutableMapping, MutableSequence
 from io import BytesIO
-from typing import Optional, Union, Tuple, List, Iterator, BinaryIO
+import hashlib
+import operator
+from functools import partial, lru_cache
+from typing import Optional, Union, Tuple, List, Iterator, Iterable, Sequence, BinaryIO
 
 import numpy
 import os
+cimport cython
 from cpython cimport PyUnicode_DecodeUTF8, PyList_Append, PyBytes_FromStringAndSize
+from cpython.object cimport PyObject
+from cpython.dict cimport PyDict_GetItem, PyDict_Next
+from cpython.list cimport PyList_GET_ITEM
+from cpython.buffer cimport PyObject_GetBuffer, PyBuffer_Release, PyBUF_SIMPLE, PyBUF_WRITABLE
+from libc.string cimport memset, memcpy, memcmp
+from libc.stdlib cimport malloc, realloc, free, atoi
+from libc.math cimport isinf, isnan
+from cpython.conversion cimport PyOS_double_to_string, PyOS_string_to_double
+from cpython.mem cimport PyMem_Free
+
+cdef extern from "Python.h":
+    const char *PyUnicode_AsUTF8AndSize(object unicode, Py_ssize_t *size) except NULL
+    const Py_ssize_t PY_SSIZE_T_MAX
 
 import re
 
@@ -25,6 +43,15 @@ cdef char _ID_COMPOUND = 10
 cdef char _ID_INT_ARRAY = 11
 cdef char _ID_LONG_ARRAY = 12
 cdef char _ID_MAX = 13
+# what fast_tag_id returns for a RawTag. It is never written.
+cdef char _ID_RAW = 100
+# how many lists and compounds may be nested in each other by default
+cdef Py_ssize_t _MAX_DEPTH = 512
+
+
+cdef inline bint is_mutable(char tag_id):
+    """Arrays and containers must be copied. Every other tag is immutable."""
+    return tag_id == _ID_BYTE_ARRAY or tag_id == _ID_LIST or tag_id == _ID_COMPOUND or tag_id == _ID_INT_ARRAY or tag_id == _ID_LONG_ARRAY
 
 ID_END = _ID_END
 ID_BYTE = _ID_BYTE
@@ -58,7 +85,21 @@ cdef dict TAG_CLASSES = {
     _ID_LONG_ARRAY: TAG_Long_Array
 }
 
-_NON_QUOTED_KEY = re.compile(r"^[a-zA-Z0-9-]+$")
+cdef tuple TAG_NAMES = (
+    "TAG_End",
+    "TAG_Byte",
+    "TAG_Short",
+    "TAG_Int",
+    "TAG_Long",
+    "TAG_Float",
+    "TAG_Double",
+    "TAG_Byte_Array",
+    "TAG_String",
+    "TAG_List",
+    "TAG_Compound",
+    "TAG_Int_Array",
+    "TAG_Long_Array",
+)
 
 AnyNBT = Union[
     'TAG_Byte',
@@ -76,8 +117,7 @@ AnyNBT = Union[
 ]
 
 SNBTType = str
-cdef str CommaNewline = ",\n"
-cdef str CommaSpace = ", "
+cdef object _MISSING = object()
 
 
 class NBTError(Exception):
@@ -94,6 +134,11 @@ class NBTFormatError(NBTLoadError):
     pass
 
 
+class NBTLimitError(NBTFormatError):
+    """Indicates the NBT is larger than a limit set when loading it."""
+    pass
+
+
 class SNBTParseError(NBTError):
     """Indicates the SNBT format is invalid."""
     pass
@@ -103,6 +148,34 @@ cdef class buffer_context:
     cdef size_t offset
     cdef char *buffer
     cdef size_t size
+    # shares identical subtrees while loading if set
+    cdef InternPool pool
+    # the raw paths below the compound being loaded. See raw_path_tree
+    cdef dict raw_paths
+    # the number of lists and compounds that may be nested in each other
+    cdef Py_ssize_t max_depth
+    # the number of tags that may still be created and the limit it started at
+    cdef Py_ssize_t nodes
+    cdef Py_ssize_t max_nodes
+    # the number of elements an array may have
+    cdef Py_ssize_t max_array_len
+
+    def __cinit__(self):
+        self.max_depth = _MAX_DEPTH
+        self.nodes = self.max_nodes = PY_SSIZE_T_MAX
+        self.max_array_len = PY_SSIZE_T_MAX
+
+cdef inline int use_nodes(buffer_context context, Py_ssize_t count) except -1:
+    """Count tags against the limit before they are created."""
+    context.nodes -= count
+    if context.nodes < 0:
+        raise NBTLimitError(f"NBT has more than the maximum of {context.max_nodes:d} tags")
+    return 0
+
+cdef inline int check_array_length(buffer_context context, int length) except -1:
+    if length > context.max_array_len:
+        raise NBTLimitError(f"NBT array has {length:d} elements. The maximum is {context.max_array_len:d}")
+    return 0
 
 cdef char *read_data(buffer_context context, size_t tag_size) except NULL:
     if tag_size > context.size - context.offset:
@@ -131,12 +204,15 @@ cdef str load_name(buffer_context context, bint little_endian):
 
     return PyUnicode_DecodeUTF8(b, length, "strict")
 
-cdef tuple load_named(buffer_context context, char tagID, bint little_endian):
-    cdef str name = load_name(context, little_endian)
-    cdef _TAG_Value tag = load_tag(tagID, context, little_endian)
-    return name, tag
-
 cdef _TAG_Value load_tag(char tagID, buffer_context context, bint little_endian):
+    if context.pool is not None and tagID >= _ID_BYTE_ARRAY and context.raw_paths is None:
+        return load_interned(tagID, context, little_endian)
+    if tagID == _ID_LIST or tagID == _ID_COMPOUND:
+        return load_container(tagID, context, little_endian, None)
+    return load_leaf(tagID, context, little_endian)
+
+cdef _TAG_Value load_leaf(char tagID, buffer_context context, bint little_endian):
+    """Load a tag that is not a list or compound."""
     if tagID == _ID_BYTE:
         return load_byte(context, little_endian)
 
@@ -161,25 +237,433 @@ cdef _TAG_Value load_tag(char tagID, buffer_context context, bint little_endian)
     if tagID == _ID_STRING:
         return TAG_String(load_string(context, little_endian))
 
-    if tagID == _ID_LIST:
-        return load_list(context, little_endian)
-
-    if tagID == _ID_COMPOUND:
-        return load_compound_tag(context, little_endian)
-
     if tagID == _ID_INT_ARRAY:
         return load_int_array(context, little_endian)
 
     if tagID == _ID_LONG_ARRAY:
         return load_long_array(context, little_endian)
 
-cpdef bytes safe_gunzip(bytes data):
-    if data[:2] == b'\x1f\x8b':  # if the first two bytes are this it should be gzipped
-        try:
-            data = gzip.GzipFile(fileobj=BytesIO(data)).read()
-        except (IOError, zlib.error) as e:
-            pass
-    return data
+    raise NBTFormatError(f"Unknown tag id {tagID}")
+
+cdef object pool_lookup(char tagID, buffer_context context, bint little_endian):
+    """Find the end of the tag without decoding it so that a repeated subtree is only decoded once.
+    Returns a snapshot of the pooled tag or the key to store the tag under once it is decoded.
+    The key is None if the tag cannot be pooled. The context is only moved on a match."""
+    cdef size_t start = context.offset
+    cdef object key, tag
+    skip_tag(tagID, context, little_endian)
+    key = context.pool._key(tagID, little_endian, context.buffer + start, context.offset - start)
+    if key is not None:
+        tag = context.pool._get(key)
+        if tag is not None:
+            return (<_TAG_Value> tag)._snapshot()
+    context.offset = start
+    return key
+
+cdef _TAG_Value load_interned(char tagID, buffer_context context, bint little_endian):
+    cdef object key, tag
+    if tagID == _ID_STRING:
+        return context.pool._string(load_string(context, little_endian))
+    key = pool_lookup(tagID, context, little_endian)
+    if isinstance(key, _TAG_Value):
+        return key
+    if tagID == _ID_LIST or tagID == _ID_COMPOUND:
+        return load_container(tagID, context, little_endian, key)
+    tag = load_leaf(tagID, context, little_endian)
+    if key is None:
+        return tag
+    # the pool keeps the first tag to itself so that nothing can modify it
+    context.pool._store(key, tag)
+    return (<_TAG_Value> tag)._snapshot()
+
+
+@cython.final
+@cython.freelist(64)
+cdef class _LoadFrame:
+    """A list or compound that is open while it is decoded."""
+    cdef _TAG_Value tag
+    # the elements of a list
+    cdef list items
+    # the number of list elements still to read
+    cdef int remaining
+    # the raw paths below a compound. See raw_path_tree
+    cdef dict raw_paths
+    # if not None the tag is stored in the pool under this key once it is decoded
+    cdef object pool_key
+    # where the tag is stored in its parent so that it can be replaced with a snapshot from the pool
+    cdef object parent
+    cdef object slot
+
+
+cdef _LoadFrame open_container(
+    char tagID, buffer_context context, bint little_endian, Py_ssize_t depth, dict raw_paths, object pool_key
+):
+    """Start decoding a list or compound that is depth containers deep."""
+    cdef _LoadFrame frame = _LoadFrame.__new__(_LoadFrame)
+    cdef char list_type
+    cdef int length
+    if depth > context.max_depth:
+        raise NBTLimitError(f"NBT is nested deeper than the maximum depth of {context.max_depth:d}")
+    if tagID == _ID_LIST:
+        list_type = read_data(context, 1)[0]
+        length = (<int *> read_data(context, 4))[0]
+        to_little_endian(&length, 4, little_endian)
+        if length > 0:
+            use_nodes(context, length)
+        frame.items = []
+        frame.remaining = length
+        frame.tag = new_list(TAG_List, frame.items, list_type)
+    else:
+        frame.tag = new_compound(TAG_Compound, {})
+    frame.raw_paths = raw_paths
+    frame.pool_key = pool_key
+    return frame
+
+
+cdef _TAG_Value load_container(char tagID, buffer_context context, bint little_endian, object pool_key):
+    """Decode a list or compound starting with context.raw_paths.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into.
+    If pool_key is not None the tag is stored in the pool and a snapshot of it is returned."""
+    # the containers that the one being decoded is in
+    cdef list stack = []
+    cdef _LoadFrame frame
+    use_nodes(context, 1)
+    frame = open_container(tagID, context, little_endian, 1, context.raw_paths, pool_key)
+    cdef _LoadFrame child
+    cdef _TAG_Compound compound
+    cdef _TAG_Value root = frame.tag, tag
+    cdef char child_id
+    cdef str name = None
+    cdef object node, key
+    cdef dict paths
+    cdef size_t start
+    cdef bint interned
+    while True:
+        if frame.items is None:
+            compound = <_TAG_Compound> frame.tag
+            child_id = read_data(context, 1)[0]
+            if child_id == _ID_END:
+                close_container(context, frame)
+                if not stack:
+                    break
+                frame = stack.pop()
+                continue
+            name = load_name(context, little_endian)
+            use_nodes(context, 1)
+            if _ID_BYTE <= child_id <= _ID_DOUBLE:
+                read_scalar(child_id, context, little_endian, compound._add_scalar(name, child_id))
+                continue
+            paths = None
+            if frame.raw_paths is not None:
+                node = frame.raw_paths.get(name)
+                if node is True:
+                    start = context.offset
+                    skip_tag(child_id, context, little_endian)
+                    compound._value[name] = new_raw(
+                        child_id, PyBytes_FromStringAndSize(context.buffer + start, context.offset - start), little_endian
+                    )
+                    continue
+                paths = node
+        else:
+            if frame.remaining <= 0:
+                close_container(context, frame)
+                if not stack:
+                    break
+                frame = stack.pop()
+                continue
+            child_id = (<_TAG_List> frame.tag).list_data_type
+            # lists pass the raw paths through to their elements
+            paths = frame.raw_paths
+            if child_id != _ID_LIST and child_id != _ID_COMPOUND:
+                # the elements do not need a frame so the list is read in one go
+                interned = context.pool is not None and paths is None and child_id >= _ID_BYTE_ARRAY
+                while frame.remaining > 0:
+                    frame.remaining -= 1
+                    if interned:
+                        PyList_Append(frame.items, load_interned(child_id, context, little_endian))
+                    else:
+                        PyList_Append(frame.items, load_leaf(child_id, context, little_endian))
+                continue
+            frame.remaining -= 1
+
+        child = None
+        if context.pool is not None and paths is None and child_id >= _ID_BYTE_ARRAY:
+            if child_id == _ID_STRING:
+                tag = context.pool._string(load_string(context, little_endian))
+            else:
+                key = pool_lookup(child_id, context, little_endian)
+                if isinstance(key, _TAG_Value):
+                    tag = key
+                elif child_id == _ID_LIST or child_id == _ID_COMPOUND:
+                    child = open_container(child_id, context, little_endian, len(stack) + 2, paths, key)
+                    tag = child.tag
+                    if key is not None:
+                        # remember where it goes so that it can be swapped for its snapshot
+                        if frame.items is None:
+                            child.parent = compound._value
+                            child.slot = name
+                        else:
+                            child.parent = frame.items
+                            child.slot = len(frame.items)
+                else:
+                    tag = load_leaf(child_id, context, little_endian)
+                    if key is not None:
+                        context.pool._store(key, tag)
+                        tag = tag._snapshot()
+        elif child_id == _ID_LIST or child_id == _ID_COMPOUND:
+            child = open_container(child_id, context, little_endian, len(stack) + 2, paths, None)
+            tag = child.tag
+        else:
+            tag = load_leaf(child_id, context, little_endian)
+
+        if frame.items is None:
+            compound._value[name] = tag
+        else:
+            PyList_Append(frame.items, tag)
+        if child is not None:
+            stack.append(frame)
+            frame = child
+    if pool_key is not None:
+        return root._snapshot()
+    return root
+
+
+cdef void close_container(buffer_context context, _LoadFrame frame) except *:
+    """Finish a list or compound that has been decoded."""
+    if frame.pool_key is not None:
+        # the pool keeps the first tag to itself so that nothing can modify it
+        context.pool._store(frame.pool_key, frame.tag)
+        if frame.parent is not None:
+            frame.parent[frame.slot] = frame.tag._snapshot()
+
+
+ctypedef struct _SkipFrame:
+    # the element type of a list or _ID_COMPOUND
+    char tag_id
+    # the number of list elements still to skip
+    int remaining
+
+
+cdef void skip_tag(char tagID, buffer_context context, bint little_endian) except *:
+    """Move past the value of a tag without decoding it.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    cdef int length
+    cdef unsigned short name_length
+    cdef char list_type
+    cdef size_t width
+    cdef _SkipFrame *stack = NULL
+    cdef _SkipFrame *frame
+    cdef Py_ssize_t depth = 0, capacity = 0
+    try:
+        while True:
+            if tagID == _ID_STRING:
+                name_length = (<unsigned short *> read_data(context, 2))[0]
+                to_little_endian(&name_length, 2, little_endian)
+                read_data(context, name_length)
+            elif tagID == _ID_LIST or tagID == _ID_COMPOUND:
+                if tagID == _ID_LIST:
+                    list_type = read_data(context, 1)[0]
+                    length = (<int *> read_data(context, 4))[0]
+                    to_little_endian(&length, 4, little_endian)
+                    width = fixed_width(list_type)
+                    if length < 0:
+                        length = 0
+                    elif width:
+                        read_data(context, width * length)
+                        length = 0
+                else:
+                    list_type = _ID_COMPOUND
+                    length = -1
+                if depth >= context.max_depth:
+                    raise NBTLimitError(f"NBT is nested deeper than the maximum depth of {context.max_depth:d}")
+                if depth == capacity:
+                    capacity = capacity * 2 or 16
+                    frame = <_SkipFrame *> realloc(stack, capacity * sizeof(_SkipFrame))
+                    if frame is NULL:
+                        raise MemoryError()
+                    stack = frame
+                stack[depth].tag_id = list_type
+                stack[depth].remaining = length
+                depth += 1
+            elif is_array(tagID):
+                length = (<int *> read_data(context, 4))[0]
+                to_little_endian(&length, 4, little_endian)
+                width = 1 if tagID == _ID_BYTE_ARRAY else (4 if tagID == _ID_INT_ARRAY else 8)
+                if length > 0:
+                    read_data(context, width * length)
+            else:
+                width = fixed_width(tagID)
+                if not width:
+                    raise NBTFormatError(f"Unknown tag id {tagID}")
+                read_data(context, width)
+
+            # find the next value to skip
+            while depth:
+                frame = &stack[depth - 1]
+                if frame.remaining < 0:
+                    tagID = read_data(context, 1)[0]
+                    if tagID != _ID_END:
+                        name_length = (<unsigned short *> read_data(context, 2))[0]
+                        to_little_endian(&name_length, 2, little_endian)
+                        read_data(context, name_length)
+                        break
+                elif frame.remaining > 0:
+                    frame.remaining -= 1
+                    tagID = frame.tag_id
+                    break
+                depth -= 1
+            else:
+                return
+    finally:
+        free(stack)
+
+
+cdef inline size_t fixed_width(char tag_id):
+    """The encoded size of a number tag or 0 for other tags."""
+    if tag_id == _ID_BYTE:
+        return 1
+    elif tag_id == _ID_SHORT:
+        return 2
+    elif tag_id == _ID_INT or tag_id == _ID_FLOAT:
+        return 4
+    elif tag_id == _ID_LONG or tag_id == _ID_DOUBLE:
+        return 8
+    return 0
+
+
+cdef class InternPool:
+    """Shares identical subtrees between the tags created by :func:`load`.
+
+    Strings are shared directly. A container or array whose encoding is at most max_size bytes and is
+    identical to one seen before is loaded as a snapshot of the first one so the two share storage
+    until one of them is modified. This also makes comparing them cheap.
+    The pool holds at most max_entries subtrees and evicts the least recently used.
+    Pass the same pool to many calls of :func:`load` to share subtrees between them."""
+    cdef readonly Py_ssize_t max_entries
+    cdef readonly Py_ssize_t max_size
+    cdef object _entries
+
+    def __init__(self, Py_ssize_t max_entries = 16384, Py_ssize_t max_size = 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    cdef TAG_String _string(self, bytes value):
+        cdef object tag
+        if len(value) > self.max_size:
+            return TAG_String(value)
+        tag = self._entries.get(value)
+        if tag is None:
+            tag = TAG_String(value)
+            self._store(value, tag)
+        else:
+            self._entries.move_to_end(value)
+        return tag
+
+    cdef object _key(self, char tag_id, bint little_endian, char *data, size_t size):
+        """The key of an encoded subtree or None if it is too large to share."""
+        if size > <size_t> self.max_size:
+            return None
+        return tag_id, little_endian, PyBytes_FromStringAndSize(data, size)
+
+    cdef object _get(self, object key):
+        cdef object tag = self._entries.get(key)
+        if tag is not None:
+            self._entries.move_to_end(key)
+        return tag
+
+    cdef void _store(self, object key, object tag) except *:
+        self._entries[key] = tag
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(False)
+
+
+cpdef bytes safe_gunzip(bytes data, Py_ssize_t max_size = -1):
+    """Decompress gzip data. Anything that is not valid gzip is returned unchanged.
+    If max_size is not negative more than max_size decompressed bytes raise an NBTLimitError.
+    The data is inflated as a stream so this is found after decompressing at most max_size + 1 bytes."""
+    cdef bytes remaining = data
+    cdef list chunks = []
+    cdef bytes chunk
+    cdef Py_ssize_t size = 0
+    if data[:2] != b'\x1f\x8b':  # if the first two bytes are this it should be gzipped
+        return data
+    if max_size < 0 or max_size == PY_SSIZE_T_MAX:
+        # leave room for the extra byte that shows the limit was passed
+        max_size = PY_SSIZE_T_MAX - 1
+    try:
+        # a gzip file can have many members one after another each of which may be padded with zeros
+        while remaining:
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            chunk = inflater.decompress(remaining, max_size - size + 1)
+            size += len(chunk)
+            if size > max_size:
+                raise NBTLimitError(f"Decompressed NBT is larger than the maximum of {max_size:d} bytes")
+            if not inflater.eof:
+                return data
+            chunks.append(chunk)
+            remaining = inflater.unused_data.lstrip(b'\x00')
+    except zlib.error:
+        return data
+    return b"".join(chunks)
+
+
+cdef class Limits:
+    """Bounds on the work :func:`load` does so that untrusted NBT can be loaded safely.
+    Input over any of them raises an NBTLimitError before the memory for it is allocated.
+    None means no limit.
+
+    max_bytes is the size of the input and max_decompressed is its size once decompressed.
+    max_depth is the number of lists and compounds that may be nested in each other.
+    max_nodes is the number of tags created. Compound entries, list elements and each root count.
+    max_array_len is the number of elements in a byte, int or long array."""
+    cdef readonly object max_bytes
+    cdef readonly object max_decompressed
+    cdef readonly object max_depth
+    cdef readonly object max_nodes
+    cdef readonly object max_array_len
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_decompressed: Optional[int] = None,
+        max_depth: Optional[int] = _MAX_DEPTH,
+        max_nodes: Optional[int] = None,
+        max_array_len: Optional[int] = None,
+    ):
+        self.max_bytes = _limit(max_bytes)
+        self.max_decompressed = _limit(max_decompressed)
+        self.max_depth = _limit(max_depth)
+        self.max_nodes = _limit(max_nodes)
+        self.max_array_len = _limit(max_array_len)
+
+    def __repr__(self):
+        return (
+            f"Limits(max_bytes={self.max_bytes}, max_decompressed={self.max_decompressed}, "
+            f"max_depth={self.max_depth}, max_nodes={self.max_nodes}, max_array_len={self.max_array_len})"
+        )
+
+    def __reduce__(self):
+        return Limits, (self.max_bytes, self.max_decompressed, self.max_depth, self.max_nodes, self.max_array_len)
+
+
+cdef object _limit(object value):
+    if value is None:
+        return None
+    value = operator.index(value)
+    if value < 0:
+        raise ValueError(f"Limits must not be negative. Got {value}")
+    return value
+
+
+cdef inline Py_ssize_t _limit_size(object value):
+    return PY_SSIZE_T_MAX if value is None else min(value, PY_SSIZE_T_MAX)
 
 cdef class _TAG_Value:
     tag_id = None
@@ -190,6 +674,47 @@ cdef class _TAG_Value:
     def copy(self):
         return self.__class__(self.value)
 
+    def deepcopy(self):
+        """A deep copy of the tag. Numbers and strings are immutable so they are shared rather than copied."""
+        return self._deepcopy()
+
+    cdef _TAG_Value _deepcopy(self):
+        return self
+
+    def snapshot(self):
+        """A copy of the tag that shares all of its structure with this tag.
+        Containers and arrays are copied lazily when either side is modified.
+        Containers that have handed out or been given children get their own copy of the children so
+        that tags referenced outside the tree stay part of this tag and not the snapshot."""
+        return self._snapshot()
+
+    cdef _TAG_Value _snapshot(self):
+        return self
+
+    def digest(self, str algorithm = "blake2b") -> bytes:
+        """A hash of the content of the tag that is the same across processes, platforms and file formats.
+        algorithm is any name accepted by hashlib.new.
+        The digests of containers and arrays are cached until they are modified so repeated digests of
+        a mostly unchanged tree only rehash the parts that changed.
+        Changes made through a reference to a value obtained before the digest was computed are not detected."""
+        cdef unsigned long long stamp
+        return tag_digest(self, algorithm, &stamp)
+
+    def freeze(self):
+        """An immutable and hashable version of this tag for use as a dictionary key or set member.
+        Numbers and strings are already immutable so they are returned as they are.
+        Containers and arrays return a :class:`FrozenTag` which shares structure with this tag."""
+        if is_mutable(fast_tag_id(self)):
+            return frozen_tag(self._snapshot())
+        return self
+
+    def equals(self, other, bint strict = True) -> bool:
+        """Compare two tags structurally, stopping at the first difference.
+        If strict is False numbers of different types and arrays of different types compare by value."""
+        if not isinstance(other, _TAG_Value):
+            return False
+        return tags_equal(self, other, strict)
+
     cpdef str to_snbt(self, indent_chr=None):
         if isinstance(indent_chr, int):
             return self._pretty_to_snbt(" " * indent_chr)
@@ -197,11 +722,36 @@ cdef class _TAG_Value:
             return self._pretty_to_snbt(indent_chr)
         return self._to_snbt()
 
+    def write_snbt(self, fp, indent_chr=None):
+        """Write the SNBT of the tag to a text file object a piece at a time.
+        The whole text is never held in memory. indent_chr works as in :meth:`to_snbt`."""
+        for chunk in self.iter_snbt(indent_chr):
+            fp.write(chunk)
+
+    def iter_snbt(self, indent_chr=None):
+        """Generate the SNBT of the tag in pieces that join to the output of :meth:`to_snbt`.
+        The tag must not be modified until the generator is exhausted."""
+        cdef _SNBTEmitter emitter = _SNBTEmitter(self, snbt_indent(indent_chr), 0)
+        cdef bint more = True
+        cdef str chunk
+        while more:
+            more = emitter.fill(SNBT_CHUNK_SIZE)
+            chunk = emitter.writer.take()
+            if chunk:
+                yield chunk
+
     cpdef str _to_snbt(self):
-        raise NotImplementedError()
+        cdef _SNBTEmitter emitter = _SNBTEmitter(self, None, 0)
+        emitter.fill(PY_SSIZE_T_MAX)
+        return emitter.writer.take()
 
     cpdef str _pretty_to_snbt(self, indent_chr="", indent_count=0, leading_indent=True):
-        return f"{indent_chr * indent_count * leading_indent}{self._to_snbt()}"
+        cdef bytes indent = indent_chr.encode("utf-8")
+        cdef _SNBTEmitter emitter = _SNBTEmitter(self, indent, indent_count)
+        if leading_indent:
+            emitter.writer.write_indent(indent, indent_count)
+        emitter.fill(PY_SSIZE_T_MAX)
+        return emitter.writer.take()
 
     cdef void write_value(self, buffer, little_endian) except *:
         raise NotImplementedError()
@@ -224,6 +774,21 @@ cdef class _TAG_Value:
 
 BaseValueType = _TAG_Value
 
+DEF _SMALL_INT_MIN = -128
+DEF _SMALL_INT_MAX = 1024
+
+cdef tuple _BYTE_CACHE
+cdef tuple _SHORT_CACHE
+cdef tuple _INT_CACHE
+cdef tuple _LONG_CACHE
+
+cdef int check_not_cached(_TAG_Value tag, tuple cache, long long value, long long start) except -1:
+    """Raise a TypeError if tag is the shared instance for value in cache.
+    __init__ would otherwise change the value of every tag decoded with that value."""
+    if cache is not None and start <= value < start + len(cache) and tag is cache[value - start]:
+        raise TypeError(f"Shared {tag.__class__.__name__} instances cannot be re-initialised")
+    return 0
+
 cdef class _Int(_TAG_Value):
     def __eq__(self, other):
         return primitive_conversion(self) == primitive_conversion(other)
@@ -471,11 +1036,9 @@ cdef class TAG_Byte(_Int):
     cdef readonly char value
 
     def __init__(self, value = 0):
+        check_not_cached(self, _BYTE_CACHE, self.value, -128)
         self.value = int(primitive_conversion(value))
 
-    cpdef str _to_snbt(self):
-        return f"{self.value}b"
-
     cdef void write_value(self, buffer, little_endian):
         write_byte(self.value, buffer)
 
@@ -484,11 +1047,9 @@ cdef class TAG_Short(_Int):
     cdef readonly short value
 
     def __init__(self, value = 0):
+        check_not_cached(self, _SHORT_CACHE, self.value, _SMALL_INT_MIN)
         self.value = int(primitive_conversion(value))
 
-    cpdef str _to_snbt(self):
-        return f"{self.value}s"
-
     cdef void write_value(self, buffer, little_endian):
         write_short(self.value, buffer, little_endian)
 
@@ -498,11 +1059,9 @@ cdef class TAG_Int(_Int):
     cdef readonly int value
 
     def __init__(self, value = 0):
+        check_not_cached(self, _INT_CACHE, self.value, _SMALL_INT_MIN)
         self.value = int(primitive_conversion(value))
 
-    cpdef str _to_snbt(self):
-        return f"{self.value}"
-
     cdef void write_value(self, buffer, little_endian):
         write_int(self.value, buffer, little_endian)
 
@@ -512,11 +1071,9 @@ cdef class TAG_Long(_Int):
     cdef readonly long long value
 
     def __init__(self, value = 0):
+        check_not_cached(self, _LONG_CACHE, self.value, _SMALL_INT_MIN)
         self.value = int(primitive_conversion(value))
 
-    cpdef str _to_snbt(self):
-        return f"{self.value}L"
-
     cdef void write_value(self, buffer, little_endian):
         write_long(self.value, buffer, little_endian)
 
@@ -528,9 +1085,6 @@ cdef class TAG_Float(_Float):
     def __init__(self, value = 0):
         self.value = float(primitive_conversion(value))
 
-    cpdef str _to_snbt(self):
-        return f"{self.value:.20f}".rstrip('0') + "f"
-
     cdef void write_value(self, buffer, little_endian):
         write_float(self.value, buffer, little_endian)
 
@@ -542,14 +1096,150 @@ cdef class TAG_Double(_Float):
     def __init__(self, value = 0):
         self.value = float(primitive_conversion(value))
 
-    cpdef str _to_snbt(self):
-        return f"{self.value:.20f}".rstrip('0') + "d"
-
     cdef void write_value(self, buffer, little_endian):
         write_double(self.value, buffer, little_endian)
 
+
+# Scalar tags are allocated and freed in huge numbers while loading so the
+# scalar types recycle their memory through a free list instead of going
+# back to the allocator every time.
+cdef extern from "Python.h":
+    ctypedef PyObject *(*allocfunc)(_PyTypeObject *, Py_ssize_t)
+    ctypedef void (*freefunc)(void *)
+    ctypedef struct _PyTypeObject "PyTypeObject":
+        Py_ssize_t tp_basicsize
+        allocfunc tp_alloc
+        freefunc tp_free
+    PyObject *PyType_GenericAlloc(_PyTypeObject *type, Py_ssize_t nitems)
+    PyObject *PyObject_Init(PyObject *op, _PyTypeObject *type)
+    void PyObject_Free(void *ptr)
+    _PyTypeObject *Py_TYPE(PyObject *o)
+    Py_ssize_t Py_REFCNT(PyObject *o)
+
+DEF _FREELIST_TYPES = 6
+DEF _FREELIST_SIZE = 1024
+
+cdef _PyTypeObject *_freelist_type[_FREELIST_TYPES]
+cdef void *_freelist[_FREELIST_TYPES][_FREELIST_SIZE]
+cdef int _freelist_count[_FREELIST_TYPES]
+
+cdef inline int _freelist_index(_PyTypeObject *tp):
+    cdef int i
+    for i in range(_FREELIST_TYPES):
+        if _freelist_type[i] == tp:
+            return i
+    return -1
+
+cdef PyObject *_scalar_alloc(_PyTypeObject *tp, Py_ssize_t nitems):
+    cdef int i = _freelist_index(tp)
+    cdef void *obj
+    if i == -1 or _freelist_count[i] == 0:
+        return PyType_GenericAlloc(tp, nitems)
+    _freelist_count[i] -= 1
+    obj = _freelist[i][_freelist_count[i]]
+    memset(obj, 0, tp.tp_basicsize)
+    return PyObject_Init(<PyObject *> obj, tp)
+
+cdef void _scalar_free(void *obj):
+    cdef int i = _freelist_index(Py_TYPE(<PyObject *> obj))
+    if i == -1 or _freelist_count[i] == _FREELIST_SIZE:
+        PyObject_Free(obj)
+    else:
+        _freelist[i][_freelist_count[i]] = obj
+        _freelist_count[i] += 1
+
+cdef void _install_freelist(int index, type cls):
+    cdef _PyTypeObject *tp = <_PyTypeObject *> cls
+    _freelist_type[index] = tp
+    _freelist_count[index] = 0
+    tp.tp_alloc = _scalar_alloc
+    tp.tp_free = _scalar_free
+
+_install_freelist(0, TAG_Byte)
+_install_freelist(1, TAG_Short)
+_install_freelist(2, TAG_Int)
+_install_freelist(3, TAG_Long)
+_install_freelist(4, TAG_Float)
+_install_freelist(5, TAG_Double)
+
+
+# The scalar tags are immutable so the decoders share one instance for each
+# byte value and for small integers rather than creating a new tag each time.
+cdef tuple _build_cache(type cls, int start, int stop):
+    cdef list cache = []
+    cdef int i
+    for i in range(start, stop):
+        cache.append(cls(i))
+    return tuple(cache)
+
+_BYTE_CACHE = _build_cache(TAG_Byte, -128, 128)
+_SHORT_CACHE = _build_cache(TAG_Short, _SMALL_INT_MIN, _SMALL_INT_MAX)
+_INT_CACHE = _build_cache(TAG_Int, _SMALL_INT_MIN, _SMALL_INT_MAX)
+_LONG_CACHE = _build_cache(TAG_Long, _SMALL_INT_MIN, _SMALL_INT_MAX)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline TAG_Byte make_byte(signed char value):
+    return _BYTE_CACHE[<int> value + 128]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline TAG_Short make_short(short value):
+    cdef TAG_Short tag
+    if _SMALL_INT_MIN <= value < _SMALL_INT_MAX:
+        return _SHORT_CACHE[value - _SMALL_INT_MIN]
+    tag = TAG_Short.__new__(TAG_Short)
+    tag.value = value
+    return tag
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline TAG_Int make_int(int value):
+    cdef TAG_Int tag
+    if _SMALL_INT_MIN <= value < _SMALL_INT_MAX:
+        return _INT_CACHE[value - _SMALL_INT_MIN]
+    tag = TAG_Int.__new__(TAG_Int)
+    tag.value = value
+    return tag
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline TAG_Long make_long(long long value):
+    cdef TAG_Long tag
+    if _SMALL_INT_MIN <= value < _SMALL_INT_MAX:
+        return _LONG_CACHE[value - _SMALL_INT_MIN]
+    tag = TAG_Long.__new__(TAG_Long)
+    tag.value = value
+    return tag
+
+cdef inline object array_value(obj):
+    """The value of obj without copying it if it is a shared array. Only for reading."""
+    return (<_TAG_Array> obj)._value if isinstance(obj, _TAG_Array) else primitive_conversion(obj)
+
+
+# Incremented whenever a cache is filled so that a parent can tell if a child was recomputed after it.
+cdef unsigned long long _cache_clock = 0
+
+
+cdef class _TagCache:
+    """Values derived from the content of a container or array.
+    Caches are never modified once created. Any write to the tag drops its cache."""
+    cdef unsigned long long digest_stamp
+    cdef str algorithm
+    cdef bytes digest
+    # the binary value written by an incremental save
+    cdef unsigned long long encoded_stamp
+    cdef bint encoded_little_endian
+    cdef bytes encoded
+
+
 cdef class _TAG_Array(_TAG_Value):
-    cdef public object value
+    cdef object _value
+    # True if _value may be shared with a snapshot and must be copied before it is modified.
+    cdef bint _shared
+    # True if _value or a view of it may be referenced from outside the tag.
+    cdef bint _escaped
+    cdef _TagCache _cache
     big_endian_data_type = little_endian_data_type = numpy.dtype("int8")
 
     def __init__(self, object value = None):
@@ -567,119 +1257,173 @@ cdef class _TAG_Array(_TAG_Value):
 
         self.value = value
 
+    @property
+    def value(self):
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._shared = False
+        self._escaped = True
+        self._cache = None
+
+    cdef int _unshare(self) except -1:
+        """Called before the array is modified. Copy the array if it is shared and drop the cache."""
+        if self._shared and Py_REFCNT(<PyObject *> self._value) > 1:
+            self._value = self._value.copy()
+        self._shared = False
+        self._cache = None
+        return 0
+
+    cdef _TAG_Array _share_into(self, _TAG_Array tag):
+        if self._escaped:
+            if Py_REFCNT(<PyObject *> self._value) > 1:
+                # the array may be modified through a reference held outside the tag
+                tag._value = self._value.copy()
+                tag._cache = self._cache
+                return tag
+            self._escaped = False
+        tag._value = self._value
+        tag._cache = self._cache
+        tag._shared = self._shared = True
+        return tag
+
     def __eq__(self, other):
-        return numpy.array_equal(primitive_conversion(self), primitive_conversion(other))
+        return numpy.array_equal(array_value(self), array_value(other))
 
     def __getitem__(self, item):
-        return self.value.__getitem__(item)
+        cdef object value = self._value.__getitem__(item)
+        if (self._shared or self._cache is not None) and isinstance(value, numpy.ndarray):
+            # a view into the shared array
+            self._unshare()
+            value = self._value.__getitem__(item)
+        if isinstance(value, numpy.ndarray):
+            self._escaped = True
+        return value
 
     def __setitem__(self, key, value):
-        self.value.__setitem__(key, value)
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._value.__setitem__(key, value)
 
     def __deepcopy__(self, memo=None):
-        return self.__class__(self.value.__deepcopy__(memo or {}))
+        return self._deepcopy()
+
+    cdef _TAG_Array _copy_into(self, _TAG_Array tag):
+        tag._value = self._value.copy()
+        return tag
 
     def __getattr__(self, item):
-        return self.value.__getattribute__(item)
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        return self._value.__getattribute__(item)
 
     def __dir__(self):
-        return dir(self.value)
+        return dir(self._value)
 
     def __array__(self):
-        return self.value
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        return self._value
 
     def __len__(self):
-        return len(self.value)
+        return len(self._value)
 
     def __add__(self, other):
-        return (primitive_conversion(self) + primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) + array_value(other)).astype(self.big_endian_data_type)
 
     def __sub__(self, other):
-        return (primitive_conversion(self) - primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) - array_value(other)).astype(self.big_endian_data_type)
 
     def __mul__(self, other):
-        return (primitive_conversion(self) - primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) - array_value(other)).astype(self.big_endian_data_type)
 
     def __matmul__(self, other):
-        return (primitive_conversion(self) @ primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) @ array_value(other)).astype(self.big_endian_data_type)
 
     def __truediv__(self, other):
-        return (primitive_conversion(self) / primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) / array_value(other)).astype(self.big_endian_data_type)
 
     def __floordiv__(self, other):
-        return (primitive_conversion(self) // primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) // array_value(other)).astype(self.big_endian_data_type)
 
     def __mod__(self, other):
-        return (primitive_conversion(self) % primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) % array_value(other)).astype(self.big_endian_data_type)
 
     def __divmod__(self, other):
-        return divmod(primitive_conversion(self), primitive_conversion(other))
+        return divmod(array_value(self), array_value(other))
 
     def __pow__(self, power, modulo):
-        return pow(primitive_conversion(self), power, modulo).astype(self.big_endian_data_type)
+        return pow(array_value(self), power, modulo).astype(self.big_endian_data_type)
 
     def __lshift__(self, other):
-        return (primitive_conversion(self) << primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) << array_value(other)).astype(self.big_endian_data_type)
 
     def __rshift__(self, other):
-        return (primitive_conversion(self) >> primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) >> array_value(other)).astype(self.big_endian_data_type)
 
     def __and__(self, other):
-        return (primitive_conversion(self) & primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) & array_value(other)).astype(self.big_endian_data_type)
 
     def __xor__(self, other):
-        return (primitive_conversion(self) ^ primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) ^ array_value(other)).astype(self.big_endian_data_type)
 
     def __or__(self, other):
-        return (primitive_conversion(self) | primitive_conversion(other)).astype(self.big_endian_data_type)
+        return (array_value(self) | array_value(other)).astype(self.big_endian_data_type)
 
     def __radd__(self, other):
-        return (primitive_conversion(other) + primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) + array_value(self)).astype(self.big_endian_data_type)
 
     def __rsub__(self, other):
-        return (primitive_conversion(other) - primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) - array_value(self)).astype(self.big_endian_data_type)
 
     def __rmul__(self, other):
-        return (primitive_conversion(other) * primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) * array_value(self)).astype(self.big_endian_data_type)
 
     def __rtruediv__(self, other):
-        return (primitive_conversion(other) / primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) / array_value(self)).astype(self.big_endian_data_type)
 
     def __rfloordiv__(self, other):
-        return (primitive_conversion(other) // primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) // array_value(self)).astype(self.big_endian_data_type)
 
     def __rmod__(self, other):
-        return (primitive_conversion(other) % primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) % array_value(self)).astype(self.big_endian_data_type)
 
     def __rdivmod__(self, other):
-        return divmod(primitive_conversion(other), primitive_conversion(self))
+        return divmod(array_value(other), array_value(self))
 
     def __rpow__(self, other, modulo):
-        return pow(primitive_conversion(other), primitive_conversion(self), modulo).astype(self.big_endian_data_type)
+        return pow(array_value(other), array_value(self), modulo).astype(self.big_endian_data_type)
 
     def __rlshift__(self, other):
-        return (primitive_conversion(other) << primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) << array_value(self)).astype(self.big_endian_data_type)
 
     def __rrshift__(self, other):
-        return (primitive_conversion(other) >> primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) >> array_value(self)).astype(self.big_endian_data_type)
 
     def __rand__(self, other):
-        return (primitive_conversion(other) & primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) & array_value(self)).astype(self.big_endian_data_type)
 
     def __rxor__(self, other):
-        return (primitive_conversion(other) ^ primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) ^ array_value(self)).astype(self.big_endian_data_type)
 
     def __ror__(self, other):
-        return (primitive_conversion(other) | primitive_conversion(self)).astype(self.big_endian_data_type)
+        return (array_value(other) | array_value(self)).astype(self.big_endian_data_type)
 
     def __neg__(self):
-        return (-self.value).astype(self.big_endian_data_type)
+        return (-self._value).astype(self.big_endian_data_type)
 
     def __pos__(self):
-        return (+self.value).astype(self.big_endian_data_type)
+        return (+self._value).astype(self.big_endian_data_type)
 
     def __abs__(self):
-        return abs(self.value).astype(self.big_endian_data_type)
+        return abs(self._value).astype(self.big_endian_data_type)
 
 
 BaseArrayType = _TAG_Array
@@ -688,60 +1432,57 @@ cdef class TAG_Byte_Array(_TAG_Array):
     tag_id = _ID_BYTE_ARRAY
     big_endian_data_type = little_endian_data_type = numpy.dtype("int8")
 
-    cpdef str _to_snbt(self):
-        cdef int elem
-        cdef list tags = []
-        for elem in self.value:
-            tags.append(f"{elem}B")
-        return f"[B;{CommaSpace.join(tags)}]"
+    cdef _TAG_Value _deepcopy(self):
+        return self._copy_into(TAG_Byte_Array.__new__(TAG_Byte_Array))
+
+    cdef _TAG_Value _snapshot(self):
+        return self._share_into(TAG_Byte_Array.__new__(TAG_Byte_Array))
 
     cdef void write_value(self, buffer, little_endian):
         data_type = self.little_endian_data_type if little_endian else self.big_endian_data_type
-        if self.value.dtype != data_type:
-            if self.value.dtype != self.big_endian_data_type if little_endian else self.little_endian_data_type:
-                print(f'[Warning] Mismatch array dtype. Expected: {data_type.str}, got: {self.value.dtype.str}')
-            self.value = self.value.astype(data_type)
-        write_array(self.value, buffer, 1, little_endian)
+        if self._value.dtype != data_type:
+            if self._value.dtype != self.big_endian_data_type if little_endian else self.little_endian_data_type:
+                print(f'[Warning] Mismatch array dtype. Expected: {data_type.str}, got: {self._value.dtype.str}')
+            self._value = self._value.astype(data_type)
+        write_array(self._value, buffer, 1, little_endian)
 
 cdef class TAG_Int_Array(_TAG_Array):
     tag_id = _ID_INT_ARRAY
     big_endian_data_type = numpy.dtype(">i4")
     little_endian_data_type = numpy.dtype("<i4")
 
-    cpdef str _to_snbt(self):
-        cdef int elem
-        cdef list tags = []
-        for elem in self.value:
-            tags.append(str(elem))
-        return f"[I;{CommaSpace.join(tags)}]"
+    cdef _TAG_Value _deepcopy(self):
+        return self._copy_into(TAG_Int_Array.__new__(TAG_Int_Array))
+
+    cdef _TAG_Value _snapshot(self):
+        return self._share_into(TAG_Int_Array.__new__(TAG_Int_Array))
 
     cdef void write_value(self, buffer, little_endian):
         data_type = self.little_endian_data_type if little_endian else self.big_endian_data_type
-        if self.value.dtype != data_type:
-            if self.value.dtype != self.big_endian_data_type if little_endian else self.little_endian_data_type:
-                print(f'[Warning] Mismatch array dtype. Expected: {data_type.str}, got: {self.value.dtype.str}')
-            self.value = self.value.astype(data_type)
-        write_array(self.value, buffer, 4, little_endian)
+        if self._value.dtype != data_type:
+            if self._value.dtype != self.big_endian_data_type if little_endian else self.little_endian_data_type:
+                print(f'[Warning] Mismatch array dtype. Expected: {data_type.str}, got: {self._value.dtype.str}')
+            self._value = self._value.astype(data_type)
+        write_array(self._value, buffer, 4, little_endian)
 
 cdef class TAG_Long_Array(_TAG_Array):
     tag_id = _ID_LONG_ARRAY
     big_endian_data_type = numpy.dtype(">i8")
     little_endian_data_type = numpy.dtype("<i8")
 
-    cpdef str _to_snbt(self):
-        cdef long long elem
-        cdef list tags = []
-        for elem in self.value:
-            tags.append(f"{elem}L")
-        return f"[L;{CommaSpace.join(tags)}]"
+    cdef _TAG_Value _deepcopy(self):
+        return self._copy_into(TAG_Long_Array.__new__(TAG_Long_Array))
+
+    cdef _TAG_Value _snapshot(self):
+        return self._share_into(TAG_Long_Array.__new__(TAG_Long_Array))
 
     cdef void write_value(self, buffer, little_endian):
         data_type = self.little_endian_data_type if little_endian else self.big_endian_data_type
-        if self.value.dtype != data_type:
-            if self.value.dtype != self.big_endian_data_type if little_endian else self.little_endian_data_type:
-                print(f'[Warning] Mismatch array dtype. Expected: {data_type.str}, got: {self.value.dtype.str}')
-            self.value = self.value.astype(data_type)
-        write_array(self.value, buffer, 8, little_endian)
+        if self._value.dtype != data_type:
+            if self._value.dtype != self.big_endian_data_type if little_endian else self.little_endian_data_type:
+                print(f'[Warning] Mismatch array dtype. Expected: {data_type.str}, got: {self._value.dtype.str}')
+            self._value = self._value.astype(data_type)
+        write_array(self._value, buffer, 8, little_endian)
 
 
 def escape(string: str):
@@ -780,9 +1521,6 @@ cdef class TAG_String(_TAG_Value):
     def __len__(self) -> int:
         return len(self.value)
 
-    cpdef str _to_snbt(self):
-        return f"\"{escape(self.value)}\""
-
     cdef void write_value(self, buffer, little_endian):
         write_string(self.py_bytes, buffer, little_endian)
 
@@ -813,145 +1551,705 @@ cdef class TAG_String(_TAG_Value):
 
 cdef class _TAG_List(_TAG_Value):
     tag_id = _ID_LIST
-    cdef public list value
+    cdef list _value
     cdef public char list_data_type
+    # True if _value may be shared with a snapshot and must be copied before it is modified.
+    cdef bint _shared
+    # True if a mutable child may be referenced from outside the tree. See snapshot_escaped.
+    cdef bint _escaped
+    cdef _TagCache _cache
 
     def __init__(self, value = None, char list_data_type = 1):
+        cdef list tags
         self.list_data_type = list_data_type
         self.value = []
         if value:
-            self._check_tag(value[0])
-            self.value = list(value)
-            for tag in value[1:]:
-                self._check_tag(tag)
-            #map(self._check_tag, value[1:])
+            tags = list(value)
+            self._check_tags(tags, True)
+            self.value = tags
+
+    @classmethod
+    def from_trusted(cls, list value, char list_data_type = 1):
+        """Create a TAG_List that owns value without validating it.
+        The caller must guarantee that every element is an NBT object of type list_data_type."""
+        cdef _TAG_List tag = new_list(cls, value, list_data_type)
+        tag._escaped = True
+        return tag
+
+    def __deepcopy__(self, memo=None):
+        return self._deepcopy()
+
+    cdef _TAG_Value _deepcopy(self):
+        return deepcopy_container(self)
+
+    cdef _TAG_Value _snapshot(self):
+        cdef _TAG_List tag
+        if self._escaped:
+            return snapshot_escaped(self)
+        tag = new_list(type(self), self._value, self.list_data_type)
+        tag._cache = self._cache
+        tag._shared = self._shared = True
+        return tag
+
+    cdef int _unshare(self) except -1:
+        """Called before the list is modified. Drop the cache and if the list object is shared
+        give this list its own copy. Mutable children are replaced with snapshots of themselves."""
+        cdef list value
+        cdef object tag
+        self._cache = None
+        if self._shared and Py_REFCNT(<PyObject *> self._value) > 1:
+            if is_mutable(self.list_data_type):
+                value = []
+                for tag in self._value:
+                    PyList_Append(value, (<_TAG_Value> tag)._snapshot())
+            else:
+                value = list(self._value)
+            self._value = value
+        self._shared = False
+        return 0
+
+    @property
+    def value(self):
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        return self._value
+
+    @value.setter
+    def value(self, list value):
+        self._value = value
+        self._shared = False
+        self._escaped = True
+        self._cache = None
 
     def _check_tag(self, value: AnyNBT):
-        if not isinstance(value, _TAG_Value):
-            raise TypeError(f"Invalid type {value.__class__.__name__} TAG_List. Must be an NBT object.")
-        if not self.value:
-            self.list_data_type = value.tag_id
-        elif value.tag_id != self.list_data_type:
-            raise TypeError(
-                f"Invalid type {value.__class__.__name__} for TAG_List({TAG_CLASSES[self.list_data_type].__name__})"
-            )
+        self._check_tags([value], not self._value)
+
+    cdef int _check_tags(self, list tags, bint reset) except -1:
+        """Validate tags in one pass. If reset is true the first tag sets the list type."""
+        cdef char list_data_type = self.list_data_type
+        cdef object tag
+        cdef char tag_id
+        for tag in tags:
+            if not isinstance(tag, _TAG_Value):
+                raise TypeError(f"Invalid type {tag.__class__.__name__} for TAG_List. Must be an NBT object.")
+            tag_id = fast_tag_id(tag)
+            if tag_id == _ID_RAW:
+                raise TypeError("A RawTag can only be stored in a TAG_Compound")
+            if reset:
+                list_data_type = tag_id
+                reset = False
+            elif tag_id != list_data_type:
+                raise TypeError(
+                    f"Invalid type {tag.__class__.__name__} for TAG_List({TAG_CLASSES[list_data_type].__name__})"
+                )
+        self.list_data_type = list_data_type
+        return 0
 
     def __getitem__(self, index: int) -> AnyNBT:
-        return self.value[index]
+        if is_mutable(self.list_data_type):
+            self._expose()
+        return self._value[index]
+
+    cdef void _expose(self) except *:
+        """Called before a mutable child is handed out."""
+        if self._shared:
+            self._unshare()
+        self._escaped = True
 
     def __setitem__(self, index, value):
+        cdef list tags
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
         if isinstance(index, slice):
-            map(self._check_tag, value)
+            tags = list(value)
+            self._check_tags(
+                tags, len(range(*index.indices(len(self._value)))) == len(self._value)
+            )
+            self._value[index] = tags
         else:
             self._check_tag(value)
-        self.value[index] = value
+            self._value[index] = value
 
     def __delitem__(self, index: int):
-        del self.value[index]
+        if self._shared or self._cache is not None:
+            self._unshare()
+        del self._value[index]
 
     def __iter__(self) -> Iterator[AnyNBT]:
-        return iter(self.value)
+        if is_mutable(self.list_data_type):
+            self._expose()
+        return iter(self._value)
+
+    def __reversed__(self) -> Iterator[AnyNBT]:
+        if is_mutable(self.list_data_type):
+            self._expose()
+        return reversed(self._value)
 
     def __contains__(self, item: AnyNBT) -> bool:
-        return item in self.value
+        return item in self._value
 
     def __len__(self) -> int:
-        return len(self.value)
+        return len(self._value)
+
+    def __eq__(self, other):
+        if isinstance(other, _TAG_List):
+            return tags_equal(self, other, False)
+        return self._value == other
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
 
     def insert(self, index: int, value: AnyNBT):
         self._check_tag(value)
-        self.value.insert(index, value)
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        self._value.insert(index, value)
 
     def append(self, value: AnyNBT) -> None:
         self._check_tag(value)
-        self.value.append(value)
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        self._value.append(value)
+
+    def extend(self, values: Iterable[AnyNBT]) -> None:
+        cdef list tags = list(values)
+        self._check_tags(tags, not self._value)
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        self._value.extend(tags)
+
+    def pop(self, index: int = -1) -> AnyNBT:
+        if self._shared or self._cache is not None:
+            self._unshare()
+        return self._value.pop(index)
+
+    def remove(self, value: AnyNBT) -> None:
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._value.remove(value)
+
+    def index(self, value: AnyNBT, *args) -> int:
+        return self._value.index(value, *args)
+
+    def count(self, value: AnyNBT) -> int:
+        return self._value.count(value)
+
+    def reverse(self) -> None:
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._value.reverse()
+
+    def clear(self) -> None:
+        self.value = []
 
-    cdef void write_value(self, buffer, little_endian) except *:
-        cdef char list_type = self.list_data_type
+    cdef int _check_type(self, char tag_id) except -1:
+        if self.list_data_type != tag_id:
+            raise TypeError(
+                f"Expected a TAG_List of {TAG_NAMES[tag_id]} but it contains {TAG_NAMES[self.list_data_type]}"
+            )
+        return 0
 
-        write_tag_id(list_type, buffer)
-        write_int(<int> len(self.value), buffer, little_endian)
+    cdef object _get_typed(self, Py_ssize_t index, char tag_id):
+        self._check_type(tag_id)
+        if is_mutable(tag_id):
+            self._expose()
+        cdef object tag = self._value[index]
+        if not isinstance(tag, _TAG_Value) or fast_tag_id(tag) != tag_id:
+            raise TypeError(f"Invalid type {tag.__class__.__name__} at index {index} of TAG_List")
+        return native_value(tag)
 
-        cdef _TAG_Value subtag
-        for subtag in self.value:
-            if subtag.tag_id != list_type:
-                raise ValueError("Asked to save TAG_List with different types! Found %s and %s" % (subtag.tag_id,
-                                                                                                   list_type))
-            write_tag_value(subtag, buffer, little_endian)
+    cdef list _get_typed_all(self, char tag_id):
+        self._check_type(tag_id)
+        if is_mutable(tag_id):
+            self._expose()
+        cdef list values = []
+        cdef object tag
+        for tag in self._value:
+            if not isinstance(tag, _TAG_Value) or fast_tag_id(tag) != tag_id:
+                raise TypeError(f"Invalid type {tag.__class__.__name__} in TAG_List")
+            values.append(native_value(tag))
+        return values
 
-    cpdef str _to_snbt(self):
-        cdef _TAG_Value elem
-        cdef list tags = []
-        for elem in self.value:
-            tags.append(elem._to_snbt())
-        return f"[{CommaSpace.join(tags)}]"
+    def get_byte(self, index: int) -> int:
+        return self._get_typed(index, _ID_BYTE)
 
-    cpdef str _pretty_to_snbt(self, indent_chr="", indent_count=0, leading_indent=True):
-        cdef _TAG_Value elem
-        cdef list tags = []
-        for elem in self.value:
-            tags.append(elem._pretty_to_snbt(indent_chr, indent_count + 1))
-        if tags:
-            return f"{indent_chr * indent_count * leading_indent}[\n{CommaNewline.join(tags)}\n{indent_chr * indent_count}]"
-        else:
-            return f"{indent_chr * indent_count * leading_indent}[]"
+    def get_short(self, index: int) -> int:
+        return self._get_typed(index, _ID_SHORT)
+
+    def get_int(self, index: int) -> int:
+        return self._get_typed(index, _ID_INT)
+
+    def get_long(self, index: int) -> int:
+        return self._get_typed(index, _ID_LONG)
+
+    def get_float(self, index: int) -> float:
+        return self._get_typed(index, _ID_FLOAT)
+
+    def get_double(self, index: int) -> float:
+        return self._get_typed(index, _ID_DOUBLE)
+
+    def get_str(self, index: int) -> str:
+        return self._get_typed(index, _ID_STRING)
+
+    def get_byte_array(self, index: int) -> numpy.ndarray:
+        return self._get_typed(index, _ID_BYTE_ARRAY)
+
+    def get_int_array(self, index: int) -> numpy.ndarray:
+        return self._get_typed(index, _ID_INT_ARRAY)
+
+    def get_long_array(self, index: int) -> numpy.ndarray:
+        return self._get_typed(index, _ID_LONG_ARRAY)
+
+    def get_list(self, index: int) -> TAG_List:
+        return self._get_typed(index, _ID_LIST)
+
+    def get_compound(self, index: int) -> TAG_Compound:
+        return self._get_typed(index, _ID_COMPOUND)
+
+    def get_bytes(self) -> List[int]:
+        return self._get_typed_all(_ID_BYTE)
+
+    def get_shorts(self) -> List[int]:
+        return self._get_typed_all(_ID_SHORT)
+
+    def get_ints(self) -> List[int]:
+        return self._get_typed_all(_ID_INT)
+
+    def get_longs(self) -> List[int]:
+        return self._get_typed_all(_ID_LONG)
+
+    def get_floats(self) -> List[float]:
+        return self._get_typed_all(_ID_FLOAT)
+
+    def get_doubles(self) -> List[float]:
+        return self._get_typed_all(_ID_DOUBLE)
+
+    def get_strs(self) -> List[str]:
+        return self._get_typed_all(_ID_STRING)
+
+    cdef void write_value(self, buffer, little_endian) except *:
+        write_container(self, buffer, little_endian)
 
 
 class TAG_List(_TAG_List, MutableSequence):
     pass
 
 
+cdef inline _TAG_List new_list(object cls, list value, char list_data_type):
+    cdef _TAG_List tag = _TAG_List.__new__(<type> cls)
+    tag._value = value
+    tag.list_data_type = list_data_type
+    return tag
+
+
+# Scalar children of a compound can be stored unboxed. The key stays in the
+# compound's dictionary to keep its position but maps to an index into a C
+# array of these slots. The tag object is only created when Python asks for it.
+ctypedef union _Scalar:
+    char b
+    short s
+    int i
+    long long l
+    float f
+    double d
+
+ctypedef struct _ScalarSlot:
+    char tag_id
+    _Scalar value
+
+cdef int read_scalar(char tag_id, buffer_context context, bint little_endian, _Scalar *value) except -1:
+    if tag_id == _ID_BYTE:
+        value.b = read_data(context, 1)[0]
+    elif tag_id == _ID_SHORT:
+        value.s = (<short *> read_data(context, 2))[0]
+        to_little_endian(&value.s, 2, little_endian)
+    elif tag_id == _ID_INT:
+        value.i = (<int *> read_data(context, 4))[0]
+        to_little_endian(&value.i, 4, little_endian)
+    elif tag_id == _ID_LONG:
+        value.l = (<long long *> read_data(context, 8))[0]
+        to_little_endian(&value.l, 8, little_endian)
+    elif tag_id == _ID_FLOAT:
+        value.f = (<float *> read_data(context, 4))[0]
+        to_little_endian(&value.f, 4, little_endian)
+    elif tag_id == _ID_DOUBLE:
+        value.d = (<double *> read_data(context, 8))[0]
+        to_little_endian(&value.d, 8, little_endian)
+    return 0
+
+cdef void write_scalar(_ScalarSlot *slot, object buffer, bint little_endian):
+    cdef char tag_id = slot.tag_id
+    if tag_id == _ID_BYTE:
+        write_byte(slot.value.b, buffer)
+    elif tag_id == _ID_SHORT:
+        write_short(slot.value.s, buffer, little_endian)
+    elif tag_id == _ID_INT:
+        write_int(slot.value.i, buffer, little_endian)
+    elif tag_id == _ID_LONG:
+        write_long(slot.value.l, buffer, little_endian)
+    elif tag_id == _ID_FLOAT:
+        write_float(slot.value.f, buffer, little_endian)
+    elif tag_id == _ID_DOUBLE:
+        write_double(slot.value.d, buffer, little_endian)
+
+cdef _TAG_Value box_scalar(_ScalarSlot *slot):
+    cdef char tag_id = slot.tag_id
+    cdef TAG_Float float_tag
+    cdef TAG_Double double_tag
+    if tag_id == _ID_BYTE:
+        return make_byte(slot.value.b)
+    elif tag_id == _ID_SHORT:
+        return make_short(slot.value.s)
+    elif tag_id == _ID_INT:
+        return make_int(slot.value.i)
+    elif tag_id == _ID_LONG:
+        return make_long(slot.value.l)
+    elif tag_id == _ID_FLOAT:
+        float_tag = TAG_Float.__new__(TAG_Float)
+        float_tag.value = slot.value.f
+        return float_tag
+    else:
+        double_tag = TAG_Double.__new__(TAG_Double)
+        double_tag.value = slot.value.d
+        return double_tag
+
+cdef object unbox_scalar(_ScalarSlot *slot):
+    cdef char tag_id = slot.tag_id
+    if tag_id == _ID_BYTE:
+        return slot.value.b
+    elif tag_id == _ID_SHORT:
+        return slot.value.s
+    elif tag_id == _ID_INT:
+        return slot.value.i
+    elif tag_id == _ID_LONG:
+        return slot.value.l
+    elif tag_id == _ID_FLOAT:
+        return slot.value.f
+    else:
+        return slot.value.d
+
+cdef char fast_tag_id(object tag) except -1:
+    """The tag id of a tag without looking up the class attribute for the common types."""
+    cdef type cls = type(tag)
+    if cls is TAG_Byte:
+        return _ID_BYTE
+    elif cls is TAG_Short:
+        return _ID_SHORT
+    elif cls is TAG_Int:
+        return _ID_INT
+    elif cls is TAG_Long:
+        return _ID_LONG
+    elif cls is TAG_Float:
+        return _ID_FLOAT
+    elif cls is TAG_Double:
+        return _ID_DOUBLE
+    elif cls is TAG_String:
+        return _ID_STRING
+    elif cls is TAG_Compound:
+        return _ID_COMPOUND
+    elif cls is TAG_List:
+        return _ID_LIST
+    elif cls is TAG_Byte_Array:
+        return _ID_BYTE_ARRAY
+    elif cls is TAG_Int_Array:
+        return _ID_INT_ARRAY
+    elif cls is TAG_Long_Array:
+        return _ID_LONG_ARRAY
+    elif cls is RawTag:
+        return _ID_RAW
+    return tag.tag_id
+
+cdef object native_value(_TAG_Value tag):
+    """The value of a tag as a native Python object. Containers are returned as they are."""
+    cdef char tag_id = fast_tag_id(tag)
+    if tag_id == _ID_BYTE:
+        return (<TAG_Byte> tag).value
+    elif tag_id == _ID_SHORT:
+        return (<TAG_Short> tag).value
+    elif tag_id == _ID_INT:
+        return (<TAG_Int> tag).value
+    elif tag_id == _ID_LONG:
+        return (<TAG_Long> tag).value
+    elif tag_id == _ID_FLOAT:
+        return (<TAG_Float> tag).value
+    elif tag_id == _ID_DOUBLE:
+        return (<TAG_Double> tag).value
+    elif tag_id == _ID_STRING:
+        return (<TAG_String> tag).py_str
+    elif tag_id == _ID_BYTE_ARRAY or tag_id == _ID_INT_ARRAY or tag_id == _ID_LONG_ARRAY:
+        return (<_TAG_Array> tag).value
+    return tag
+
+
+cdef inline void check_entry(object key, object value) except *:
+    if not isinstance(key, str):
+        raise TypeError(
+            f"TAG_Compound key must be a string. Got {key.__class__.__name__}"
+        )
+    if not isinstance(value, _TAG_Value):
+        raise TypeError(
+            f"Invalid type {value.__class__.__name__} for key \"{key}\" in TAG_Compound. Must be an NBT object."
+        )
+
+
+cdef class _ScalarSlots:
+    """Owns the unboxed scalar slots of a compound so that copies of the compound can share them.
+    Slots are only added while a compound is being decoded so they never change once shared."""
+    cdef _ScalarSlot *slots
+    cdef Py_ssize_t count
+    cdef Py_ssize_t capacity
+
+    def __dealloc__(self):
+        free(self.slots)
+
+
 cdef class _TAG_Compound(_TAG_Value):
     tag_id = _ID_COMPOUND
-    cdef public dict value
+    cdef dict _value
+    cdef _ScalarSlot *_slots
+    cdef _ScalarSlots _slot_owner
+    # True if _value may be shared with a snapshot and must be copied before it is modified.
+    cdef bint _shared
+    # True if a mutable child may be referenced from outside the tree. See snapshot_escaped.
+    cdef bint _escaped
+    cdef _TagCache _cache
 
     def __init__(self, value = None):
         self.value = value or {}
-        for key, value in self.value.items():
-            self._check_entry(key, value)
+        for key, value in self._value.items():
+            check_entry(key, value)
 
-    @staticmethod
-    def _check_entry(key: str, value: AnyNBT):
-        if not isinstance(key, str):
-            raise TypeError(
-                f"TAG_Compound key must be a string. Got {key.__class__.__name__}"
-            )
-        if not isinstance(value, _TAG_Value):
-            raise TypeError(
-                f"Invalid type {value.__class__.__name__} for key \"{key}\" in TAG_Compound. Must be an NBT object."
-            )
+    @classmethod
+    def from_trusted(cls, dict value):
+        """Create a TAG_Compound that owns value without validating it.
+        The caller must guarantee that every key is a str and every value an NBT object."""
+        cdef _TAG_Compound tag = new_compound(cls, value)
+        tag._escaped = True
+        return tag
 
-    cpdef str _to_snbt(self):
-        cdef str name
-        cdef _TAG_Value elem
-        cdef list tags = []
-        for name, elem in self.value.items():
-            if _NON_QUOTED_KEY.match(name) is None:
-                tags.append(f'"{name}": {elem.to_snbt()}')
-            else:
-                tags.append(f'{name}: {elem.to_snbt()}')
-        return f"{{{CommaSpace.join(tags)}}}"
+    def __deepcopy__(self, memo=None):
+        return self._deepcopy()
+
+    cdef _TAG_Value _deepcopy(self):
+        return deepcopy_container(self)
+
+    cdef _TAG_Value _snapshot(self):
+        cdef _TAG_Compound tag
+        if self._escaped:
+            return snapshot_escaped(self)
+        tag = new_compound(type(self), self._value)
+        tag._share_slots(self)
+        tag._cache = self._cache
+        tag._shared = self._shared = True
+        return tag
+
+    cdef int _unshare(self) except -1:
+        """Called before the compound is modified. Drop the cache and if the dictionary is shared
+        give this compound its own copy. Mutable children are replaced with snapshots of themselves."""
+        cdef dict value
+        self._cache = None
+        if self._shared and Py_REFCNT(<PyObject *> self._value) > 1:
+            value = self._value.copy()
+            for key, item in self._value.items():
+                if type(item) is not int and is_mutable(fast_tag_id(item)):
+                    value[key] = (<_TAG_Value> item)._snapshot()
+            self._value = value
+        self._shared = False
+        return 0
+
+    def update_trusted(self, value):
+        """Update the compound from a dictionary or TAG_Compound without validating the entries."""
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        if isinstance(value, _TAG_Compound):
+            value = (<_TAG_Compound> value).value
+        self._value.update(value)
 
-    cpdef str _pretty_to_snbt(self, indent_chr="", indent_count=0, leading_indent=True):
-        cdef str name
-        cdef _TAG_Value elem
-        cdef list tags = []
-        for name, elem in self.value.items():
-            tags.append(f'{indent_chr * (indent_count + 1)}"{name}": {elem._pretty_to_snbt(indent_chr, indent_count + 1, False)}')
-        if tags:
-            return f"{indent_chr * indent_count * leading_indent}{{\n{CommaNewline.join(tags)}\n{indent_chr * indent_count}}}"
+    @property
+    def value(self):
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        self._resolve_all()
+        return self._value
+
+    @value.setter
+    def value(self, dict value):
+        self._value = value
+        self._shared = False
+        self._escaped = True
+        self._cache = None
+        self._clear_slots()
+
+    cdef void _clear_slots(self):
+        self._slot_owner = None
+        self._slots = NULL
+
+    cdef void _share_slots(self, _TAG_Compound other):
+        self._slot_owner = other._slot_owner
+        self._slots = other._slots
+
+    cdef _Scalar *_add_scalar(self, str key, char tag_id) except NULL:
+        """Store an unboxed scalar under key and return the location to write its value to."""
+        cdef _ScalarSlots owner = self._slot_owner
+        cdef Py_ssize_t capacity
+        cdef _ScalarSlot *slots
+        if owner is None:
+            owner = self._slot_owner = _ScalarSlots.__new__(_ScalarSlots)
+        if owner.count == owner.capacity:
+            capacity = owner.capacity * 2 or 8
+            slots = <_ScalarSlot *> realloc(owner.slots, capacity * sizeof(_ScalarSlot))
+            if slots is NULL:
+                raise MemoryError()
+            owner.slots = self._slots = slots
+            owner.capacity = capacity
+        slots = &owner.slots[owner.count]
+        slots.tag_id = tag_id
+        self._value[key] = owner.count
+        owner.count += 1
+        return &slots.value
+
+    cdef _TAG_Value _box(self, object key, object index):
+        """Create the tag for an unboxed scalar and store it in place of the slot index."""
+        cdef _TAG_Value tag = box_scalar(&self._slots[<Py_ssize_t> index])
+        self._value[key] = tag
+        return tag
+
+    cdef void _resolve_all(self) except *:
+        """Box the unboxed scalars and decode the raw entries so that every value is a normal tag.
+        Decoded tags are mutable so the dictionary must not be shared."""
+        cdef PyObject *key
+        cdef PyObject *entry
+        cdef Py_ssize_t pos = 0
+        # replacing the values of existing keys is allowed while iterating a dictionary
+        while PyDict_Next(self._value, &pos, &key, &entry):
+            if type(<object> entry) is int:
+                self._value[<object> key] = box_scalar(&self._slots[<Py_ssize_t> <object> entry])
+            elif type(<object> entry) is RawTag:
+                self._value[<object> key] = (<RawTag> <object> entry).decode()
+        self._clear_slots()
+
+    cdef _TAG_Value _get_tag(self, object key):
+        cdef object tag = self._value[key]
+        if type(tag) is int:
+            return self._box(key, tag)
+        if type(tag) is RawTag:
+            # raw entries are decoded the first time they are asked for
+            self._expose()
+            tag = (<RawTag> tag).decode()
+            self._value[key] = tag
+            return tag
+        if is_mutable(fast_tag_id(tag)):
+            self._expose()
+            return self._value[key]
+        return tag
+
+    cdef void _expose(self) except *:
+        """Called before a mutable child is handed out."""
+        if self._shared:
+            self._unshare()
+        self._escaped = True
+
+    cdef object _get_typed(self, object key, char tag_id, object default):
+        cdef PyObject *item
+        cdef object tag
+        cdef char found_id
+        if is_mutable(tag_id):
+            self._expose()
+        item = PyDict_GetItem(self._value, key)
+        if item is NULL:
+            return default
+        tag = <object> item
+        if type(tag) is int:
+            found_id = self._slots[<Py_ssize_t> tag].tag_id
+            if found_id == tag_id:
+                return unbox_scalar(&self._slots[<Py_ssize_t> tag])
         else:
-            return f"{indent_chr * indent_count * leading_indent}{{}}"
+            if type(tag) is RawTag:
+                tag = self._get_tag(key)
+            found_id = fast_tag_id(tag)
+            if found_id == tag_id:
+                return native_value(tag)
+        raise TypeError(
+            f"Expected {TAG_NAMES[tag_id]} for key \"{key}\" in TAG_Compound but got {TAG_NAMES[found_id]}"
+        )
 
-    cdef void write_value(self, buffer, little_endian):
-        cdef str key
-        cdef _TAG_Value stag
+    cdef list _get_typed_many(self, object keys, char tag_id, object default):
+        cdef list values = []
+        for key in keys:
+            values.append(self._get_typed(key, tag_id, default))
+        return values
 
-        for key, stag in self.value.items():
-            write_tag_id(stag.tag_id, buffer)
-            write_tag_name(key, buffer, little_endian)
-            stag.write_value(buffer, little_endian)
-        write_tag_id(ID_END, buffer)
+    def get_byte(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, _ID_BYTE, default)
+
+    def get_short(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, _ID_SHORT, default)
+
+    def get_int(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, _ID_INT, default)
+
+    def get_long(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, _ID_LONG, default)
+
+    def get_float(self, key: str, default=None) -> Optional[float]:
+        return self._get_typed(key, _ID_FLOAT, default)
+
+    def get_double(self, key: str, default=None) -> Optional[float]:
+        return self._get_typed(key, _ID_DOUBLE, default)
+
+    def get_str(self, key: str, default=None) -> Optional[str]:
+        return self._get_typed(key, _ID_STRING, default)
+
+    def get_byte_array(self, key: str, default=None) -> Optional[numpy.ndarray]:
+        return self._get_typed(key, _ID_BYTE_ARRAY, default)
+
+    def get_int_array(self, key: str, default=None) -> Optional[numpy.ndarray]:
+        return self._get_typed(key, _ID_INT_ARRAY, default)
+
+    def get_long_array(self, key: str, default=None) -> Optional[numpy.ndarray]:
+        return self._get_typed(key, _ID_LONG_ARRAY, default)
+
+    def get_list(self, key: str, default=None) -> Optional[TAG_List]:
+        return self._get_typed(key, _ID_LIST, default)
+
+    def get_compound(self, key: str, default=None) -> Optional[TAG_Compound]:
+        return self._get_typed(key, _ID_COMPOUND, default)
+
+    def get_bytes(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, _ID_BYTE, default)
+
+    def get_shorts(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, _ID_SHORT, default)
+
+    def get_ints(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, _ID_INT, default)
+
+    def get_longs(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, _ID_LONG, default)
+
+    def get_floats(self, keys: Iterable[str], default=None) -> List[Optional[float]]:
+        return self._get_typed_many(keys, _ID_FLOAT, default)
+
+    def get_doubles(self, keys: Iterable[str], default=None) -> List[Optional[float]]:
+        return self._get_typed_many(keys, _ID_DOUBLE, default)
+
+    def get_strs(self, keys: Iterable[str], default=None) -> List[Optional[str]]:
+        return self._get_typed_many(keys, _ID_STRING, default)
+
+    @staticmethod
+    def _check_entry(key: str, value: AnyNBT):
+        check_entry(key, value)
+
+    cdef void write_value(self, buffer, little_endian) except *:
+        write_container(self, buffer, little_endian)
 
     def write_payload(self, buffer, name="", little_endian=False):
         write_tag_id(self.tag_id, buffer)
@@ -959,29 +2257,953 @@ cdef class _TAG_Compound(_TAG_Value):
         write_tag_value(self, buffer, little_endian)
 
     def __getitem__(self, key: str) -> AnyNBT:
-        return self.value[key]
+        return self._get_tag(key)
 
     def __setitem__(self, key: str, value: AnyNBT):
-        self._check_entry(key, value)
-        self.value[key] = value
+        check_entry(key, value)
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        self._value[key] = value
 
     def __delitem__(self, key: str):
-        del self.value[key]
+        if self._shared or self._cache is not None:
+            self._unshare()
+        del self._value[key]
 
-    def __iter__(self) -> Iterator[AnyNBT]:
-        yield from self.value
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._value)
 
     def __contains__(self, key: str) -> bool:
-        return key in self.value
+        return key in self._value
 
     def __len__(self) -> int:
-        return self.value.__len__()
+        return self._value.__len__()
+
+    def __eq__(self, other):
+        if isinstance(other, _TAG_Compound):
+            return tags_equal(self, other, False)
+        if self._shared:
+            self._unshare()
+        self._resolve_all()
+        return self._value == other
+
+    def keys(self):
+        if self._shared:
+            self._unshare()
+        return self._value.keys()
+
+    def values(self):
+        return self.value.values()
+
+    def items(self):
+        return self.value.items()
+
+    def get(self, key: str, default=None) -> Optional[AnyNBT]:
+        if key in self._value:
+            return self._get_tag(key)
+        return default
+
+    def get_raw(self, key: str, default=None) -> Optional[AnyNBT]:
+        """Get an entry without decoding it.
+        A :class:`RawTag` is returned for an entry loaded through raw_paths that has not been decoded yet.
+        Other entries are returned as by :meth:`get`."""
+        cdef PyObject *item = PyDict_GetItem(self._value, key)
+        if item is not NULL and type(<object> item) is RawTag:
+            return <object> item
+        return self.get(key, default)
+
+    def pop(self, key: str, default=_MISSING) -> AnyNBT:
+        cdef PyObject *item
+        cdef object tag
+        if self._shared or self._cache is not None:
+            self._unshare()
+        item = PyDict_GetItem(self._value, key)
+        if item is NULL:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        tag = <object> item
+        if type(tag) is int:
+            tag = box_scalar(&self._slots[<Py_ssize_t> tag])
+        elif type(tag) is RawTag:
+            tag = (<RawTag> tag).decode()
+        del self._value[key]
+        return tag
+
+    def popitem(self) -> Tuple[str, AnyNBT]:
+        """Remove and return the first key and tag pair. Raises KeyError if the compound is empty."""
+        cdef PyObject *first
+        cdef PyObject *entry
+        cdef Py_ssize_t pos = 0
+        cdef object key
+        if not PyDict_Next(self._value, &pos, &first, &entry):
+            raise KeyError("popitem(): TAG_Compound is empty")
+        # the dictionary reference is released by pop
+        key = <object> first
+        return key, self.pop(key)
+
+    def clear(self):
+        self.value = {}
+
+    def setdefault(self, key: str, default: AnyNBT = None) -> AnyNBT:
+        cdef PyObject *item
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        item = PyDict_GetItem(self._value, key)
+        if item is NULL:
+            check_entry(key, default)
+            self._value[key] = default
+            return default
+        return self._get_tag(key)
+
+    def update(self, other=(), **kwargs):
+        cdef dict entries
+        if self._shared or self._cache is not None:
+            self._unshare()
+        self._escaped = True
+        if isinstance(other, _TAG_Compound) and not kwargs:
+            # entries of another compound have already been validated.
+            self._value.update((<_TAG_Compound> other).value)
+            return
+        entries = dict(other, **kwargs)
+        for key, value in entries.items():
+            check_entry(key, value)
+        self._value.update(entries)
 
 
 class TAG_Compound(_TAG_Compound, MutableMapping):
     pass
 
 
+cdef inline _TAG_Compound new_compound(object cls, dict value):
+    cdef _TAG_Compound tag = _TAG_Compound.__new__(<type> cls)
+    tag._value = value
+    return tag
+
+
+# A list or compound that has handed out or been given a mutable child cannot share its storage with a
+# snapshot. The child may be modified through a reference held outside the tree and the change would show
+# in both. Instead the snapshot gets its own storage holding snapshots of the children and this tag keeps
+# the original children. Children that have not escaped are still shared lazily so only the escaped part of
+# the tree is walked. A container stops being marked as escaped once no mutable child is referenced elsewhere.
+
+@cython.final
+@cython.freelist(64)
+cdef class _SnapshotFrame:
+    """A list or compound whose snapshot is being filled in."""
+    cdef _TAG_Value tag
+    cdef _TAG_Value copy
+    cdef bint is_list
+    # the position of the next child to snapshot
+    cdef Py_ssize_t pos
+    # True if a mutable child is referenced from outside the tree
+    cdef bint escaped
+
+
+cdef _SnapshotFrame open_snapshot_frame(_TAG_Value tag):
+    cdef _SnapshotFrame frame = _SnapshotFrame.__new__(_SnapshotFrame)
+    cdef _TAG_Compound compound
+    cdef _TAG_List tag_list
+    frame.tag = tag
+    if isinstance(tag, _TAG_Compound):
+        compound = <_TAG_Compound> tag
+        frame.copy = new_compound(type(tag), compound._value.copy())
+        (<_TAG_Compound> frame.copy)._share_slots(compound)
+        (<_TAG_Compound> frame.copy)._cache = compound._cache
+    else:
+        tag_list = <_TAG_List> tag
+        frame.is_list = True
+        frame.copy = new_list(type(tag), list(tag_list._value), tag_list.list_data_type)
+        (<_TAG_List> frame.copy)._cache = tag_list._cache
+    return frame
+
+
+cdef _TAG_Value snapshot_escaped(_TAG_Value tag):
+    """Snapshot a list or compound with escaped children.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    # the containers that the one being copied is in
+    cdef list stack = []
+    cdef _SnapshotFrame frame = open_snapshot_frame(tag)
+    cdef _SnapshotFrame child_frame
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef object child
+    cdef char tag_id
+    cdef bint child_escaped
+    while True:
+        if frame.is_list:
+            if frame.pos >= len((<_TAG_List> frame.tag)._value):
+                entry = NULL
+            else:
+                entry = PyList_GET_ITEM((<_TAG_List> frame.tag)._value, frame.pos)
+                frame.pos += 1
+        elif not PyDict_Next((<_TAG_Compound> frame.tag)._value, &frame.pos, &key, &entry):
+            entry = NULL
+
+        if entry is NULL:
+            # the container is finished
+            if frame.is_list:
+                (<_TAG_List> frame.tag)._escaped = frame.escaped
+            else:
+                (<_TAG_Compound> frame.tag)._escaped = frame.escaped
+            if not stack:
+                return frame.copy
+            child_escaped = frame.escaped
+            frame = stack.pop()
+            frame.escaped = frame.escaped or child_escaped
+            continue
+
+        if type(<object> entry) is int:
+            continue
+        tag_id = fast_tag_id(<object> entry)
+        if not is_mutable(tag_id):
+            continue
+        # one reference is held by the tag and one by the copy
+        if Py_REFCNT(entry) > 2:
+            frame.escaped = True
+        child = <object> entry
+        if (
+            (tag_id == _ID_LIST and (<_TAG_List> child)._escaped)
+            or (tag_id == _ID_COMPOUND and (<_TAG_Compound> child)._escaped)
+        ):
+            child_frame = open_snapshot_frame(child)
+            child = child_frame.copy
+        else:
+            child_frame = None
+            child = (<_TAG_Value> child)._snapshot()
+        if frame.is_list:
+            (<_TAG_List> frame.copy)._value[frame.pos - 1] = child
+        else:
+            (<_TAG_Compound> frame.copy)._value[<object> key] = child
+        if child_frame is not None:
+            stack.append(frame)
+            frame = child_frame
+
+
+cdef _TAG_Value copy_container(_TAG_Value tag):
+    """A list or compound with its own storage holding the children of tag."""
+    cdef _TAG_Compound compound
+    if isinstance(tag, _TAG_Compound):
+        compound = new_compound(type(tag), (<_TAG_Compound> tag)._value.copy())
+        compound._share_slots(<_TAG_Compound> tag)
+        return compound
+    return new_list(type(tag), list((<_TAG_List> tag)._value), (<_TAG_List> tag).list_data_type)
+
+
+cdef _TAG_Value deepcopy_container(_TAG_Value tag):
+    """Deep copy a list or compound.
+    The copies of nested lists and compounds are kept on a list of copies whose children still need
+    copying rather than recursed into."""
+    cdef _TAG_Value root = copy_container(tag)
+    cdef list pending = [root]
+    cdef list children
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef Py_ssize_t pos
+    cdef object child
+    cdef char tag_id
+    while pending:
+        tag = pending.pop()
+        if isinstance(tag, _TAG_List):
+            tag_id = (<_TAG_List> tag).list_data_type
+            if not is_mutable(tag_id):
+                continue
+            children = (<_TAG_List> tag)._value
+            for pos in range(len(children)):
+                child = <object> PyList_GET_ITEM(children, pos)
+                if tag_id == _ID_LIST or tag_id == _ID_COMPOUND:
+                    child = copy_container(child)
+                    pending.append(child)
+                else:
+                    child = (<_TAG_Value> child)._deepcopy()
+                children[pos] = child
+        else:
+            pos = 0
+            # replacing the values of existing keys is allowed while iterating a dictionary
+            while PyDict_Next((<_TAG_Compound> tag)._value, &pos, &key, &entry):
+                if type(<object> entry) is int:
+                    continue
+                tag_id = fast_tag_id(<object> entry)
+                if tag_id == _ID_LIST or tag_id == _ID_COMPOUND:
+                    child = copy_container(<object> entry)
+                    pending.append(child)
+                elif is_mutable(tag_id):
+                    child = (<_TAG_Value> <object> entry)._deepcopy()
+                else:
+                    continue
+                (<_TAG_Compound> tag)._value[<object> key] = child
+    return root
+
+
+cdef class RawTag(_TAG_Value):
+    """The encoded value of a tag that is kept as it was loaded.
+
+    :func:`load` creates these for the entries at raw_paths. Saving one in the byte order it was loaded
+    with writes the bytes back unchanged without decoding them. Anything that needs the content
+    decodes it once. A RawTag can only be stored in a TAG_Compound. Getting it from the compound
+    with any method other than get_raw replaces it with the decoded tag."""
+    cdef char _tag_id
+    cdef readonly bytes payload
+    cdef readonly bint little_endian
+    cdef _TAG_Value _tree
+
+    def __init__(self, char tag_id, bytes payload, bint little_endian = False):
+        if not _ID_BYTE_ARRAY <= tag_id < _ID_MAX:
+            raise ValueError(f"A RawTag cannot hold a tag with id {tag_id}")
+        self._tag_id = tag_id
+        self.payload = payload
+        self.little_endian = little_endian
+
+    @property
+    def tag_id(self) -> int:
+        """The id of the encoded tag."""
+        return self._tag_id
+
+    @property
+    def value(self):
+        return self.decode().value
+
+    def decode(self) -> AnyNBT:
+        """The decoded tag. Each call returns a new snapshot so modifying it does not change this tag."""
+        return self._decoded()._snapshot()
+
+    cdef _TAG_Value _decoded(self):
+        """The decoded tag shared by every use of this tag. It must not be modified."""
+        cdef buffer_context context
+        if self._tree is None:
+            context = buffer_context()
+            context.buffer = self.payload
+            context.size = len(self.payload)
+            # load has already limited the depth of the payloads it created
+            context.max_depth = PY_SSIZE_T_MAX
+            tag = load_tag(self._tag_id, context, self.little_endian)
+            if context.offset != context.size:
+                raise NBTFormatError(
+                    f"RawTag payload has {context.size - context.offset:d} bytes after the end of the tag"
+                )
+            self._tree = tag
+        return self._tree
+
+    def copy(self):
+        return self.decode()
+
+    def freeze(self):
+        return self._decoded().freeze()
+
+    cdef void write_value(self, buffer, little_endian) except *:
+        if <bint> little_endian == self.little_endian:
+            buffer.write(self.payload)
+        else:
+            self._decoded().write_value(buffer, little_endian)
+
+    def __eq__(self, other):
+        return self._decoded() == resolve_raw(other)
+
+    def __hash__(self):
+        return hash(self._decoded())
+
+    def __repr__(self):
+        return f"RawTag({TAG_NAMES[self._tag_id]}, {len(self.payload):d} bytes)"
+
+    def __reduce__(self):
+        return RawTag, (self._tag_id, self.payload, self.little_endian)
+
+
+cdef inline RawTag new_raw(char tag_id, bytes payload, bint little_endian):
+    cdef RawTag tag = RawTag.__new__(RawTag)
+    tag._tag_id = tag_id
+    tag.payload = payload
+    tag.little_endian = little_endian
+    return tag
+
+
+cdef inline object resolve_raw(object tag):
+    """The decoded tag of a RawTag. Other tags are returned as they are."""
+    if type(tag) is RawTag:
+        return (<RawTag> tag)._decoded()
+    return tag
+
+
+cdef inline bint is_numeric(char tag_id):
+    return _ID_BYTE <= tag_id <= _ID_DOUBLE
+
+
+cdef inline bint is_array(char tag_id):
+    return tag_id == _ID_BYTE_ARRAY or tag_id == _ID_INT_ARRAY or tag_id == _ID_LONG_ARRAY
+
+
+cdef class _SNBTWriter:
+    """A growable buffer that SNBT is written into as UTF-8."""
+    cdef char *data
+    cdef Py_ssize_t size
+    cdef Py_ssize_t capacity
+
+    def __dealloc__(self):
+        free(self.data)
+
+    cdef char *reserve(self, Py_ssize_t count) except NULL:
+        """Make room for count more bytes and return where they go."""
+        cdef Py_ssize_t capacity
+        cdef char *data
+        if self.size + count > self.capacity:
+            capacity = max(self.capacity * 2, self.size + count, 256)
+            data = <char *> realloc(self.data, capacity)
+            if data is NULL:
+                raise MemoryError()
+            self.data = data
+            self.capacity = capacity
+        return self.data + self.size
+
+    cdef int write(self, const char *value, Py_ssize_t count) except -1:
+        memcpy(self.reserve(count), value, count)
+        self.size += count
+        return 0
+
+    cdef int write_char(self, char value) except -1:
+        self.reserve(1)[0] = value
+        self.size += 1
+        return 0
+
+    cdef int write_str(self, str value) except -1:
+        cdef Py_ssize_t count
+        cdef const char *data = PyUnicode_AsUTF8AndSize(value, &count)
+        return self.write(data, count)
+
+    cdef int write_indent(self, bytes indent, Py_ssize_t count) except -1:
+        cdef Py_ssize_t i
+        for i in range(count):
+            self.write(indent, len(indent))
+        return 0
+
+    cdef int write_quoted(self, const unsigned char *value, Py_ssize_t count) except -1:
+        """Write UTF-8 text in double quotes escaping backslashes and quotes."""
+        cdef Py_ssize_t i
+        cdef char *out = self.reserve(count * 2 + 2)
+        cdef char *start = out
+        out[0] = b'"'
+        out += 1
+        for i in range(count):
+            if value[i] == b'\\' or value[i] == b'"':
+                out[0] = b'\\'
+                out += 1
+            out[0] = value[i]
+            out += 1
+        out[0] = b'"'
+        self.size += out - start + 1
+        return 0
+
+    cdef int write_int(self, long long value) except -1:
+        cdef char digits[20]
+        cdef int count = 0
+        # work with the magnitude as unsigned so the smallest long does not overflow
+        cdef unsigned long long magnitude = <unsigned long long> value
+        if value < 0:
+            magnitude = -magnitude
+        while True:
+            digits[19 - count] = c'0' + magnitude % 10
+            count += 1
+            magnitude //= 10
+            if magnitude == 0:
+                break
+        if value < 0:
+            self.write_char(b'-')
+        return self.write(digits + 20 - count, count)
+
+    cdef int write_float(self, double value, bint single) except -1:
+        """Write the shortest decimal that reads back as the same value without an exponent."""
+        cdef char *text
+        cdef int low = 1, high = 9, precision
+        if isinf(value):
+            return self.write_str("-inf" if value < 0 else "inf")
+        elif isnan(value):
+            return self.write_str("nan")
+        if single:
+            # the shortest precision that survives the parser's double to float conversion
+            while low < high:
+                precision = (low + high) // 2
+                text = PyOS_double_to_string(value, b'e', precision - 1, 0, NULL)
+                try:
+                    if <float> PyOS_string_to_double(text, NULL, NULL) == <float> value:
+                        high = precision
+                    else:
+                        low = precision + 1
+                finally:
+                    PyMem_Free(text)
+            text = PyOS_double_to_string(value, b'e', low - 1, 0, NULL)
+        else:
+            text = PyOS_double_to_string(value, b'r', 0, 0, NULL)
+        try:
+            self.write_positional(text)
+        finally:
+            PyMem_Free(text)
+        return 0
+
+    cdef int write_positional(self, const char *text) except -1:
+        """Write a number given with an optional exponent in positional notation."""
+        cdef char digits[32]
+        cdef int count = 0, point = -1, i
+        if text[0] == b'-':
+            self.write_char(b'-')
+            text += 1
+        while text[0] != 0 and text[0] != b'e':
+            if text[0] == b'.':
+                point = count
+            else:
+                digits[count] = text[0]
+                count += 1
+            text += 1
+        if point == -1:
+            point = count
+        if text[0] == b'e':
+            point += atoi(text + 1)
+        i = 0
+        while i < count and digits[i] == b'0':
+            i += 1
+        point -= i
+        while count > i and digits[count - 1] == b'0':
+            count -= 1
+        if i == count:
+            return self.write(b"0.0", 3)
+        if point <= 0:
+            self.write(b"0.", 2)
+            while point < 0:
+                self.write_char(b'0')
+                point += 1
+            self.write(digits + i, count - i)
+        elif point >= count - i:
+            self.write(digits + i, count - i)
+            while point > count - i:
+                self.write_char(b'0')
+                point -= 1
+            self.write(b".0", 2)
+        else:
+            self.write(digits + i, point)
+            self.write_char(b'.')
+            self.write(digits + i + point, count - i - point)
+        return 0
+
+    cdef str take(self):
+        """The text in the buffer. The buffer is emptied so it can be filled again."""
+        cdef str value = PyUnicode_DecodeUTF8(self.data, self.size, NULL)
+        self.size = 0
+        return value
+
+
+cdef int write_snbt_scalar(_SNBTWriter writer, _ScalarSlot *slot) except -1:
+    cdef char tag_id = slot.tag_id
+    if tag_id == _ID_BYTE:
+        writer.write_int(slot.value.b)
+        writer.write_char(b'b')
+    elif tag_id == _ID_SHORT:
+        writer.write_int(slot.value.s)
+        writer.write_char(b's')
+    elif tag_id == _ID_INT:
+        writer.write_int(slot.value.i)
+    elif tag_id == _ID_LONG:
+        writer.write_int(slot.value.l)
+        writer.write_char(b'L')
+    elif tag_id == _ID_FLOAT:
+        writer.write_float(slot.value.f, True)
+        writer.write_char(b'f')
+    elif tag_id == _ID_DOUBLE:
+        writer.write_float(slot.value.d, False)
+        writer.write_char(b'd')
+    return 0
+
+
+cdef int write_snbt_key(_SNBTWriter writer, str key, bint quote) except -1:
+    cdef Py_ssize_t count, i
+    cdef const unsigned char *data = <const unsigned char *> PyUnicode_AsUTF8AndSize(key, &count)
+    cdef unsigned char c
+    if not quote and count:
+        # keys made of letters, digits and dashes are written without quotes
+        for i in range(count):
+            c = data[i]
+            if not (b'a' <= c <= b'z' or b'A' <= c <= b'Z' or b'0' <= c <= b'9' or c == b'-'):
+                quote = True
+                break
+    else:
+        quote = True
+    if quote:
+        writer.write_quoted(data, count)
+    else:
+        writer.write(<const char *> data, count)
+    return writer.write(b": ", 2)
+
+
+cdef Py_ssize_t SNBT_CHUNK_SIZE = 65536
+
+
+cdef bytes snbt_indent(object indent_chr):
+    """The UTF-8 indent for an indent_chr argument or None for compact output."""
+    if isinstance(indent_chr, int):
+        return b" " * indent_chr
+    elif isinstance(indent_chr, str):
+        return indent_chr.encode("utf-8")
+    return None
+
+
+cdef class _SNBTFrame:
+    """A container or array that is open while its SNBT is written."""
+    cdef char tag_id
+    cdef Py_ssize_t depth
+    cdef Py_ssize_t index
+    # the items of a list or the entries of a compound
+    cdef object items
+    cdef _TAG_Compound compound
+    cdef const long long[::1] array
+
+
+cdef class _SNBTEmitter:
+    """Writes the SNBT of a tag into a buffer a piece at a time.
+    Open containers are kept on a stack rather than recursed into so writing can stop whenever the
+    buffer is full and continue later. The tag must not be modified until everything is written."""
+    cdef _SNBTWriter writer
+    cdef bytes indent
+    cdef list stack
+    cdef object tag
+    cdef Py_ssize_t depth
+
+    def __cinit__(self, tag, bytes indent, Py_ssize_t depth):
+        self.writer = _SNBTWriter()
+        self.indent = indent
+        self.stack = []
+        self.tag = tag
+        self.depth = depth
+
+    cdef bint fill(self, Py_ssize_t size) except -1:
+        """Write until the buffer holds at least size bytes.
+        Returns False once all of the SNBT has been written."""
+        cdef _SNBTFrame frame
+        cdef object item
+        cdef object tag = self.tag
+        if tag is not None:
+            self.tag = None
+            self.open(tag, self.depth)
+        while self.stack and self.writer.size < size:
+            frame = self.stack[-1]
+            if is_array(frame.tag_id):
+                self.write_array(frame, size)
+                continue
+            item = next(frame.items, _MISSING)
+            if item is _MISSING:
+                self.close(frame)
+                continue
+            if frame.index:
+                self.writer.write_char(b',')
+                if self.indent is None:
+                    self.writer.write_char(b' ')
+            if self.indent is not None:
+                self.writer.write_char(b'\n')
+                self.writer.write_indent(self.indent, frame.depth + 1)
+            frame.index += 1
+            if frame.tag_id == _ID_COMPOUND:
+                # pretty output always quotes keys
+                write_snbt_key(self.writer, item[0], self.indent is not None)
+                item = item[1]
+                if type(item) is int:
+                    write_snbt_scalar(self.writer, &frame.compound._slots[<Py_ssize_t> item])
+                    continue
+            self.open(item, frame.depth + 1)
+        return bool(self.stack)
+
+    cdef int open(self, object tag, Py_ssize_t depth) except -1:
+        """Write a tag that is not a container or array or push a frame for it."""
+        cdef _SNBTWriter writer = self.writer
+        cdef _SNBTFrame frame
+        cdef char tag_id
+        tag = resolve_raw(tag)
+        tag_id = fast_tag_id(tag)
+        if tag_id == _ID_BYTE:
+            writer.write_int((<TAG_Byte> tag).value)
+            writer.write_char(b'b')
+        elif tag_id == _ID_SHORT:
+            writer.write_int((<TAG_Short> tag).value)
+            writer.write_char(b's')
+        elif tag_id == _ID_INT:
+            writer.write_int((<TAG_Int> tag).value)
+        elif tag_id == _ID_LONG:
+            writer.write_int((<TAG_Long> tag).value)
+            writer.write_char(b'L')
+        elif tag_id == _ID_FLOAT:
+            writer.write_float((<TAG_Float> tag).value, True)
+            writer.write_char(b'f')
+        elif tag_id == _ID_DOUBLE:
+            writer.write_float((<TAG_Double> tag).value, False)
+            writer.write_char(b'd')
+        elif tag_id == _ID_STRING:
+            writer.write_quoted((<TAG_String> tag).py_bytes, len((<TAG_String> tag).py_bytes))
+        else:
+            frame = _SNBTFrame()
+            frame.tag_id = tag_id
+            frame.depth = depth
+            if tag_id == _ID_LIST:
+                writer.write_char(b'[')
+                frame.items = iter((<_TAG_List> tag)._value)
+            elif tag_id == _ID_COMPOUND:
+                writer.write_char(b'{')
+                frame.compound = <_TAG_Compound> tag
+                frame.items = iter(frame.compound._value.items())
+            elif is_array(tag_id):
+                writer.write(b"[B;" if tag_id == _ID_BYTE_ARRAY else b"[I;" if tag_id == _ID_INT_ARRAY else b"[L;", 3)
+                frame.array = numpy.ascontiguousarray((<_TAG_Array> tag)._value, dtype=numpy.int64)
+            else:
+                raise NotImplementedError(f"Cannot write {tag.__class__.__name__} as SNBT")
+            self.stack.append(frame)
+        return 0
+
+    cdef int write_array(self, _SNBTFrame frame, Py_ssize_t size) except -1:
+        cdef _SNBTWriter writer = self.writer
+        cdef const long long[::1] array = frame.array
+        cdef Py_ssize_t i = frame.index
+        cdef char suffix = 0
+        if frame.tag_id == _ID_BYTE_ARRAY:
+            suffix = b'B'
+        elif frame.tag_id == _ID_LONG_ARRAY:
+            suffix = b'L'
+        while i < array.shape[0] and writer.size < size:
+            if i:
+                writer.write(b", ", 2)
+            writer.write_int(array[i])
+            if suffix:
+                writer.write_char(suffix)
+            i += 1
+        frame.index = i
+        if i == array.shape[0]:
+            writer.write_char(b']')
+            self.stack.pop()
+        return 0
+
+    cdef int close(self, _SNBTFrame frame) except -1:
+        if self.indent is not None and frame.index:
+            self.writer.write_char(b'\n')
+            self.writer.write_indent(self.indent, frame.depth)
+        self.writer.write_char(b'}' if frame.tag_id == _ID_COMPOUND else b']')
+        self.stack.pop()
+        return 0
+
+
+# returned by compare_tags for two lists or compounds that are equal if their children are
+DEF _COMPARE_CHILDREN = 2
+
+@cython.final
+@cython.freelist(64)
+cdef class _EqualFrame:
+    """A pair of lists or compounds whose children are being compared."""
+    cdef _TAG_Value a
+    cdef _TAG_Value b
+    cdef bint is_list
+    # the position of the next child to compare
+    cdef Py_ssize_t pos
+
+    cdef tuple memo_key(self):
+        return id(self.a), id(self.b)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef bint tags_equal(object a, object b, bint strict, set memo = None) except -1:
+    """Compare two tags structurally, stopping at the first difference.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into.
+    If memo is given the ids of the pairs of lists and compounds found to differ are added to it and
+    comparing one of those pairs again returns without walking its children."""
+    cdef list stack = []
+    cdef _EqualFrame frame
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef PyObject *other
+    cdef object tag
+    cdef object other_tag
+    cdef int result = compare_tags(a, b, strict)
+    if result != _COMPARE_CHILDREN:
+        return result
+    frame = open_equal_frame(a, b)
+    if memo and frame.memo_key() in memo:
+        return False
+    while True:
+        if frame.is_list:
+            if frame.pos >= len((<_TAG_List> frame.a)._value):
+                if not stack:
+                    return True
+                frame = stack.pop()
+                continue
+            tag = (<_TAG_List> frame.a)._value[frame.pos]
+            other_tag = (<_TAG_List> frame.b)._value[frame.pos]
+            frame.pos += 1
+            result = compare_tags(tag, other_tag, strict)
+        else:
+            if not PyDict_Next((<_TAG_Compound> frame.a)._value, &frame.pos, &key, &entry):
+                if not stack:
+                    return True
+                frame = stack.pop()
+                continue
+            other = PyDict_GetItem((<_TAG_Compound> frame.b)._value, <object> key)
+            if other is NULL:
+                result = False
+                break
+            tag = <object> entry
+            other_tag = <object> other
+            if type(tag) is int or type(other_tag) is int:
+                result = entries_equal(<_TAG_Compound> frame.a, tag, <_TAG_Compound> frame.b, other_tag, strict)
+            else:
+                result = compare_tags(tag, other_tag, strict)
+        if result == _COMPARE_CHILDREN:
+            stack.append(frame)
+            frame = open_equal_frame(tag, other_tag)
+        elif not result:
+            break
+    # the pairs being compared all differ
+    if memo is not None:
+        memo.add(frame.memo_key())
+        for frame in stack:
+            memo.add(frame.memo_key())
+    return False
+
+
+cdef _EqualFrame open_equal_frame(_TAG_Value a, _TAG_Value b):
+    cdef _EqualFrame frame = _EqualFrame.__new__(_EqualFrame)
+    frame.a = resolve_raw(a)
+    frame.b = resolve_raw(b)
+    frame.is_list = fast_tag_id(frame.a) == _ID_LIST
+    return frame
+
+
+cdef int compare_tags(object a, object b, bint strict) except -1:
+    """Compare two tags without looking at the children of lists and compounds.
+    Returns 0 or 1 if the result is known and _COMPARE_CHILDREN if the children must be compared."""
+    cdef char tag_id = fast_tag_id(a)
+    cdef char other_id = fast_tag_id(b)
+    if a is b:
+        return True
+    if tag_id == _ID_RAW or other_id == _ID_RAW:
+        # a decoded tag is never raw so this does not recurse further
+        return compare_tags(resolve_raw(a), resolve_raw(b), strict)
+    if tag_id != other_id:
+        if strict:
+            return False
+        if is_numeric(tag_id) and is_numeric(other_id):
+            return native_value(a) == native_value(b)
+        if is_array(tag_id) and is_array(other_id):
+            return arrays_equal((<_TAG_Array> a)._value, (<_TAG_Array> b)._value)
+        return False
+    if tag_id == _ID_BYTE:
+        return (<TAG_Byte> a).value == (<TAG_Byte> b).value
+    if tag_id == _ID_SHORT:
+        return (<TAG_Short> a).value == (<TAG_Short> b).value
+    if tag_id == _ID_INT:
+        return (<TAG_Int> a).value == (<TAG_Int> b).value
+    if tag_id == _ID_LONG:
+        return (<TAG_Long> a).value == (<TAG_Long> b).value
+    if tag_id == _ID_FLOAT:
+        return (<TAG_Float> a).value == (<TAG_Float> b).value
+    if tag_id == _ID_DOUBLE:
+        return (<TAG_Double> a).value == (<TAG_Double> b).value
+    if tag_id == _ID_STRING:
+        return (<TAG_String> a).py_bytes == (<TAG_String> b).py_bytes
+    if tag_id == _ID_LIST:
+        return compare_list_headers(<_TAG_List> a, <_TAG_List> b, strict)
+    if tag_id == _ID_COMPOUND:
+        return compare_compound_headers(<_TAG_Compound> a, <_TAG_Compound> b)
+    if is_array(tag_id):
+        return arrays_equal((<_TAG_Array> a)._value, (<_TAG_Array> b)._value)
+    return a == b
+
+
+cdef bint slots_equal(_ScalarSlot *a, _ScalarSlot *b, bint strict) except -1:
+    if a.tag_id != b.tag_id:
+        return not strict and unbox_scalar(a) == unbox_scalar(b)
+    if a.tag_id == _ID_BYTE:
+        return a.value.b == b.value.b
+    if a.tag_id == _ID_SHORT:
+        return a.value.s == b.value.s
+    if a.tag_id == _ID_INT:
+        return a.value.i == b.value.i
+    if a.tag_id == _ID_LONG:
+        return a.value.l == b.value.l
+    if a.tag_id == _ID_FLOAT:
+        return a.value.f == b.value.f
+    return a.value.d == b.value.d
+
+
+cdef bint slot_equals_tag(_ScalarSlot *slot, object tag, bint strict) except -1:
+    cdef char tag_id = fast_tag_id(tag)
+    if slot.tag_id != tag_id:
+        return not strict and is_numeric(tag_id) and unbox_scalar(slot) == native_value(tag)
+    if tag_id == _ID_BYTE:
+        return slot.value.b == (<TAG_Byte> tag).value
+    if tag_id == _ID_SHORT:
+        return slot.value.s == (<TAG_Short> tag).value
+    if tag_id == _ID_INT:
+        return slot.value.i == (<TAG_Int> tag).value
+    if tag_id == _ID_LONG:
+        return slot.value.l == (<TAG_Long> tag).value
+    if tag_id == _ID_FLOAT:
+        return slot.value.f == (<TAG_Float> tag).value
+    return slot.value.d == (<TAG_Double> tag).value
+
+
+cdef bint entries_equal(_TAG_Compound a, object tag, _TAG_Compound b, object other, bint strict) except -1:
+    """Compare an entry of compound a with an entry of compound b where at least one is an unboxed slot index.
+    Compounds are compared without boxing their unboxed scalars."""
+    if type(tag) is int:
+        if type(other) is int:
+            return slots_equal(&a._slots[<Py_ssize_t> tag], &b._slots[<Py_ssize_t> other], strict)
+        return slot_equals_tag(&a._slots[<Py_ssize_t> tag], other, strict)
+    return slot_equals_tag(&b._slots[<Py_ssize_t> other], tag, strict)
+
+
+cdef inline int compare_compound_headers(_TAG_Compound a, _TAG_Compound b) except -1:
+    if a._value is b._value:
+        return True
+    if len(a._value) != len(b._value):
+        return False
+    return _COMPARE_CHILDREN if a._value else True
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline int compare_list_headers(_TAG_List a, _TAG_List b, bint strict) except -1:
+    cdef Py_ssize_t i
+    cdef int result
+    if a._value is b._value:
+        return True
+    if len(a._value) != len(b._value):
+        return False
+    if strict and a._value and a.list_data_type != b.list_data_type:
+        return False
+    if a.list_data_type == _ID_LIST or a.list_data_type == _ID_COMPOUND:
+        return _COMPARE_CHILDREN if a._value else True
+    # the elements have no children so they are compared in one go
+    for i in range(len(a._value)):
+        result = compare_tags(a._value[i], b._value[i], strict)
+        if result != True:
+            return result
+    return True
+
+
+cdef bint arrays_equal(object a, object b) except -1:
+    """Compare two numpy arrays. Arrays with the same layout are compared as raw bytes."""
+    cdef Py_buffer a_buffer
+    cdef Py_buffer b_buffer
+    cdef bint equal
+    if a is b:
+        return True
+    if a.shape != b.shape:
+        return False
+    if a.dtype == b.dtype and a.flags.c_contiguous and b.flags.c_contiguous:
+        PyObject_GetBuffer(a, &a_buffer, PyBUF_SIMPLE)
+        try:
+            PyObject_GetBuffer(b, &b_buffer, PyBUF_SIMPLE)
+            equal = memcmp(a_buffer.buf, b_buffer.buf, a_buffer.len) == 0
+            PyBuffer_Release(&b_buffer)
+        finally:
+            PyBuffer_Release(&a_buffer)
+        return equal
+    return numpy.array_equal(a, b)
+
+
 class NBTFile:
     __annotations__ = {'value': 'TAG_Compound', 'name': 'str'}
 
@@ -992,9 +3214,26 @@ class NBTFile:
     def to_snbt(self, indent_chr=None) -> str:
         return self.value.to_snbt(indent_chr)
 
-    def save_to(self, filepath_or_buffer=None, compressed=True, little_endian=False) -> Optional[bytes]:
+    def write_snbt(self, fp, indent_chr=None):
+        self.value.write_snbt(fp, indent_chr)
+
+    def iter_snbt(self, indent_chr=None):
+        return self.value.iter_snbt(indent_chr)
+
+    def save_to(self, filepath_or_buffer=None, compressed=True, little_endian=False, bint incremental=False) -> Optional[bytes]:
+        """Save the data in binary NBT format.
+        If incremental is True the binary value of every container is cached and reused by the next
+        incremental save unless it has been modified. Arrays are encoded every time. This makes saving
+        a mostly unchanged tree much faster at the cost of memory. Changes made through a reference to
+        a container value obtained before the previous save are not detected."""
+        cdef unsigned long long stamp
         buffer = BytesIO()
-        self.value.write_payload(buffer, self.name, little_endian)
+        if incremental and is_mutable(fast_tag_id(self.value)):
+            write_tag_id(self.value.tag_id, buffer)
+            write_tag_name(self.name, buffer, little_endian)
+            buffer.write(cached_encoding(self.value, little_endian, &stamp))
+        else:
+            self.value.write_payload(buffer, self.name, little_endian)
         data = buffer.getvalue()
 
         if compressed:
@@ -1056,11 +3295,28 @@ def load(
     offset: bool = False,
     little_endian: bool = False,
     buffer=None,  # TODO: this should get depreciated and removed.
+    share_identical: Union[bool, InternPool] = False,
+    raw_paths: Iterable[Union[str, Sequence[str]]] = None,
+    Py_ssize_t max_depth = _MAX_DEPTH,
+    Limits limits = None,
 ) -> Union[NBTFile, Tuple[Union[NBTFile, List[NBTFile]], int]]:
+    """Load binary NBT.
+    If share_identical is True or an :class:`InternPool` identical subtrees share their storage.
+    The compound entries at raw_paths are not decoded and are loaded as :class:`RawTag`.
+    A path is a string of compound keys separated by dots or a sequence of keys. Lists are passed
+    through so "Level.Entities.Items" matches the Items of every compound in the Entities list.
+    More than max_depth lists and compounds nested in each other raise an NBTLimitError.
+    Pass :class:`Limits` to bound the work done for untrusted input. Its max_depth replaces max_depth."""
+    cdef Py_ssize_t max_bytes = PY_SSIZE_T_MAX
+    if limits is not None:
+        max_bytes = _limit_size(limits.max_bytes)
+        max_depth = _limit_size(limits.max_depth)
     if isinstance(filepath_or_buffer, str):
         # if a string load from the file path
         if not os.path.isfile(filepath_or_buffer):
             raise NBTLoadError(f"There is no file at {filepath_or_buffer}")
+        if os.path.getsize(filepath_or_buffer) > max_bytes:
+            raise NBTLimitError(f"NBT is larger than the maximum of {max_bytes:d} bytes")
         with open(filepath_or_buffer, "rb") as f:
             data_in = f.read()
     else:
@@ -1075,19 +3331,36 @@ def load(
         elif isinstance(filepath_or_buffer, memoryview):
             data_in = filepath_or_buffer
         elif hasattr(filepath_or_buffer, "read"):
-            data_in = filepath_or_buffer.read()
+            if max_bytes == PY_SSIZE_T_MAX:
+                data_in = filepath_or_buffer.read()
+            else:
+                # never read more than one byte past the limit
+                data_in = filepath_or_buffer.read(max_bytes + 1)
             if not isinstance(data_in, bytes):
                 raise NBTLoadError(f"buffer.read() must return a bytes object. Got {type(data_in)} instead.")
         else:
             raise NBTLoadError("buffer did not have a read method.")
 
+    if len(data_in) > max_bytes:
+        raise NBTLimitError(f"NBT is larger than the maximum of {max_bytes:d} bytes")
+
     if compressed:
-        data_in = safe_gunzip(data_in)
+        data_in = safe_gunzip(data_in, -1 if limits is None else _limit_size(limits.max_decompressed))
 
     cdef buffer_context context = buffer_context()
     context.offset = 0
     context.buffer = data_in
     context.size = len(data_in)
+    if isinstance(share_identical, InternPool):
+        context.pool = share_identical
+    elif share_identical:
+        context.pool = InternPool()
+    if raw_paths is not None:
+        context.raw_paths = raw_path_tree(raw_paths)
+    context.max_depth = max_depth
+    if limits is not None:
+        context.nodes = context.max_nodes = _limit_size(limits.max_nodes)
+        context.max_array_len = _limit_size(limits.max_array_len)
 
     results = []
 
@@ -1101,7 +3374,7 @@ def load(
         context.offset += 1
 
         name = load_name(context, little_endian)
-        tag = load_compound_tag(context, little_endian)
+        tag = load_container(_ID_COMPOUND, context, little_endian, None)
 
         results.append(NBTFile(tag, name))
 
@@ -1114,29 +3387,22 @@ def load(
     return results
 
 cdef TAG_Byte load_byte(buffer_context context, bint little_endian):
-    cdef TAG_Byte tag = TAG_Byte(read_data(context, 1)[0])
-    return tag
+    return make_byte(read_data(context, 1)[0])
 
 cdef TAG_Short load_short(buffer_context context, bint little_endian):
-    cdef short*pointer = <short*> read_data(context, 2)
-    cdef TAG_Short tag = TAG_Short.__new__(TAG_Short)
-    tag.value = pointer[0]
-    to_little_endian(&tag.value, 2, little_endian)
-    return tag
+    cdef short value = (<short*> read_data(context, 2))[0]
+    to_little_endian(&value, 2, little_endian)
+    return make_short(value)
 
 cdef TAG_Int load_int(buffer_context context, bint little_endian):
-    cdef int*pointer = <int*> read_data(context, 4)
-    cdef TAG_Int tag = TAG_Int.__new__(TAG_Int)
-    tag.value = pointer[0]
-    to_little_endian(&tag.value, 4, little_endian)
-    return tag
+    cdef int value = (<int*> read_data(context, 4))[0]
+    to_little_endian(&value, 4, little_endian)
+    return make_int(value)
 
 cdef TAG_Long load_long(buffer_context context, bint little_endian):
-    cdef long long *pointer = <long long *> read_data(context, 8)
-    cdef TAG_Long tag = TAG_Long.__new__(TAG_Long)
-    tag.value = pointer[0]
-    to_little_endian(&tag.value, 8, little_endian)
-    return tag
+    cdef long long value = (<long long *> read_data(context, 8))[0]
+    to_little_endian(&value, 8, little_endian)
+    return make_long(value)
 
 cdef TAG_Float load_float(buffer_context context, bint little_endian):
     cdef float*pointer = <float*> read_data(context, 4)
@@ -1152,21 +3418,24 @@ cdef TAG_Double load_double(buffer_context context, bint little_endian):
     to_little_endian(&tag.value, 8, little_endian)
     return tag
 
-cdef _TAG_Compound load_compound_tag(buffer_context context, bint little_endian):
-    cdef char tagID
-    #cdef str name
-    cdef _TAG_Compound root_tag = TAG_Compound()
-    #cdef _TAG_Value tag
-    cdef tuple tup
-
-    while True:
-        tagID = read_data(context, 1)[0]
-        if tagID == _ID_END:
-            break
+cdef dict raw_path_tree(object raw_paths):
+    """Convert paths to a tree of dictionaries keyed by compound key with True at the raw entries.
+    A path is a sequence of keys or a string of keys separated by dots."""
+    cdef dict tree = {}
+    cdef object node
+    for path in raw_paths:
+        keys = path.split(".") if isinstance(path, str) else list(path)
+        if not keys:
+            raise ValueError("A raw path must not be empty")
+        node = tree
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+            if node is True:
+                # a parent is already raw
+                break
         else:
-            tup = load_named(context, tagID, little_endian)
-            root_tag[tup[0]] = tup[1]
-    return root_tag
+            node[keys[-1]] = True
+    return tree or None
 
 cdef bytes load_string(buffer_context context, bint little_endian):
     cdef unsigned short *pointer = <unsigned short *> read_data(context, 2)
@@ -1180,6 +3449,7 @@ cdef TAG_Byte_Array load_byte_array(buffer_context context, bint little_endian):
     cdef int length = pointer[0]
 
     to_little_endian(&length, 4, little_endian)
+    check_array_length(context, length)
 
     byte_length = length
     cdef char*arr = read_data(context, byte_length)
@@ -1190,6 +3460,7 @@ cdef TAG_Int_Array load_int_array(buffer_context context, bint little_endian):
     cdef int*pointer = <int*> read_data(context, 4)
     cdef int length = pointer[0]
     to_little_endian(&length, 4, little_endian)
+    check_array_length(context, length)
 
     byte_length = length * 4
     cdef char*arr = read_data(context, byte_length)
@@ -1200,25 +3471,183 @@ cdef TAG_Long_Array load_long_array(buffer_context context, bint little_endian):
     cdef int*pointer = <int*> read_data(context, 4)
     cdef int length = pointer[0]
     to_little_endian(&length, 4, little_endian)
+    check_array_length(context, length)
 
     byte_length = length * 8
     cdef char*arr = read_data(context, byte_length)
     cdef object data_type = TAG_Long_Array.little_endian_data_type if little_endian else TAG_Long_Array.big_endian_data_type
     return TAG_Long_Array(numpy.frombuffer(arr[:byte_length], dtype=data_type, count=length))
 
-cdef _TAG_List load_list(buffer_context context, bint little_endian):
-    cdef char list_type = read_data(context, 1)[0]
-    cdef int*pointer = <int*> read_data(context, 4)
-    cdef int length = pointer[0]
-    to_little_endian(&length, 4, little_endian)
+def patch_inplace(
+    buffer,
+    path: Union[str, Sequence[str]],
+    tag: AnyNBT,
+    bint little_endian = False,
+    size_t offset = 0,
+):
+    """Overwrite the value at path inside uncompressed binary NBT without decoding the rest of it.
+    buffer must be writable, for example a bytearray or mmap. offset is where the NBT starts in it.
+    path is a string of keys separated by dots or a sequence of keys from the root compound.
+    List elements are selected by index.
+    The new value must have the same type and encoded size as the old one so that nothing after
+    it moves. This is always true of numbers and of arrays with the same length."""
+    cdef Py_buffer view
+    cdef buffer_context context = buffer_context()
+    cdef char tag_id
+    cdef size_t start
+    cdef bytes encoded
+    PyObject_GetBuffer(buffer, &view, PyBUF_SIMPLE | PyBUF_WRITABLE)
+    try:
+        context.buffer = <char *> view.buf
+        context.size = view.len
+        context.offset = offset
+        if read_data(context, 1)[0] != _ID_COMPOUND:
+            raise NBTFormatError(f"Expecting tag type {ID_COMPOUND} at offset {offset:d}")
+        # the name of the root
+        skip_tag(_ID_STRING, context, little_endian)
+        tag_id = _ID_COMPOUND
+        for key in path.split(".") if isinstance(path, str) else path:
+            tag_id = find_child(tag_id, str(key), context, little_endian)
+        start = context.offset
+        skip_tag(tag_id, context, little_endian)
+
+        if tag.tag_id != tag_id:
+            raise TypeError(f"Expected {TAG_NAMES[tag_id]} at {path} but got {tag.__class__.__name__}")
+        data = BytesIO()
+        (<_TAG_Value?> tag).write_value(data, little_endian)
+        encoded = data.getvalue()
+        if <size_t> len(encoded) != context.offset - start:
+            raise ValueError(
+                f"The value at {path} is {context.offset - start:d} bytes but the new value is {len(encoded):d}"
+            )
+        memcpy(context.buffer + start, <char *> encoded, len(encoded))
+    finally:
+        PyBuffer_Release(&view)
+
+cdef char find_child(char tag_id, str key, buffer_context context, bint little_endian) except -1:
+    """Move context from the start of a compound or list value to the value of its child key
+    and return the id of the child."""
+    cdef bytes name
+    cdef char child_id
+    cdef char *data
+    cdef unsigned short name_length
+    cdef int length
+    cdef Py_ssize_t index
+    cdef size_t width
+    if tag_id == _ID_COMPOUND:
+        name = key.encode("utf-8")
+        while True:
+            child_id = read_data(context, 1)[0]
+            if child_id == _ID_END:
+                raise KeyError(key)
+            name_length = (<unsigned short *> read_data(context, 2))[0]
+            to_little_endian(&name_length, 2, little_endian)
+            data = read_data(context, name_length)
+            if name_length == len(name) and memcmp(data, <char *> name, name_length) == 0:
+                return child_id
+            skip_tag(child_id, context, little_endian)
+    elif tag_id == _ID_LIST:
+        child_id = read_data(context, 1)[0]
+        length = (<int *> read_data(context, 4))[0]
+        to_little_endian(&length, 4, little_endian)
+        index = int(key)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f"List index {key} out of range")
+        width = fixed_width(child_id)
+        if width:
+            read_data(context, width * index)
+        else:
+            for _ in range(index):
+                skip_tag(child_id, context, little_endian)
+        return child_id
+    raise NBTError(f"Patch path goes through a {TAG_NAMES[tag_id]}")
+
+@cython.final
+@cython.freelist(64)
+cdef class _WriteFrame:
+    """A list or compound that is open while it is encoded."""
+    # None for a list
+    cdef _TAG_Compound compound
+    cdef list items
+    cdef char list_type
+    # the position of the next entry to write
+    cdef Py_ssize_t pos
+
+
+cdef _WriteFrame open_write_frame(_TAG_Value tag, object buffer, bint little_endian):
+    """Write the header of a list or compound and return its frame."""
+    cdef _WriteFrame frame = _WriteFrame.__new__(_WriteFrame)
+    cdef _TAG_List tag_list
+    if isinstance(tag, _TAG_List):
+        tag_list = <_TAG_List> tag
+        frame.list_type = tag_list.list_data_type
+        frame.items = tag_list._value
+        write_tag_id(frame.list_type, buffer)
+        write_int(<int> len(frame.items), buffer, little_endian)
+    else:
+        frame.compound = <_TAG_Compound> tag
+    return frame
+
+
+cdef void write_container(_TAG_Value tag, object buffer, bint little_endian) except *:
+    """Write the value of a list or compound.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    # the containers that the one being written is in
+    cdef list stack = []
+    cdef _WriteFrame frame = open_write_frame(tag, buffer, little_endian)
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef _TAG_Value child
+    cdef _ScalarSlot *slot
+    cdef char tag_id
+    while True:
+        if frame.compound is not None:
+            if not PyDict_Next(frame.compound._value, &frame.pos, &key, &entry):
+                write_tag_id(_ID_END, buffer)
+                if not stack:
+                    return
+                frame = stack.pop()
+                continue
+            if type(<object> entry) is int:
+                slot = &frame.compound._slots[<Py_ssize_t> <object> entry]
+                write_tag_id(slot.tag_id, buffer)
+                write_tag_name(<str> key, buffer, little_endian)
+                write_scalar(slot, buffer, little_endian)
+                continue
+            child = <_TAG_Value> entry
+            write_tag_id(child.tag_id, buffer)
+            write_tag_name(<str> key, buffer, little_endian)
+            tag_id = fast_tag_id(child)
+        else:
+            if frame.list_type != _ID_LIST and frame.list_type != _ID_COMPOUND:
+                # the elements do not need a frame so the list is written in one go
+                while frame.pos < len(frame.items):
+                    child = frame.items[frame.pos]
+                    frame.pos += 1
+                    check_list_element(child, frame.list_type)
+                    child.write_value(buffer, little_endian)
+            if frame.pos >= len(frame.items):
+                if not stack:
+                    return
+                frame = stack.pop()
+                continue
+            child = frame.items[frame.pos]
+            frame.pos += 1
+            tag_id = check_list_element(child, frame.list_type)
+        if tag_id == _ID_LIST or tag_id == _ID_COMPOUND:
+            stack.append(frame)
+            frame = open_write_frame(child, buffer, little_endian)
+        else:
+            child.write_value(buffer, little_endian)
 
-    cdef _TAG_List tag = TAG_List(list_data_type=list_type)
-    cdef list val = tag.value
-    cdef int i
-    for i in range(length):
-        PyList_Append(val, load_tag(list_type, context, little_endian))
 
-    return tag
+cdef inline char check_list_element(_TAG_Value tag, char list_type) except -1:
+    cdef char tag_id = fast_tag_id(tag)
+    if tag_id != list_type:
+        raise ValueError("Asked to save TAG_List with different types! Found %s and %s" % (tag.tag_id, list_type))
+    return tag_id
 
 cdef inline void cwrite(object obj, char*buf, size_t length):
     obj.write(buf[:length])
@@ -1317,9 +3746,40 @@ whitespace = re.compile('[ \t\r\n]*')
 int_numeric = re.compile('-?[0-9]+[bBsSlL]?')
 float_numeric = re.compile('-?[0-9]+\.?[0-9]*[fFdD]?')
 alnumplus = re.compile('[-.a-zA-Z0-9_]*')
+slot_name = re.compile('[a-zA-Z_][a-zA-Z0-9_]*')
 comma = re.compile('[ \t\r\n]*,[ \t\r\n]*')
 colon = re.compile('[ \t\r\n]*:[ \t\r\n]*')
 array_lookup = {'B': TAG_Byte_Array, 'I': TAG_Int_Array, 'L': TAG_Long_Array}
+# the contents of a valid array between the type prefix and the closing bracket
+array_body = {
+    array_type_chr: re.compile(
+        f'[ \t\r\n]*(?:-?[0-9]+{marker}(?:[ \t\r\n]*,[ \t\r\n]*-?[0-9]+{marker})*(?:[ \t\r\n]*,)?)?[ \t\r\n]*'
+    ) for array_type_chr, marker in (('B', 'B?'), ('I', ''), ('L', 'L?'))
+}
+
+cdef object _parse_snbt_array(str body, str array_type_chr):
+    """Convert the contents of an array in one step.
+    Returns None if the contents are not valid or may not fit the array type.
+    The caller must then parse it one element at a time to find the error."""
+    cdef object array_type = array_lookup[array_type_chr]
+    cdef object data_type = array_type.big_endian_data_type
+    cdef object values, limits
+    if array_body[array_type_chr].fullmatch(body) is None:
+        return None
+    body = body.replace(array_type_chr, '').rstrip(' \t\r\n')
+    if body.endswith(','):
+        body = body[:-1]
+    # the contents are validated so the numpy text parser can read them all at once
+    values = numpy.fromstring(body, dtype=numpy.int64, sep=',')
+    if values.size:
+        limits = numpy.iinfo(data_type)
+        if array_type_chr == 'L':
+            # the numpy parser saturates numbers that do not fit in 64 bits
+            if values.min() == limits.min or values.max() == limits.max:
+                return None
+        elif values.min() < limits.min or values.max() > limits.max:
+            return None
+    return array_type(values.astype(data_type))
 
 cdef int _strip_whitespace(str snbt, int index):
     cdef object match
@@ -1352,19 +3812,30 @@ cdef int _strip_colon(str snbt, int index) except -1:
         return match.end()
 
 cdef tuple _capture_string(str snbt, int index):
-    cdef str val, quote
-    cdef bint strict_str
+    cdef str val
+    cdef Py_UCS4 quote, c
+    cdef bint strict_str, escaped = False
     cdef int end_index
     cdef object match
 
-    if snbt[index] in ('"', "'"):
-        quote = snbt[index]
+    quote = snbt[index]
+    if quote == '"' or quote == "'":
         strict_str = True
         index += 1
         end_index = index
-        while not (snbt[end_index] == quote and not (len(snbt[:end_index]) - len(snbt[:end_index].rstrip('\\')))):
-            end_index += 1
-        val = unescape(snbt[index:end_index])
+        # a single pass that steps over the character after each backslash
+        while True:
+            c = snbt[end_index]
+            if c == quote:
+                break
+            elif c == '\\':
+                escaped = True
+                end_index += 2
+            else:
+                end_index += 1
+        val = snbt[index:end_index]
+        if escaped:
+            val = unescape(val)
         index = end_index + 1
     else:
         strict_str = False
@@ -1374,125 +3845,1399 @@ cdef tuple _capture_string(str snbt, int index):
 
     return val, strict_str, index
 
-cdef tuple _parse_snbt_recursive(str snbt, int index=0):
-    cdef dict data_
-    cdef list array
-    cdef str array_type_chr
-    cdef object array_type, first_data_type, int_match, float_match
-    cdef _TAG_Value nested_data, data
+cdef tuple _parse_snbt_array_tag(str snbt, int index):
+    """Parse an array from its type character to after the closing bracket."""
+    cdef list array = []
+    cdef str array_type_chr = snbt[index]
+    cdef object array_type = array_lookup[array_type_chr]
+    cdef _TAG_Value data
     cdef str val
-    cdef bint strict_str
-
+    cdef Py_ssize_t end
+    index += 2
     index = _strip_whitespace(snbt, index)
-    if snbt[index] == '{':
-        data_ = {}
-        index += 1
-        index = _strip_whitespace(snbt, index)
-        while snbt[index] != '}':
-            # read the key
-            key, _, index = _capture_string(snbt, index)
 
-            # get around the colon
-            index = _strip_colon(snbt, index)
+    end = snbt.find(']', index)
+    data = None if end == -1 else _parse_snbt_array(snbt[index:end], array_type_chr)
+    if data is not None:
+        index = end
+    else:
+        # parse one element at a time to report where it is invalid
+        while snbt[index] != ']':
+            match = int_numeric.match(snbt, index)
+            if match is None:
+                raise SNBTParseError(
+                    f'Expected an integer value or ] at {index} but got ->{snbt[index:index + 10]} instead')
+            else:
+                val = match.group()
+                if val[-1].isalpha():
+                    if val[-1] == array_type_chr:
+                        val = val[:-1]
+                    else:
+                        raise SNBTParseError(
+                            f'Expected the datatype marker "{array_type_chr}" at {index} but got ->{snbt[index:index + 10]} instead')
+                array.append(int(val))
+                index = match.end()
+
+            index = _strip_comma(snbt, index, ']')
+        data = array_type(numpy.asarray(array, dtype=array_type.big_endian_data_type))
+    # skip the ]
+    return data, index + 1
+
+cdef tuple _parse_snbt_leaf(str snbt, int index):
+    """Parse a string or number."""
+    cdef _TAG_Value data
+    cdef str val
+    cdef bint strict_str
+    cdef object int_match, float_match
+    val, strict_str, index = _capture_string(snbt, index)
+    if strict_str:
+        data = TAG_String(val)
+    else:
+        int_match = int_numeric.match(val)
+        if int_match is not None and int_match.end() == len(val):
+            # we have an int type
+            if val[-1] in {'b', 'B'}:
+                data = make_byte(int(val[:-1]))
+            elif val[-1] in {'s', 'S'}:
+                data = make_short(int(val[:-1]))
+            elif val[-1] in {'l', 'L'}:
+                data = make_long(int(val[:-1]))
+            else:
+                data = make_int(int(val))
+        else:
+            float_match = float_numeric.match(val)
+            if float_match is not None and float_match.end() == len(val):
+                # we have a float type
+                if val[-1] in {'f', 'F'}:
+                    data = TAG_Float(float(val[:-1]))
+                elif val[-1] in {'d', 'D'}:
+                    data = TAG_Double(float(val[:-1]))
+                else:
+                    data = TAG_Double(float(val))
+            else:
+                # we just have a string type
+                data = TAG_String(val)
+    return data, index
 
-            # load the data and save it to the dictionary
-            nested_data, index = _parse_snbt_recursive(snbt, index)
-            data_[key] = nested_data
+@cython.final
+@cython.freelist(64)
+cdef class _ParseFrame:
+    """A list or compound that is open while it is parsed."""
+    # the entries of a compound or None for a list
+    cdef dict entries
+    # the compound key of the value being parsed
+    cdef str key
+    cdef list items
+    cdef object first_data_type
+    # where the list element being parsed starts
+    cdef int start
+
+class _SNBTSlot(TAG_String):
+    """Where a value is filled in by an :class:`SNBTTemplate`. The value of the string is the slot name."""
+    pass
 
-            index = _strip_comma(snbt, index, '}')
-        data = TAG_Compound(data_)
-        # skip the }
-        index += 1
+cdef tuple _parse_snbt(str snbt, Py_ssize_t max_depth, int index=0, bint template=False):
+    """Parse one value and return it with the index after it.
+    If template is true values written as $name are parsed as _SNBTSlot.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    cdef list stack = []
+    cdef _ParseFrame frame
+    cdef _TAG_Value data
+    cdef Py_UCS4 c
+    cdef int start
 
-    elif snbt[index] == '[':
-        index += 1
+    while True:
         index = _strip_whitespace(snbt, index)
-        if snbt[index:index + 2] in {'B;', 'I;', 'L;'}:
-            # array
-            array = []
-            array_type_chr = snbt[index]
-            array_type = array_lookup[array_type_chr]
-            index += 2
-            index = _strip_whitespace(snbt, index)
-
-            while snbt[index] != ']':
-                match = int_numeric.match(snbt, index)
-                if match is None:
-                    raise SNBTParseError(
-                        f'Expected an integer value or ] at {index} but got ->{snbt[index:index + 10]} instead')
+        c = snbt[index]
+        if c == '[':
+            start = _strip_whitespace(snbt, index + 1)
+            if snbt[start:start + 2] in {'B;', 'I;', 'L;'}:
+                data, index = _parse_snbt_array_tag(snbt, start)
+                c = 0
+        if c == '{' or c == '[':
+            if len(stack) >= max_depth:
+                raise SNBTParseError(f'SNBT is nested deeper than the maximum depth of {max_depth:d} at {index}')
+            frame = _ParseFrame()
+            if c == '{':
+                frame.entries = {}
+            else:
+                frame.items = []
+            index = _strip_whitespace(snbt, index + 1)
+            if snbt[index] != ('}' if c == '{' else ']'):
+                if c == '{':
+                    # read the key and get around the colon
+                    frame.key, _, index = _capture_string(snbt, index)
+                    index = _strip_colon(snbt, index)
                 else:
-                    val = match.group()
-                    if val[-1].isalpha():
-                        if val[-1] == array_type_chr:
-                            val = val[:-1]
-                        else:
-                            raise SNBTParseError(
-                                f'Expected the datatype marker "{array_type_chr}" at {index} but got ->{snbt[index:index + 10]} instead')
-                    array.append(int(val))
-                    index = match.end()
-
-                index = _strip_comma(snbt, index, ']')
-            data = array_type(numpy.asarray(array, dtype=array_type.big_endian_data_type))
-        else:
-            # list
-            array = []
-            first_data_type = None
-            while snbt[index] != ']':
-                nested_data, index_ = _parse_snbt_recursive(snbt, index)
-                if first_data_type is None:
-                    first_data_type = nested_data.__class__
-                if not isinstance(nested_data, first_data_type):
+                    frame.start = index
+                stack.append(frame)
+                continue
+            # an empty container. Skip the } or ]
+            index += 1
+            data = new_compound(TAG_Compound, {}) if c == '{' else TAG_List()
+        elif c == '$' and template:
+            match = slot_name.match(snbt, index + 1)
+            if match is None:
+                raise SNBTParseError(f'Expected a slot name at {index + 1} but got ->{snbt[index + 1:index + 11]} instead')
+            data = _SNBTSlot(match.group())
+            index = match.end()
+        elif c:
+            data, index = _parse_snbt_leaf(snbt, index)
+
+        # add the value to the containers it is in and close those that have ended
+        while stack:
+            frame = stack[-1]
+            if frame.entries is not None:
+                frame.entries[frame.key] = data
+                index = _strip_comma(snbt, index, '}')
+                if snbt[index] != '}':
+                    frame.key, _, index = _capture_string(snbt, index)
+                    index = _strip_colon(snbt, index)
+                    break
+                data = new_compound(TAG_Compound, frame.entries)
+            else:
+                if template and type(data) is _SNBTSlot:
+                    # the type of a slot is checked when the template is filled in
+                    pass
+                elif frame.first_data_type is None:
+                    frame.first_data_type = data.__class__
+                elif not isinstance(data, frame.first_data_type):
                     raise SNBTParseError(
-                        f'Expected type {first_data_type.__name__} but got {nested_data.__class__.__name__} at {index}')
-                else:
-                    index = index_
-                array.append(nested_data)
+                        f'Expected type {frame.first_data_type.__name__} but got {data.__class__.__name__} at {frame.start}')
+                frame.items.append(data)
                 index = _strip_comma(snbt, index, ']')
+                if snbt[index] != ']':
+                    frame.start = index
+                    break
+                data = new_list(TAG_List, frame.items, fast_tag_id(frame.items[0]))
+            # skip the } or ]
+            index += 1
+            stack.pop()
+        else:
+            return data, index
+
+def from_snbt(snbt: str, Py_ssize_t max_depth = _MAX_DEPTH) -> AnyNBT:
+    """Parse SNBT. More than max_depth lists and compounds nested in each other raise an SNBTParseError."""
+    return _from_snbt(snbt, max_depth, False)
+
+cdef _TAG_Value _from_snbt(str snbt, Py_ssize_t max_depth, bint template):
+    try:
+        return _parse_snbt(snbt, max_depth, 0, template)[0]
+    except SNBTParseError as e:
+        raise SNBTParseError(e)
+    except IndexError:
+        raise SNBTParseError('SNBT string is incomplete. Reached the end of the string.')
+
 
-            if first_data_type is None:
-                data = TAG_List()
+cdef inline bint _is_snbt_whitespace(Py_UCS4 c):
+    return c == ' ' or c == '\t' or c == '\r' or c == '\n'
+
+
+cdef class _SNBTSplitter:
+    """Finds the top level values in SNBT text that arrives in pieces.
+    Values are containers, quoted strings or bare values that end at whitespace or the start of the next value.
+    Only the text of the value being read is kept."""
+    cdef list parts
+    cdef bint started
+    cdef bint bare
+    cdef Py_ssize_t depth
+    cdef Py_UCS4 quote
+    cdef bint escaped
+
+    def __cinit__(self):
+        self.parts = []
+
+    cdef list feed(self, str text):
+        """The text of the values that end in the next piece of text."""
+        cdef list values = []
+        cdef Py_ssize_t i = 0, start = 0, length = len(text)
+        cdef Py_UCS4 c
+        while i < length:
+            c = text[i]
+            if not self.started:
+                if not _is_snbt_whitespace(c):
+                    self.started = True
+                    start = i
+                    if c == '{' or c == '[':
+                        self.depth = 1
+                    elif c == '"' or c == "'":
+                        self.quote = c
+                    else:
+                        self.bare = True
+            elif self.quote:
+                if self.escaped:
+                    self.escaped = False
+                elif c == '\\':
+                    self.escaped = True
+                elif c == self.quote:
+                    self.quote = 0
+                    if self.depth == 0:
+                        values.append(self.finish(text[start:i + 1]))
+            elif self.bare:
+                if _is_snbt_whitespace(c) or c == '{' or c == '[' or c == '"' or c == "'":
+                    values.append(self.finish(text[start:i]))
+                    # the character may start the next value
+                    continue
+            elif c == '{' or c == '[':
+                self.depth += 1
+            elif c == '}' or c == ']':
+                self.depth -= 1
+                if self.depth == 0:
+                    values.append(self.finish(text[start:i + 1]))
+            elif c == '"' or c == "'":
+                self.quote = c
+            i += 1
+        if self.started:
+            self.parts.append(text[start:])
+        return values
+
+    cdef str finish(self, str text):
+        self.parts.append(text)
+        text = "".join(self.parts)
+        self.parts.clear()
+        self.started = self.bare = False
+        return text
+
+    cdef str close(self):
+        """The text of the value that is still being read at the end of the input or None."""
+        if self.started:
+            return self.finish("")
+        return None
+
+
+def from_snbt_stream(fp, callback=None, Py_ssize_t max_depth = _MAX_DEPTH):
+    """Parse a series of SNBT values from a text file object or an iterable of strings.
+
+    Values can be one per line or written one after another. The text is read in pieces and only the
+    text of the value being parsed is kept in memory. If callback is given each value is passed to it
+    as soon as it has been parsed and the number of values is returned. Otherwise this returns an
+    iterator of the values. max_depth is passed to :func:`from_snbt`."""
+    cdef Py_ssize_t count = 0
+    values = _iter_snbt_stream(fp, max_depth)
+    if callback is None:
+        return values
+    for value in values:
+        callback(value)
+        count += 1
+    return count
+
+
+def _iter_snbt_stream(fp, Py_ssize_t max_depth):
+    cdef _SNBTSplitter splitter = _SNBTSplitter()
+    cdef str snbt
+    chunks = iter(partial(fp.read, SNBT_CHUNK_SIZE), "") if hasattr(fp, "read") else fp
+    for text in chunks:
+        for snbt in splitter.feed(text):
+            yield from_snbt(snbt, max_depth)
+    snbt = splitter.close()
+    if snbt is not None:
+        yield from_snbt(snbt, max_depth)
+
+
+
+# Tree diffs. A diff is a TAG_List of TAG_Compound operations so that it can be saved like any other NBT.
+# Each operation has an "op" name and a "path" from the root. The path is a TAG_List of TAG_String
+# holding compound keys and list indexes. Indexes are parsed when the path is walked.
+cdef str _OP_SET = "set"  # set "value" at path
+cdef str _OP_DELETE = "delete"  # delete the compound entry at path
+cdef str _OP_INSERT = "insert"  # insert "value" into the list at path
+cdef str _OP_REMOVE = "remove"  # remove the list element at path
+cdef str _OP_ARRAY = "array"  # replace elements "start" to "stop" of the array at path with "value"
+
+
+cdef _TAG_Compound _diff_op(str op, list path, object value = None):
+    cdef dict entries = {
+        "op": TAG_String(op),
+        "path": new_list(TAG_List, [TAG_String(key) for key in path], _ID_STRING),
+    }
+    if value is not None:
+        entries["value"] = (<_TAG_Value> value)._snapshot()
+    return new_compound(TAG_Compound, entries)
+
+
+@cython.final
+@cython.freelist(64)
+cdef class _DiffFrame:
+    """A pair of lists or compounds whose children are being diffed."""
+    cdef _TAG_Value a
+    cdef _TAG_Value b
+    cdef bint is_list
+    # the key of this pair in its parent. None for the root
+    cdef str key
+    # the position of the next child to diff
+    cdef Py_ssize_t pos
+    # lists only. The end of the elements to diff and the length of the common suffix after them
+    cdef Py_ssize_t stop
+    cdef Py_ssize_t end
+
+
+cdef list _diff_path(list stack, _DiffFrame frame, str key):
+    """The path of the child key of frame. stack holds the parents of frame."""
+    cdef list path = []
+    cdef _DiffFrame parent
+    for parent in stack:
+        if parent.key is not None:
+            path.append(parent.key)
+    if frame is not None and frame.key is not None:
+        path.append(frame.key)
+    if key is not None:
+        path.append(key)
+    return path
+
+
+cdef void _diff_tags(list ops, object a, object b, set memo) except *:
+    """Append the operations that turn a into b. a and b must not be equal.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    cdef list stack = []
+    cdef _DiffFrame frame = _diff_pair(ops, stack, None, None, a, b, memo)
+    cdef _DiffFrame child
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef PyObject *item
+    cdef str name
+    cdef object tag
+    cdef object other
+    while frame is not None:
+        if frame.is_list:
+            if frame.pos >= frame.stop:
+                _diff_list_rest(ops, stack, frame)
+                frame = stack.pop() if stack else None
+                continue
+            tag = (<_TAG_List> frame.a)._value[frame.pos]
+            other = (<_TAG_List> frame.b)._value[frame.pos]
+            name = str(frame.pos)
+            frame.pos += 1
+        else:
+            if not PyDict_Next((<_TAG_Compound> frame.b)._value, &frame.pos, &key, &entry):
+                frame = stack.pop() if stack else None
+                continue
+            name = <str> key
+            other = <object> entry
+            if type(other) is int:
+                other = box_scalar(&(<_TAG_Compound> frame.b)._slots[<Py_ssize_t> other])
+            item = PyDict_GetItem((<_TAG_Compound> frame.a)._value, name)
+            if item is NULL:
+                ops.append(_diff_op(_OP_SET, _diff_path(stack, frame, name), other))
+                continue
+            tag = <object> item
+            if type(tag) is int:
+                if not slot_equals_tag(&(<_TAG_Compound> frame.a)._slots[<Py_ssize_t> tag], other, True):
+                    ops.append(_diff_op(_OP_SET, _diff_path(stack, frame, name), other))
+                continue
+        if tags_equal(tag, other, True, memo):
+            continue
+        child = _diff_pair(ops, stack, frame, name, tag, other, memo)
+        if child is not None:
+            stack.append(frame)
+            frame = child
+
+
+cdef _DiffFrame _diff_pair(list ops, list stack, _DiffFrame parent, str key, object a, object b, set memo):
+    """Append the operations for a pair of tags that are not equal.
+    Returns a frame if the children of the pair must be diffed. stack holds the parents of parent."""
+    cdef _DiffFrame frame
+    a = resolve_raw(a)
+    b = resolve_raw(b)
+    cdef char tag_id = fast_tag_id(a)
+    if tag_id != fast_tag_id(b):
+        ops.append(_diff_op(_OP_SET, _diff_path(stack, parent, key), b))
+    elif tag_id == _ID_COMPOUND:
+        for name in (<_TAG_Compound> a)._value:
+            if name not in (<_TAG_Compound> b)._value:
+                ops.append(_diff_op(_OP_DELETE, _diff_path(stack, parent, key) + [name]))
+        frame = _DiffFrame.__new__(_DiffFrame)
+        frame.a = a
+        frame.b = b
+        frame.key = key
+        return frame
+    elif tag_id == _ID_LIST:
+        return _open_diff_list(ops, stack, parent, key, <_TAG_List> a, <_TAG_List> b, memo)
+    elif is_array(tag_id):
+        _diff_array(ops, _diff_path(stack, parent, key), <_TAG_Array> a, <_TAG_Array> b)
+    else:
+        ops.append(_diff_op(_OP_SET, _diff_path(stack, parent, key), b))
+    return None
+
+
+cdef _DiffFrame _open_diff_list(
+    list ops, list stack, _DiffFrame parent, str key, _TAG_List a, _TAG_List b, set memo
+):
+    cdef list a_value = a._value
+    cdef list b_value = b._value
+    cdef Py_ssize_t a_len = len(a_value)
+    cdef Py_ssize_t b_len = len(b_value)
+    cdef Py_ssize_t start = 0
+    cdef Py_ssize_t end = 0
+    cdef _DiffFrame frame
+    if a_len and b_len and a.list_data_type != b.list_data_type:
+        ops.append(_diff_op(_OP_SET, _diff_path(stack, parent, key), b))
+        return None
+    # skip the common prefix and suffix
+    while start < a_len and start < b_len and tags_equal(a_value[start], b_value[start], True, memo):
+        start += 1
+    while end < a_len - start and end < b_len - start and tags_equal(
+        a_value[a_len - end - 1], b_value[b_len - end - 1], True, memo
+    ):
+        end += 1
+    # the elements that are in both are diffed by the caller then the rest are removed or inserted
+    frame = _DiffFrame.__new__(_DiffFrame)
+    frame.a = a
+    frame.b = b
+    frame.is_list = True
+    frame.key = key
+    frame.pos = start
+    frame.stop = min(a_len, b_len) - end
+    frame.end = end
+    return frame
+
+
+cdef void _diff_list_rest(list ops, list stack, _DiffFrame frame) except *:
+    """Append the operations that remove or insert the elements after the ones that are in both lists."""
+    cdef list b_value = (<_TAG_List> frame.b)._value
+    cdef Py_ssize_t a_len = len((<_TAG_List> frame.a)._value)
+    cdef Py_ssize_t b_len = len(b_value)
+    cdef Py_ssize_t start = frame.stop
+    cdef Py_ssize_t i
+    for i in range(a_len - b_len):
+        ops.append(_diff_op(_OP_REMOVE, _diff_path(stack, frame, str(start))))
+    for i in range(start, b_len - frame.end):
+        ops.append(_diff_op(_OP_INSERT, _diff_path(stack, frame, str(i)), b_value[i]))
+
+
+cdef void _diff_array(list ops, list path, _TAG_Array a, _TAG_Array b) except *:
+    cdef object a_value = a._value
+    cdef object b_value = b._value
+    cdef Py_ssize_t a_len = len(a_value)
+    cdef Py_ssize_t b_len = len(b_value)
+    cdef Py_ssize_t common = min(a_len, b_len)
+    cdef Py_ssize_t start, end
+    cdef _TAG_Compound op
+    different = numpy.flatnonzero(a_value[:common] != b_value[:common])
+    start = different[0] if len(different) else common
+    # the suffix may not overlap the prefix
+    different = numpy.flatnonzero(
+        a_value[a_len - common + start:][::-1] != b_value[b_len - common + start:][::-1]
+    )
+    end = different[0] if len(different) else common - start
+    op = _diff_op(_OP_ARRAY, path, type(b)(b_value[start:b_len - end].copy()))
+    op._value["start"] = TAG_Int(start)
+    op._value["stop"] = TAG_Int(a_len - end)
+    ops.append(op)
+
+
+def diff(a: AnyNBT, b: AnyNBT) -> TAG_List:
+    """The list of operations that turn a into b.
+    The result is a TAG_List so it can be saved as NBT. Use :func:`patch` to apply it."""
+    cdef list ops = []
+    # the pairs that differ are found once rather than again at each level above them
+    cdef set memo = set()
+    if not tags_equal(a, b, True, memo):
+        _diff_tags(ops, a, b, memo)
+    return new_list(TAG_List, ops, _ID_COMPOUND)
+
+
+cdef object _patch_child(object container, str key):
+    if isinstance(container, _TAG_Compound):
+        return container[key]
+    elif isinstance(container, _TAG_List):
+        return container[int(key)]
+    raise NBTError(f"Patch path goes through a {container.__class__.__name__}")
+
+
+def patch(tree: AnyNBT, ops: Iterable[TAG_Compound]) -> AnyNBT:
+    """Apply operations created by :func:`diff` to tree in place.
+    Returns the patched tree which is a new object only if the root itself was replaced."""
+    cdef list path
+    cdef str name, key
+    cdef object parent, value
+    for op in ops:
+        name = op.get_str("op")
+        path = op["path"].get_strs()
+        value = op.get("value")
+        if value is not None:
+            value = (<_TAG_Value> value)._snapshot()
+        if not path:
+            if name == _OP_SET:
+                tree = value
+            elif name == _OP_ARRAY:
+                _patch_array(tree, op.get_int("start"), op.get_int("stop"), value.value)
+            else:
+                raise NBTError(f"Cannot apply a {name} operation to the root")
+            continue
+        parent = tree
+        for key in path[:-1]:
+            parent = _patch_child(parent, key)
+        key = path[-1]
+        if name == _OP_SET:
+            if isinstance(parent, _TAG_Compound):
+                parent[key] = value
             else:
-                data = TAG_List(array, first_data_type().tag_id)
+                parent[int(key)] = value
+        elif name == _OP_DELETE:
+            del parent[key]
+        elif name == _OP_INSERT:
+            parent.insert(int(key), value)
+        elif name == _OP_REMOVE:
+            del parent[int(key)]
+        elif name == _OP_ARRAY:
+            _patch_array(_patch_child(parent, key), op.get_int("start"), op.get_int("stop"), value.value)
+        else:
+            raise NBTError(f"Unknown patch operation {name}")
+    return tree
 
-        # skip the ]
-        index += 1
 
+cdef void _patch_array(object tag, Py_ssize_t start, Py_ssize_t stop, object value) except *:
+    if not isinstance(tag, _TAG_Array):
+        raise NBTError(f"Cannot apply an array operation to a {tag.__class__.__name__}")
+    array = tag.value
+    if stop - start == len(value):
+        array[start:stop] = value
     else:
-        val, strict_str, index = _capture_string(snbt, index)
-        if strict_str:
-            data = TAG_String(val)
+        tag.value = numpy.concatenate((array[:start], value.astype(array.dtype), array[stop:]))
+
+
+cdef class Template:
+    """Binary NBT that is encoded once and rendered many times with different values in a few slots.
+
+    slots are the paths of compound entries from the root. A path is a string of keys separated by dots
+    or a sequence of keys. Slot names are the paths as strings. Everything outside the slots is encoded
+    when the template is created so rendering only encodes the new slot values. NBT containers do not
+    store their size so no other bytes need to change."""
+    cdef readonly tuple slots
+    cdef readonly bint little_endian
+    cdef tuple _chunks  # the bytes before each slot and after the last
+    cdef tuple _types
+    cdef tuple _defaults
+    cdef dict _index
+
+    def __init__(
+        self,
+        tree: AnyNBT,
+        slots: Iterable[Union[str, Sequence[str]]] = (),
+        str name = "",
+        bint little_endian = False,
+    ):
+        cdef dict paths = {}
+        cdef object node
+        cdef list chunks = []
+        cdef list found = []
+        for slot in slots:
+            keys = slot.split(".") if isinstance(slot, str) else list(slot)
+            if not keys:
+                raise ValueError("A template slot must not be empty")
+            node = paths
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+                if type(node) is not dict:
+                    raise ValueError("Template slots must not be inside other slots")
+            if keys[-1] in node:
+                raise ValueError("Template slots must not be inside other slots")
+            node[keys[-1]] = ".".join(keys)
+        self.little_endian = little_endian
+
+        buffer = BytesIO()
+        write_tag_id(tree.tag_id, buffer)
+        write_tag_name(name, buffer, little_endian)
+        if paths:
+            if fast_tag_id(tree) != _ID_COMPOUND:
+                raise TypeError(f"Template slots must be in a TAG_Compound. Got {tree.__class__.__name__}")
+            buffer = self._encode(<_TAG_Compound> tree, paths, buffer, chunks, found)
         else:
-            int_match = int_numeric.match(val)
-            if int_match is not None and int_match.end() == len(val):
-                # we have an int type
-                if val[-1] in {'b', 'B'}:
-                    data = TAG_Byte(int(val[:-1]))
-                elif val[-1] in {'s', 'S'}:
-                    data = TAG_Short(int(val[:-1]))
-                elif val[-1] in {'l', 'L'}:
-                    data = TAG_Long(int(val[:-1]))
-                else:
-                    data = TAG_Int(int(val))
+            (<_TAG_Value?> tree).write_value(buffer, little_endian)
+        chunks.append(buffer.getvalue())
+
+        self._chunks = tuple(chunks)
+        self.slots = tuple([slot[0] for slot in found])
+        self._types = tuple([slot[1] for slot in found])
+        self._defaults = tuple([slot[2] for slot in found])
+        self._index = {name: i for i, name in enumerate(self.slots)}
+        self._check_found(paths)
+
+    cdef object _encode(self, _TAG_Compound tag, dict paths, object buffer, list chunks, list found):
+        """Write the value of a compound with slots in it and return the buffer to continue writing to."""
+        cdef object node, child
+        for key, child in tag._value.items():
+            if type(child) is int:
+                child = box_scalar(&tag._slots[<Py_ssize_t> child])
+            node = paths.get(key)
+            write_tag_id(child.tag_id, buffer)
+            write_tag_name(key, buffer, self.little_endian)
+            if type(node) is str:
+                chunks.append(buffer.getvalue())
+                buffer = BytesIO()
+                default = BytesIO()
+                (<_TAG_Value> child).write_value(default, self.little_endian)
+                found.append((node, type(child), default.getvalue()))
+            elif node is not None:
+                if fast_tag_id(child) != _ID_COMPOUND:
+                    raise TypeError(f"Template slot path goes through a {child.__class__.__name__} at {key}")
+                buffer = self._encode(<_TAG_Compound> child, node, buffer, chunks, found)
             else:
-                float_match = float_numeric.match(val)
-                if float_match is not None and float_match.end() == len(val):
-                    # we have a float type
-                    if val[-1] in {'f', 'F'}:
-                        data = TAG_Float(float(val[:-1]))
-                    elif val[-1] in {'d', 'D'}:
-                        data = TAG_Double(float(val[:-1]))
-                    else:
-                        data = TAG_Double(float(val))
-                else:
-                    # we just have a string type
-                    data = TAG_String(val)
+                (<_TAG_Value> child).write_value(buffer, self.little_endian)
+        write_tag_id(_ID_END, buffer)
+        return buffer
+
+    cdef void _check_found(self, dict paths) except *:
+        for node in paths.values():
+            if type(node) is dict:
+                self._check_found(node)
+            elif node not in self._index:
+                raise KeyError(f"Template slot {node} is not in the tree")
+
+    def render(self, dict values = None, **kwargs) -> bytes:
+        """The binary NBT of the tree with new values in some of the slots.
+        Values are given by slot name either in values or as keyword arguments. A value is a tag of the
+        same type as the one in the tree or anything that type accepts. Other slots keep the value from
+        the tree. The result is the same as saving the modified tree uncompressed."""
+        cdef Py_ssize_t i
+        cdef object value, cls
+        if values is not None:
+            kwargs.update(values)
+        for name in kwargs:
+            if name not in self._index:
+                raise KeyError(f"Unknown template slot {name}")
+        buffer = BytesIO()
+        for i in range(len(self.slots)):
+            buffer.write(self._chunks[i])
+            value = kwargs.get(self.slots[i], _MISSING)
+            if value is _MISSING:
+                buffer.write(self._defaults[i])
+                continue
+            cls = self._types[i]
+            if not isinstance(value, _TAG_Value):
+                value = cls(value)
+            elif value.tag_id != cls.tag_id:
+                raise TypeError(f"Expected {cls.__name__} for template slot {self.slots[i]} but got {value.__class__.__name__}")
+            (<_TAG_Value> value).write_value(buffer, self.little_endian)
+        buffer.write(self._chunks[-1])
+        return buffer.getvalue()
+
+
+# the kinds of node in a compiled SNBT template
+cdef int _NODE_CONSTANT = 0  # (kind, tag) a subtree without slots
+cdef int _NODE_SLOT = 1  # (kind, name)
+cdef int _NODE_COMPOUND = 2  # (kind, keys, nodes)
+cdef int _NODE_LIST = 3  # (kind, nodes)
+
+
+cdef class SNBTTemplate:
+    """SNBT with $name slots that is parsed once and filled in many times. Create one with :func:`compile_snbt`.
+
+    Calling the template with the slot values returns a new tree. A value is a tag or an int, float or str
+    which become a TAG_Int, TAG_Double or TAG_String like the same number or text written without a suffix
+    in SNBT. The parts of the tree without slots are shared with the template until they are modified."""
+    cdef readonly tuple slots
+    cdef object _root
+    cdef frozenset _names
+
+    def __init__(self, str snbt):
+        cdef list slots = []
+        self._root = self._compile(_from_snbt(snbt, _MAX_DEPTH, True), slots)
+        self.slots = tuple(dict.fromkeys(slots))
+        self._names = frozenset(self.slots)
+
+    cdef object _compile(self, _TAG_Value tag, list slots):
+        """The node that builds tag. Only the lists and compounds that contain slots are rebuilt.
+        The parser limits the depth of the tree so this recursion is bounded."""
+        cdef list keys, nodes
+        cdef bint constant = True
+        cdef char tag_id = fast_tag_id(tag)
+        if type(tag) is _SNBTSlot:
+            slots.append(tag.py_str)
+            return _NODE_SLOT, tag.py_str
+        elif tag_id == _ID_COMPOUND:
+            keys = []
+            nodes = []
+            for key in (<_TAG_Compound> tag)._value:
+                keys.append(key)
+                nodes.append(self._compile((<_TAG_Compound> tag)[key], slots))
+                constant = constant and nodes[-1][0] == _NODE_CONSTANT
+            if not constant:
+                return _NODE_COMPOUND, tuple(keys), tuple(nodes)
+        elif tag_id == _ID_LIST:
+            nodes = [self._compile(item, slots) for item in (<_TAG_List> tag)._value]
+            for node in nodes:
+                constant = constant and node[0] == _NODE_CONSTANT
+            if not constant:
+                return _NODE_LIST, tuple(nodes)
+        return _NODE_CONSTANT, tag
+
+    cdef _TAG_Value _build(self, tuple node, dict values):
+        cdef int kind = node[0]
+        cdef Py_ssize_t i
+        cdef dict entries
+        if kind == _NODE_CONSTANT:
+            return (<_TAG_Value> node[1])._snapshot()
+        elif kind == _NODE_SLOT:
+            return (<_TAG_Value> values[node[1]])._snapshot()
+        elif kind == _NODE_COMPOUND:
+            entries = {}
+            for i in range(len(node[1])):
+                entries[node[1][i]] = self._build(node[2][i], values)
+            return TAG_Compound(entries)
+        # TAG_List checks that the filled in slots have the same type as the other elements
+        return TAG_List([self._build(item, values) for item in node[1]])
+
+    def __call__(self, dict values = None, **kwargs) -> AnyNBT:
+        """A new tree with values in the slots.
+        Values are given by slot name either in values or as keyword arguments. Every slot needs a value."""
+        if values is not None:
+            kwargs.update(values)
+        for name, value in kwargs.items():
+            if name not in self._names:
+                raise KeyError(f"Unknown template slot {name}")
+            kwargs[name] = _slot_value(name, value)
+        for name in self.slots:
+            if name not in kwargs:
+                raise KeyError(f"No value for template slot {name}")
+        return self._build(self._root, kwargs)
 
-    return data, index
+    def __repr__(self):
+        return f"SNBTTemplate(slots={self.slots})"
+
+
+cdef _TAG_Value _slot_value(str name, object value):
+    if isinstance(value, _TAG_Value):
+        return value
+    elif isinstance(value, bool):
+        pass
+    elif isinstance(value, int):
+        return TAG_Int(value)
+    elif isinstance(value, float):
+        return TAG_Double(value)
+    elif isinstance(value, str):
+        return TAG_String(value)
+    raise TypeError(f"Template slot {name} needs a tag, int, float or str. Got {value.__class__.__name__}")
+
+
+@lru_cache(maxsize=1024)
+def compile_snbt(str snbt) -> SNBTTemplate:
+    """Parse SNBT with $name slots in place of values into a template that can be filled in many times.
+    For example compile_snbt('{id: "minecraft:zombie", Pos: [$x, $y, $z]}')(x=1.5, y=64.0, z=-3.5).
+    Templates are cached by their text so a repeated SNBT string is only parsed once even without slots."""
+    return SNBTTemplate(snbt)
+
+
+# Content digests. A tag is hashed as its tag id followed by its big endian binary value except that
+# compound entries are sorted by key and child containers and arrays are included by their own digest.
+# This lets the digests of unchanged child containers be reused from their cache. Arrays are hashed
+# every time and only get a newer cache when their digest differs from the previous one.
+@cython.final
+@cython.freelist(64)
+cdef class _DigestFrame:
+    """A list or compound whose children are being hashed."""
+    cdef _TAG_Value tag
+    cdef bint is_list
+    # the position of the next child to hash
+    cdef Py_ssize_t pos
+    # the key of the child container being hashed
+    cdef object key
+    # the digests of the mutable children by key for compounds and in order for lists
+    cdef object digests
+    cdef _TagCache cache
+    # False once a child has changed since the cached digest was computed
+    cdef bint valid
+
+
+cdef _DigestFrame open_digest_frame(_TAG_Value tag, str algorithm):
+    cdef _DigestFrame frame = _DigestFrame.__new__(_DigestFrame)
+    frame.tag = tag
+    frame.is_list = fast_tag_id(tag) == _ID_LIST
+    if frame.is_list:
+        frame.digests = []
+        frame.cache = (<_TAG_List> tag)._cache
+    else:
+        frame.digests = {}
+        frame.cache = (<_TAG_Compound> tag)._cache
+    frame.valid = _cache_valid(frame.cache, algorithm)
+    return frame
 
-def from_snbt(snbt: str) -> AnyNBT:
-    try:
-        return _parse_snbt_recursive(snbt)[0]
-    except SNBTParseError as e:
-        raise SNBTParseError(e)
-    except IndexError:
-        raise SNBTParseError('SNBT string is incomplete. Reached the end of the string.')
+
+cdef void add_child_digest(_DigestFrame frame, object key, bytes digest, unsigned long long stamp) except *:
+    if frame.is_list:
+        PyList_Append(<list> frame.digests, digest)
+    else:
+        (<dict> frame.digests)[key] = digest
+    if frame.valid and stamp > frame.cache.digest_stamp:
+        frame.valid = False
+
+
+cdef bytes tag_digest(object tag, str algorithm, unsigned long long *stamp):
+    """The digest of tag. stamp is set to the clock value of the cache the digest came from.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    tag = resolve_raw(tag)
+    cdef char tag_id = fast_tag_id(tag)
+    cdef object buffer
+    cdef list stack
+    cdef _DigestFrame frame
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef object child
+    cdef bytes digest
+    cdef unsigned long long child_stamp
+    if is_array(tag_id):
+        return _array_digest(<_TAG_Array> tag, algorithm, stamp)
+    elif tag_id != _ID_COMPOUND and tag_id != _ID_LIST:
+        stamp[0] = 0
+        buffer = BytesIO()
+        write_tag_id(tag_id, buffer)
+        write_tag_value(tag, buffer, False)
+        return hashlib.new(algorithm, buffer.getvalue()).digest()
+
+    # child digests are always computed so that their caches are checked
+    stack = []
+    frame = open_digest_frame(tag, algorithm)
+    while True:
+        child = None
+        if frame.is_list:
+            if is_mutable((<_TAG_List> frame.tag).list_data_type) and frame.pos < len((<_TAG_List> frame.tag)._value):
+                child = (<_TAG_List> frame.tag)._value[frame.pos]
+                frame.pos += 1
+        else:
+            while PyDict_Next((<_TAG_Compound> frame.tag)._value, &frame.pos, &key, &entry):
+                if type(<object> entry) is not int:
+                    child = resolve_raw(<object> entry)
+                    if is_mutable(fast_tag_id(child)):
+                        frame.key = <object> key
+                        break
+                    child = None
+
+        if child is None:
+            # every child has been hashed
+            if frame.is_list:
+                digest = _list_digest(<_TAG_List> frame.tag, algorithm, frame.digests, frame.valid, &child_stamp)
+            else:
+                digest = _compound_digest(<_TAG_Compound> frame.tag, algorithm, frame.digests, frame.valid, &child_stamp)
+            if not stack:
+                stamp[0] = child_stamp
+                return digest
+            frame = stack.pop()
+            add_child_digest(frame, frame.key, digest, child_stamp)
+            continue
+
+        child = resolve_raw(child)
+        tag_id = fast_tag_id(child)
+        if is_array(tag_id):
+            digest = _array_digest(<_TAG_Array> child, algorithm, &child_stamp)
+            add_child_digest(frame, frame.key, digest, child_stamp)
+        elif tag_id == _ID_LIST and not is_mutable((<_TAG_List> child).list_data_type):
+            # a list of scalars has no children to walk
+            digest = _list_digest(
+                <_TAG_List> child, algorithm, None, _cache_valid((<_TAG_List> child)._cache, algorithm), &child_stamp
+            )
+            add_child_digest(frame, frame.key, digest, child_stamp)
+        else:
+            stack.append(frame)
+            frame = open_digest_frame(child, algorithm)
+
+
+cdef inline bint _cache_valid(_TagCache cache, str algorithm):
+    return cache is not None and cache.digest is not None and cache.algorithm == algorithm
+
+
+cdef _TagCache _digest_cache(_TagCache old, str algorithm, bytes digest, unsigned long long *stamp):
+    """Return a new cache holding digest and the encoding in old."""
+    global _cache_clock
+    cdef _TagCache cache = _TagCache.__new__(_TagCache)
+    if old is not None:
+        cache.encoded_stamp = old.encoded_stamp
+        cache.encoded_little_endian = old.encoded_little_endian
+        cache.encoded = old.encoded
+    _cache_clock += 1
+    cache.digest_stamp = stamp[0] = _cache_clock
+    cache.algorithm = algorithm
+    cache.digest = digest
+    return cache
+
+
+cdef bytes _compound_digest(
+    _TAG_Compound tag, str algorithm, dict digests, bint valid, unsigned long long *stamp
+):
+    """The digest of a compound given the digests of its mutable children.
+    valid is False if a child has changed since the cached digest was computed."""
+    cdef _TagCache cache = tag._cache
+    cdef object buffer, item
+    cdef _ScalarSlot *slot
+    cdef char tag_id
+    if valid:
+        stamp[0] = cache.digest_stamp
+        return cache.digest
+
+    buffer = BytesIO()
+    write_tag_id(_ID_COMPOUND, buffer)
+    for key in sorted(tag._value):
+        item = tag._value[key]
+        write_tag_name(key, buffer, False)
+        if type(item) is int:
+            slot = &tag._slots[<Py_ssize_t> item]
+            write_tag_id(slot.tag_id, buffer)
+            write_scalar(slot, buffer, False)
+        else:
+            item = resolve_raw(item)
+            tag_id = fast_tag_id(item)
+            write_tag_id(tag_id, buffer)
+            if is_mutable(tag_id):
+                buffer.write(digests[key])
+            else:
+                write_tag_value(item, buffer, False)
+
+    digest = hashlib.new(algorithm, buffer.getvalue()).digest()
+    cache = tag._cache = _digest_cache(cache, algorithm, digest, stamp)
+    return cache.digest
+
+
+cdef bytes _list_digest(_TAG_List tag, str algorithm, list digests, bint valid, unsigned long long *stamp):
+    """The digest of a list given the digests of its elements if they are mutable.
+    valid is False if an element has changed since the cached digest was computed."""
+    cdef _TagCache cache = tag._cache
+    cdef object buffer, item
+    if valid:
+        stamp[0] = cache.digest_stamp
+        return cache.digest
+
+    buffer = BytesIO()
+    write_tag_id(_ID_LIST, buffer)
+    write_tag_id(tag.list_data_type, buffer)
+    write_int(len(tag._value), buffer, False)
+    if is_mutable(tag.list_data_type):
+        buffer.write(b"".join(digests))
+    else:
+        for item in tag._value:
+            write_tag_value(item, buffer, False)
+
+    digest = hashlib.new(algorithm, buffer.getvalue()).digest()
+    cache = tag._cache = _digest_cache(cache, algorithm, digest, stamp)
+    return cache.digest
+
+
+cdef bytes _array_digest(_TAG_Array tag, str algorithm, unsigned long long *stamp):
+    """Arrays are always hashed again because their numpy array can be modified through a reference
+    held outside the tag. The previous digest is only kept to find out if the array has changed."""
+    cdef _TagCache cache = tag._cache
+    cdef object buffer
+    cdef bytes digest
+    # arrays loaded from little endian data keep their byte order
+    data_type = tag.big_endian_data_type
+    buffer = BytesIO()
+    write_tag_id(fast_tag_id(tag), buffer)
+    write_array(numpy.asarray(tag._value, data_type), buffer, data_type.itemsize, False)
+
+    digest = hashlib.new(algorithm, buffer.getvalue()).digest()
+    if _cache_valid(cache, algorithm) and cache.digest == digest:
+        stamp[0] = cache.digest_stamp
+        return cache.digest
+
+    cache = tag._cache = _digest_cache(cache, algorithm, digest, stamp)
+    return cache.digest
+
+
+# Incremental saving. The binary value of each container is cached when it is written.
+# A cached value is reused while neither the tag nor any of its children have been modified since,
+# which is known from the caches of the children being no newer than its own. Arrays are encoded
+# every time and only get a newer cache when their encoding differs from the previous one.
+# Containers deeper than _ENCODE_CACHE_DEPTH are treated the same way. Each cache holds the encoding
+# of the whole subtree so caching every level of a deep tree would take quadratic time and memory.
+DEF _ENCODE_CACHE_DEPTH = 32
+
+@cython.final
+@cython.freelist(64)
+cdef class _EncodeFrame:
+    """A list or compound whose children are being encoded."""
+    cdef _TAG_Value tag
+    cdef bint is_list
+    # the position of the next child to encode
+    cdef Py_ssize_t pos
+    # the key of the child container being encoded
+    cdef object key
+    # the encodings of the mutable children by key for compounds and in order for lists
+    cdef object encoded
+    cdef _TagCache cache
+    # False once a child has changed since the cached encoding was made
+    cdef bint valid
+
+
+cdef _EncodeFrame open_encode_frame(_TAG_Value tag, bint little_endian):
+    cdef _EncodeFrame frame = _EncodeFrame.__new__(_EncodeFrame)
+    cdef char list_type
+    frame.tag = tag
+    frame.is_list = fast_tag_id(tag) == _ID_LIST
+    if frame.is_list:
+        list_type = (<_TAG_List> tag).list_data_type
+        for item in (<_TAG_List> tag)._value:
+            if fast_tag_id(item) != list_type:
+                raise ValueError(
+                    f"Asked to save TAG_List with different types! Found {(<_TAG_Value> item).tag_id} and {list_type}"
+                )
+        frame.encoded = []
+        frame.cache = (<_TAG_List> tag)._cache
+    else:
+        frame.encoded = {}
+        frame.cache = (<_TAG_Compound> tag)._cache
+    frame.valid = _encoding_valid(frame.cache, little_endian)
+    return frame
+
+
+cdef void add_child_encoding(_EncodeFrame frame, object key, bytes encoded, unsigned long long stamp) except *:
+    if frame.is_list:
+        PyList_Append(<list> frame.encoded, encoded)
+    else:
+        (<dict> frame.encoded)[key] = encoded
+    if frame.valid and stamp > frame.cache.encoded_stamp:
+        frame.valid = False
+
+
+cdef bytes cached_encoding(object tag, bint little_endian, unsigned long long *stamp):
+    """The binary value of a container or array. stamp is set to the clock value of the cache it came from.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    cdef char tag_id = fast_tag_id(tag)
+    cdef list stack
+    cdef _EncodeFrame frame
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef object child
+    cdef bytes encoded
+    cdef unsigned long long child_stamp
+    if is_array(tag_id):
+        return _compared_encoding(tag, little_endian, stamp)
+
+    # child encodings are always found so that their caches are checked
+    stack = []
+    frame = open_encode_frame(tag, little_endian)
+    while True:
+        child = None
+        if frame.is_list:
+            if is_mutable((<_TAG_List> frame.tag).list_data_type) and frame.pos < len((<_TAG_List> frame.tag)._value):
+                child = (<_TAG_List> frame.tag)._value[frame.pos]
+                frame.pos += 1
+        else:
+            while PyDict_Next((<_TAG_Compound> frame.tag)._value, &frame.pos, &key, &entry):
+                if type(<object> entry) is not int and is_mutable(fast_tag_id(<object> entry)):
+                    child = <object> entry
+                    frame.key = <object> key
+                    break
+
+        if child is None:
+            # every child has been encoded
+            if frame.is_list:
+                encoded = _list_encoding(<_TAG_List> frame.tag, little_endian, frame.encoded, frame.valid, &child_stamp)
+            else:
+                encoded = _compound_encoding(
+                    <_TAG_Compound> frame.tag, little_endian, frame.encoded, frame.valid, &child_stamp
+                )
+            if not stack:
+                stamp[0] = child_stamp
+                return encoded
+            frame = stack.pop()
+            add_child_encoding(frame, frame.key, encoded, child_stamp)
+            continue
+
+        if is_array(fast_tag_id(child)) or len(stack) + 1 >= _ENCODE_CACHE_DEPTH:
+            encoded = _compared_encoding(child, little_endian, &child_stamp)
+            add_child_encoding(frame, frame.key, encoded, child_stamp)
+        else:
+            stack.append(frame)
+            frame = open_encode_frame(child, little_endian)
+
+
+cdef inline bint _encoding_valid(_TagCache cache, bint little_endian):
+    return cache is not None and cache.encoded is not None and cache.encoded_little_endian == little_endian
+
+
+cdef _TagCache _encoded_cache(_TagCache old, bint little_endian, object buffer, unsigned long long *stamp):
+    """Return a new cache holding the encoding in buffer and the digest in old."""
+    global _cache_clock
+    cdef _TagCache cache = _TagCache.__new__(_TagCache)
+    if old is not None:
+        cache.digest_stamp = old.digest_stamp
+        cache.algorithm = old.algorithm
+        cache.digest = old.digest
+    _cache_clock += 1
+    cache.encoded_stamp = stamp[0] = _cache_clock
+    cache.encoded_little_endian = little_endian
+    cache.encoded = buffer.getvalue()
+    return cache
+
+
+cdef bytes _compound_encoding(
+    _TAG_Compound tag, bint little_endian, dict encoded, bint valid, unsigned long long *stamp
+):
+    """The binary value of a compound given the encodings of its mutable children.
+    valid is False if a child has changed since the cached encoding was made."""
+    cdef _TagCache cache = tag._cache
+    cdef object buffer, item
+    cdef _ScalarSlot *slot
+    if valid:
+        stamp[0] = cache.encoded_stamp
+        return cache.encoded
+
+    buffer = BytesIO()
+    for key, item in tag._value.items():
+        if type(item) is int:
+            slot = &tag._slots[<Py_ssize_t> item]
+            write_tag_id(slot.tag_id, buffer)
+            write_tag_name(key, buffer, little_endian)
+            write_scalar(slot, buffer, little_endian)
+        else:
+            write_tag_id((<_TAG_Value> item).tag_id, buffer)
+            write_tag_name(key, buffer, little_endian)
+            if key in encoded:
+                buffer.write(encoded[key])
+            else:
+                (<_TAG_Value> item).write_value(buffer, little_endian)
+    write_tag_id(_ID_END, buffer)
+
+    cache = tag._cache = _encoded_cache(cache, little_endian, buffer, stamp)
+    return cache.encoded
+
+
+cdef bytes _list_encoding(
+    _TAG_List tag, bint little_endian, list encoded, bint valid, unsigned long long *stamp
+):
+    """The binary value of a list given the encodings of its elements if they are mutable.
+    valid is False if an element has changed since the cached encoding was made."""
+    cdef _TagCache cache = tag._cache
+    cdef char list_type = tag.list_data_type
+    cdef object buffer, item
+    if valid:
+        stamp[0] = cache.encoded_stamp
+        return cache.encoded
+
+    buffer = BytesIO()
+    write_tag_id(list_type, buffer)
+    write_int(<int> len(tag._value), buffer, little_endian)
+    if is_mutable(list_type):
+        buffer.write(b"".join(encoded))
+    else:
+        for item in tag._value:
+            (<_TAG_Value> item).write_value(buffer, little_endian)
+
+    cache = tag._cache = _encoded_cache(cache, little_endian, buffer, stamp)
+    return cache.encoded
+
+
+cdef bytes _compared_encoding(_TAG_Value tag, bint little_endian, unsigned long long *stamp):
+    """Encode an array or a container that is too deep to cache without using its cache.
+    Arrays are always encoded again because their numpy array can be modified through a reference
+    held outside the tag. The previous encoding is only kept to find out if the tag has changed."""
+    cdef char tag_id = fast_tag_id(tag)
+    cdef _TagCache cache
+    cdef object buffer = BytesIO()
+    if tag_id == _ID_COMPOUND:
+        cache = (<_TAG_Compound> tag)._cache
+    elif tag_id == _ID_LIST:
+        cache = (<_TAG_List> tag)._cache
+    else:
+        cache = (<_TAG_Array> tag)._cache
+    tag.write_value(buffer, little_endian)
+    if _encoding_valid(cache, little_endian) and cache.encoded == buffer.getvalue():
+        stamp[0] = cache.encoded_stamp
+        return cache.encoded
+
+    cache = _encoded_cache(cache, little_endian, buffer, stamp)
+    if tag_id == _ID_COMPOUND:
+        (<_TAG_Compound> tag)._cache = cache
+    elif tag_id == _ID_LIST:
+        (<_TAG_List> tag)._cache = cache
+    else:
+        (<_TAG_Array> tag)._cache = cache
+    return cache.encoded
+
+
+@cython.final
+@cython.freelist(64)
+cdef class _HashFrame:
+    """A list or compound whose children are being hashed."""
+    cdef _TAG_Value tag
+    cdef bint is_list
+    # the position of the next child to hash
+    cdef Py_ssize_t pos
+    # the key of the child container being hashed
+    cdef object key
+    # the hashes of the elements of a list
+    cdef list hashes
+    # the combined hashes of the entries of a compound
+    cdef Py_hash_t entries
+
+
+cdef _HashFrame open_hash_frame(_TAG_Value tag):
+    cdef _HashFrame frame = _HashFrame.__new__(_HashFrame)
+    frame.tag = tag
+    frame.is_list = fast_tag_id(tag) == _ID_LIST
+    if frame.is_list:
+        frame.hashes = []
+    return frame
+
+
+cdef int add_child_hash(_HashFrame frame, Py_hash_t child_hash) except -1:
+    if frame.is_list:
+        PyList_Append(frame.hashes, child_hash)
+    else:
+        # entries are combined so that the order does not matter
+        frame.entries ^= hash((frame.key, child_hash))
+    return 0
+
+
+cdef Py_hash_t structural_hash(object tag) except -1:
+    """A hash consistent with strict structural equality.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    tag = resolve_raw(tag)
+    cdef char tag_id = fast_tag_id(tag)
+    cdef list stack
+    cdef _HashFrame frame
+    cdef PyObject *key
+    cdef PyObject *entry
+    cdef object child
+    cdef Py_hash_t child_hash
+    if tag_id != _ID_COMPOUND and tag_id != _ID_LIST:
+        return _value_hash(tag, tag_id)
+
+    stack = []
+    frame = open_hash_frame(tag)
+    while True:
+        child = None
+        if frame.is_list:
+            if frame.pos < len((<_TAG_List> frame.tag)._value):
+                child = resolve_raw((<_TAG_List> frame.tag)._value[frame.pos])
+                frame.pos += 1
+        else:
+            while PyDict_Next((<_TAG_Compound> frame.tag)._value, &frame.pos, &key, &entry):
+                frame.key = <object> key
+                if type(<object> entry) is int:
+                    add_child_hash(frame, _slot_hash(&(<_TAG_Compound> frame.tag)._slots[<Py_ssize_t> <object> entry]))
+                    continue
+                child = resolve_raw(<object> entry)
+                break
+
+        if child is None:
+            # every child has been hashed
+            if frame.is_list:
+                # the type of an empty list does not take part in equality
+                child_hash = hash((_ID_LIST, tuple(frame.hashes)))
+            else:
+                child_hash = hash((_ID_COMPOUND, len((<_TAG_Compound> frame.tag)._value), frame.entries))
+            if not stack:
+                return child_hash
+            frame = stack.pop()
+            add_child_hash(frame, child_hash)
+            continue
+
+        tag_id = fast_tag_id(child)
+        if tag_id == _ID_COMPOUND or tag_id == _ID_LIST:
+            stack.append(frame)
+            frame = open_hash_frame(child)
+        else:
+            add_child_hash(frame, _value_hash(child, tag_id))
+
+
+cdef Py_hash_t _value_hash(object tag, char tag_id) except -1:
+    """The hash of a tag that is not a list or compound."""
+    if is_array(tag_id):
+        return hash((tag_id, numpy.asarray((<_TAG_Array> tag)._value, tag.big_endian_data_type).tobytes()))
+    elif tag_id == _ID_STRING:
+        return hash((tag_id, (<TAG_String> tag).py_bytes))
+    return hash((tag_id, native_value(tag)))
+
+
+cdef inline Py_hash_t _slot_hash(_ScalarSlot *slot) except -1:
+    return hash((slot.tag_id, unbox_scalar(slot)))
+
+
+cdef object storage(_TAG_Value tag):
+    """The object holding the content of a container or array."""
+    cdef char tag_id = fast_tag_id(tag)
+    if tag_id == _ID_COMPOUND:
+        return (<_TAG_Compound> tag)._value
+    elif tag_id == _ID_LIST:
+        return (<_TAG_List> tag)._value
+    return (<_TAG_Array> tag)._value
+
+
+cdef FrozenTag frozen_tag(_TAG_Value tag):
+    """Wrap a tag that nothing else can modify."""
+    cdef FrozenTag frozen = FrozenTag.__new__(FrozenTag)
+    frozen._tag = tag
+    frozen._value = storage(tag)
+    frozen._hash = structural_hash(tag)
+    return frozen
+
+
+cdef object freeze_child(object tag):
+    if is_mutable(fast_tag_id(tag)):
+        return frozen_tag((<_TAG_Value> tag)._snapshot())
+    return tag
+
+
+cdef class FrozenTag:
+    """An immutable container or array created by :meth:`freeze`.
+    Frozen tags are hashable and compare structurally so they can be used as dictionary keys.
+    Items of a frozen container are frozen. Use :meth:`thaw` to get a modifiable tag."""
+    cdef _TAG_Value _tag
+    cdef object _value
+    cdef Py_hash_t _hash
+
+    def __init__(self, tag: AnyNBT):
+        if not isinstance(tag, _TAG_Value) or not is_mutable(fast_tag_id(tag)):
+            raise TypeError(f"Only containers and arrays can be frozen. Got {tag.__class__.__name__}")
+        self._tag = (<_TAG_Value> tag)._snapshot()
+        self._value = storage(self._tag)
+        self._hash = structural_hash(self._tag)
+
+    @property
+    def tag_id(self) -> int:
+        return fast_tag_id(self._tag)
+
+    def thaw(self) -> AnyNBT:
+        """A modifiable copy of the frozen tag. The copy shares structure with the frozen tag."""
+        return self._tag._snapshot()
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenTag):
+            return NotImplemented
+        return self._hash == (<FrozenTag> other)._hash and tags_equal(self._tag, (<FrozenTag> other)._tag, True)
+
+    def __len__(self) -> int:
+        return len(self._value)
+
+    def __getitem__(self, item):
+        cdef char tag_id = fast_tag_id(self._tag)
+        cdef object value = self._value[item]
+        if tag_id == _ID_COMPOUND:
+            if type(value) is int:
+                return box_scalar(&(<_TAG_Compound> self._tag)._slots[<Py_ssize_t> value])
+            return freeze_child(value)
+        elif tag_id == _ID_LIST:
+            if isinstance(item, slice):
+                return tuple([freeze_child(tag) for tag in value])
+            return freeze_child(value)
+        elif isinstance(value, numpy.ndarray):
+            return value.copy()
+        return value
+
+    def __iter__(self):
+        cdef char tag_id = fast_tag_id(self._tag)
+        if tag_id == _ID_COMPOUND:
+            return iter(list(self._value))
+        elif tag_id == _ID_LIST:
+            return (freeze_child(tag) for tag in list(self._value))
+        return iter(self._value.copy())
+
+    def __contains__(self, item) -> bool:
+        return item in self._value
+
+    def keys(self):
+        return self._value.keys()
+
+    def to_snbt(self, indent_chr=None) -> str:
+        return self._tag.to_snbt(indent_chr)
+
+    def digest(self, str algorithm = "blake2b") -> bytes:
+        return self._tag.digest(algorithm)
+
+    def __repr__(self):
+        return f"FrozenTag({self._tag._to_snbt()})"
+
+    def __reduce__(self):
+        return FrozenTag, (self._tag,)
@@ -12,9 +12,20 @@ from .nbt_types import (
     TAG_Int_Array,
     TAG_Long_Array,
     NBTFile,
+    FrozenTag,
+    RawTag,
     BaseValueType,
     BaseArrayType,
     AnyNBT,
 )
-from ._load import load, from_snbt
+from ._load import (
+    load,
+    from_snbt,
+    from_snbt_stream,
+    patch_inplace,
+    InternPool,
+    Limits,
+)
+from ._diff import diff, patch
+from ._template import Template, SNBTTemplate, compile_snbt
 from .const import SNBTType
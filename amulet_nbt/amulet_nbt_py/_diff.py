@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from typing import List, Iterable
+
+import numpy as np
+
+from .errors import NBTError
+from .nbt_types import (
+    TAG_Int,
+    TAG_String,
+    TAG_List,
+    TAG_Compound,
+    BaseArrayType,
+    AnyNBT,
+)
+
+# A diff is a TAG_List of TAG_Compound operations so that it can be saved like any other NBT.
+# Each operation has an "op" name and a "path" from the root. The path is a TAG_List of TAG_String
+# holding compound keys and list indexes. Indexes are parsed when the path is walked.
+OP_SET = "set"  # set "value" at path
+OP_DELETE = "delete"  # delete the compound entry at path
+OP_INSERT = "insert"  # insert "value" into the list at path
+OP_REMOVE = "remove"  # remove the list element at path
+# replace elements "start" to "stop" of the array at path with "value"
+OP_ARRAY = "array"
+
+
+def _diff_op(op: str, path: List[str], value: AnyNBT = None) -> TAG_Compound:
+    entries = {
+        "op": TAG_String(op),
+        "path": TAG_List([TAG_String(key) for key in path], TAG_String.tag_id),
+    }
+    if value is not None:
+        entries["value"] = value.snapshot()
+    return TAG_Compound(entries)
+
+
+def _diff_tags(ops: List[TAG_Compound], path: List[str], a: AnyNBT, b: AnyNBT):
+    """Append the operations that turn a into b. a and b must not be equal."""
+    a = a._decoded()
+    b = b._decoded()
+    if a.tag_id != b.tag_id:
+        ops.append(_diff_op(OP_SET, path, b))
+    elif isinstance(a, TAG_Compound):
+        _diff_compound(ops, path, a, b)
+    elif isinstance(a, TAG_List):
+        _diff_list(ops, path, a, b)
+    elif isinstance(a, BaseArrayType):
+        _diff_array(ops, path, a, b)
+    else:
+        ops.append(_diff_op(OP_SET, path, b))
+
+
+def _diff_compound(
+    ops: List[TAG_Compound], path: List[str], a: TAG_Compound, b: TAG_Compound
+):
+    for key in a:
+        if key not in b:
+            ops.append(_diff_op(OP_DELETE, path + [key]))
+    for key, other in b.items():
+        if key not in a:
+            ops.append(_diff_op(OP_SET, path + [key], other))
+        elif not a[key].equals(other):
+            _diff_tags(ops, path + [key], a[key], other)
+
+
+def _diff_list(ops: List[TAG_Compound], path: List[str], a: TAG_List, b: TAG_List):
+    a_len = len(a)
+    b_len = len(b)
+    if a_len and b_len and a.list_data_type != b.list_data_type:
+        ops.append(_diff_op(OP_SET, path, b))
+        return
+    # skip the common prefix and suffix
+    start = 0
+    while start < a_len and start < b_len and a[start].equals(b[start]):
+        start += 1
+    end = 0
+    while (
+        end < a_len - start
+        and end < b_len - start
+        and a[a_len - end - 1].equals(b[b_len - end - 1])
+    ):
+        end += 1
+    # diff the elements that are in both then remove or insert the rest
+    for i in range(start, min(a_len, b_len) - end):
+        if not a[i].equals(b[i]):
+            _diff_tags(ops, path + [str(i)], a[i], b[i])
+    start = min(a_len, b_len) - end
+    for _ in range(a_len - b_len):
+        ops.append(_diff_op(OP_REMOVE, path + [str(start)]))
+    for i in range(start, b_len - end):
+        ops.append(_diff_op(OP_INSERT, path + [str(i)], b[i]))
+
+
+def _diff_array(
+    ops: List[TAG_Compound], path: List[str], a: BaseArrayType, b: BaseArrayType
+):
+    a_value = a.value
+    b_value = b.value
+    a_len = len(a_value)
+    b_len = len(b_value)
+    common = min(a_len, b_len)
+    different = np.flatnonzero(a_value[:common] != b_value[:common])
+    start = int(different[0]) if len(different) else common
+    # the suffix may not overlap the prefix
+    different = np.flatnonzero(
+        a_value[a_len - common + start :][::-1]
+        != b_value[b_len - common + start :][::-1]
+    )
+    end = int(different[0]) if len(different) else common - start
+    op = _diff_op(OP_ARRAY, path, b.__class__(b_value[start : b_len - end].copy()))
+    op["start"] = TAG_Int(start)
+    op["stop"] = TAG_Int(a_len - end)
+    ops.append(op)
+
+
+def diff(a: AnyNBT, b: AnyNBT) -> TAG_List:
+    """The list of operations that turn a into b.
+    The result is a TAG_List so it can be saved as NBT. Use :func:`patch` to apply it."""
+    ops = []
+    if not a.equals(b):
+        _diff_tags(ops, [], a, b)
+    return TAG_List(ops, TAG_Compound.tag_id)
+
+
+def _patch_child(container: AnyNBT, key: str) -> AnyNBT:
+    if isinstance(container, TAG_Compound):
+        return container[key]
+    elif isinstance(container, TAG_List):
+        return container[int(key)]
+    raise NBTError(f"Patch path goes through a {container.__class__.__name__}")
+
+
+def _patch_array(tag: AnyNBT, start: int, stop: int, value: np.ndarray):
+    if not isinstance(tag, BaseArrayType):
+        raise NBTError(f"Cannot apply an array operation to a {tag.__class__.__name__}")
+    array = tag.value
+    if stop - start == len(value):
+        array[start:stop] = value
+    else:
+        tag._value = np.concatenate(
+            (array[:start], value.astype(array.dtype), array[stop:])
+        )
+
+
+def patch(tree: AnyNBT, ops: Iterable[TAG_Compound]) -> AnyNBT:
+    """Apply operations created by :func:`diff` to tree in place.
+    Returns the patched tree which is a new object only if the root itself was replaced."""
+    for op in ops:
+        name = op.get_str("op")
+        path = op["path"].get_strs()
+        value = op.get("value")
+        if value is not None:
+            value = value.snapshot()
+        if not path:
+            if name == OP_SET:
+                tree = value
+            elif name == OP_ARRAY:
+                _patch_array(tree, op.get_int("start"), op.get_int("stop"), value.value)
+            else:
+                raise NBTError(f"Cannot apply a {name} operation to the root")
+            continue
+        parent = tree
+        for key in path[:-1]:
+            parent = _patch_child(parent, key)
+        key = path[-1]
+        if name == OP_SET:
+            if isinstance(parent, TAG_Compound):
+                parent[key] = value
+            else:
+                parent[int(key)] = value
+        elif name == OP_DELETE:
+            del parent[key]
+        elif name == OP_INSERT:
+            parent.insert(int(key), value)
+        elif name == OP_REMOVE:
+            del parent[int(key)]
+        elif name == OP_ARRAY:
+            _patch_array(
+                _patch_child(parent, key),
+                op.get_int("start"),
+                op.get_int("stop"),
+                value.value,
+            )
+        else:
+            raise NBTError(f"Unknown patch operation {name}")
+    return tree
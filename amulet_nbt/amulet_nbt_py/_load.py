@@ -3,21 +3,36 @@ from __future__ import annotations
 from typing import (
     Dict,
     List,
+    Iterable,
+    Sequence,
     Tuple,
     Union,
     BinaryIO,
+    TextIO,
+    Iterator,
+    Callable,
     Optional,
     overload,
     # Literal,
 )
 import re
 import os
-import gzip
+import zlib
+import operator
 from io import BytesIO
+from collections import OrderedDict
+from functools import partial
+from struct import Struct
 
 import numpy as np
 
-from .errors import NBTLoadError, SNBTParseError, NBTFormatError
+from .errors import (
+    NBTError,
+    NBTLoadError,
+    SNBTParseError,
+    NBTFormatError,
+    NBTLimitError,
+)
 from .nbt_types import (
     TAG_Byte,
     TAG_Short,
@@ -32,13 +47,273 @@ from .nbt_types import (
     TAG_List,
     TAG_Compound,
     NBTFile,
+    RawTag,
+    BaseArrayType,
     AnyNBT,
 )
-from .const import SNBTType
+from .nbt_types.value import SNBT_CHUNK_SIZE
+from .nbt_types.class_map import TAG_CLASSES
+from .const import SNBTType, MAX_DEPTH
 
+TAG_END = 0
 TAG_COMPOUND = 10
 
 
+class InternPool:
+    """Shares identical subtrees between the tags created by :func:`load`.
+
+    Strings are shared directly. A container or array whose encoding is at most max_size bytes and is
+    identical to one seen before is replaced with a snapshot of the first one.
+    The Cython implementation shares the storage of snapshots. Here they are copies.
+    The pool holds at most max_entries subtrees and evicts the least recently used.
+    Pass the same pool to many calls of :func:`load` to share subtrees between them."""
+
+    def __init__(self, max_entries: int = 16384, max_size: int = 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _share_children(self, tag: AnyNBT):
+        if isinstance(tag, TAG_Compound):
+            for key, child in tag.items():
+                tag[key] = self._share(child)
+        elif isinstance(tag, TAG_List):
+            for index, child in enumerate(tag):
+                tag[index] = self._share(child)
+
+    def _share(self, tag: AnyNBT) -> AnyNBT:
+        if isinstance(tag, TAG_String):
+            key = tag.value
+            if len(key) > self.max_size:
+                return tag
+        elif isinstance(tag, (TAG_Compound, TAG_List, BaseArrayType)):
+            self._share_children(tag)
+            buffer = BytesIO()
+            tag.write_value(buffer)
+            key = (tag.tag_id, buffer.getvalue())
+            if len(key[1]) > self.max_size:
+                return tag
+        else:
+            return tag
+        shared = self._entries.get(key)
+        if shared is None:
+            # the pool keeps the first tag to itself so that nothing can modify it
+            self._entries[key] = shared = tag
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(False)
+        else:
+            self._entries.move_to_end(key)
+        if isinstance(shared, TAG_String):
+            return shared
+        return shared.snapshot()
+
+
+class Limits:
+    """Bounds on the work :func:`load` does so that untrusted NBT can be loaded safely.
+    Input over any of them raises an NBTLimitError. None means no limit.
+
+    max_bytes is the size of the input and max_decompressed is its size once decompressed.
+    max_depth is the number of lists and compounds that may be nested in each other.
+    max_nodes is the number of tags created. Compound entries, list elements and each root count.
+    max_array_len is the number of elements in a byte, int or long array."""
+
+    __slots__ = (
+        "max_bytes",
+        "max_decompressed",
+        "max_depth",
+        "max_nodes",
+        "max_array_len",
+    )
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_decompressed: Optional[int] = None,
+        max_depth: Optional[int] = MAX_DEPTH,
+        max_nodes: Optional[int] = None,
+        max_array_len: Optional[int] = None,
+    ):
+        self.max_bytes = _limit(max_bytes)
+        self.max_decompressed = _limit(max_decompressed)
+        self.max_depth = _limit(max_depth)
+        self.max_nodes = _limit(max_nodes)
+        self.max_array_len = _limit(max_array_len)
+
+    def __repr__(self):
+        return (
+            f"Limits(max_bytes={self.max_bytes}, max_decompressed={self.max_decompressed}, "
+            f"max_depth={self.max_depth}, max_nodes={self.max_nodes}, max_array_len={self.max_array_len})"
+        )
+
+    def __reduce__(self):
+        return Limits, tuple(getattr(self, name) for name in self.__slots__)
+
+
+def _limit(value: Optional[int]) -> Optional[int]:
+    if value is None:
+        return None
+    value = operator.index(value)
+    if value < 0:
+        raise ValueError(f"Limits must not be negative. Got {value}")
+    return value
+
+
+def _gunzip(data: bytes, max_size: Optional[int] = None) -> bytes:
+    """Decompress gzip data. Anything that is not valid gzip is returned unchanged.
+    More than max_size decompressed bytes raise an NBTLimitError after inflating at most max_size + 1."""
+    if data[:2] != b"\x1f\x8b":
+        return data
+    chunks = []
+    size = 0
+    remaining = bytes(data)
+    try:
+        # a gzip file can have many members one after another each of which may be padded with zeros
+        while remaining:
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if max_size is None:
+                chunk = inflater.decompress(remaining)
+            else:
+                chunk = inflater.decompress(remaining, max_size - size + 1)
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise NBTLimitError(
+                    f"Decompressed NBT is larger than the maximum of {max_size} bytes"
+                )
+            if not inflater.eof:
+                return data
+            chunks.append(chunk)
+            remaining = inflater.unused_data.lstrip(b"\x00")
+    except zlib.error:
+        return data
+    return b"".join(chunks)
+
+
+def _raw_path_tree(raw_paths: Iterable[Union[str, Sequence[str]]]) -> dict:
+    """Convert paths to a tree of dictionaries keyed by compound key with True at the raw entries."""
+    tree = {}
+    for path in raw_paths:
+        keys = path.split(".") if isinstance(path, str) else list(path)
+        if not keys:
+            raise ValueError("A raw path must not be empty")
+        node = tree
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+            if node is True:
+                # a parent is already raw
+                break
+        else:
+            node[keys[-1]] = True
+    return tree
+
+
+def _make_raw(tag: AnyNBT, node: dict, little_endian: bool):
+    """Replace the entries at the raw paths in node with their encoded values.
+    The Cython implementation does not decode them in the first place."""
+    if isinstance(tag, TAG_Compound):
+        for key, child in tag.value.items():
+            sub_node = node.get(key)
+            if sub_node is True:
+                if child.tag_id >= TAG_Byte_Array.tag_id:
+                    buffer = BytesIO()
+                    child.write_value(buffer, little_endian)
+                    tag.value[key] = RawTag(
+                        child.tag_id, buffer.getvalue(), little_endian
+                    )
+            elif sub_node:
+                _make_raw(child, sub_node, little_endian)
+    elif isinstance(tag, TAG_List):
+        for child in tag.value:
+            _make_raw(child, node, little_endian)
+
+
+def _load_container(
+    context: BinaryIO,
+    tag_id: int,
+    little_endian: bool,
+    max_depth: Optional[int],
+    limits: Optional[Limits] = None,
+    nodes: int = 0,
+) -> Tuple[Union[TAG_List, TAG_Compound], int]:
+    """Load the value of a list or compound and return it with the number of tags loaded so far.
+    nodes is the number loaded before this one. It is checked against limits.max_nodes.
+    Nested lists and compounds are kept on an explicit stack rather than recursed into."""
+    int_format = TAG_Int.tag_format_le if little_endian else TAG_Int.tag_format_be
+    max_nodes = None if limits is None else limits.max_nodes
+    max_array_len = None if limits is None else limits.max_array_len
+    # each frame is [value, list type or None for a compound, list elements left, compound key]
+    stack = []
+
+    def use_nodes(count: int):
+        nonlocal nodes
+        nodes += count
+        if max_nodes is not None and nodes > max_nodes:
+            raise NBTLimitError(f"NBT has more than the maximum of {max_nodes} tags")
+
+    def open_container(container_id: int):
+        if max_depth is not None and len(stack) >= max_depth:
+            raise NBTLimitError(
+                f"NBT is nested deeper than the maximum depth of {max_depth}"
+            )
+        if container_id == TAG_List.tag_id:
+            list_type = context.read(1)[0]
+            (length,) = int_format.unpack(context.read(int_format.size))
+            if length > 0:
+                use_nodes(length)
+            stack.append([[], list_type, length, None])
+        else:
+            stack.append([{}, None, 0, None])
+
+    use_nodes(1)
+    open_container(tag_id)
+    while True:
+        frame = stack[-1]
+        value, list_type, remaining, _ = frame
+        if list_type is None:
+            child_id = context.read(1)[0]
+            if child_id != TAG_END:
+                frame[3] = TAG_Compound.load_string(context, little_endian)
+                use_nodes(1)
+        elif remaining > 0:
+            frame[2] = remaining - 1
+            child_id = list_type
+        else:
+            child_id = TAG_END
+
+        if child_id == TAG_END:
+            stack.pop()
+            if list_type is None:
+                tag = TAG_Compound.from_trusted(value)
+            else:
+                tag = TAG_List.from_trusted(value, list_type)
+            if not stack:
+                return tag, nodes
+            frame = stack[-1]
+        elif child_id == TAG_List.tag_id or child_id == TAG_COMPOUND:
+            open_container(child_id)
+            continue
+        else:
+            if max_array_len is not None and child_id in _ARRAY_WIDTH:
+                position = context.tell()
+                (length,) = int_format.unpack(context.read(int_format.size))
+                if length > max_array_len:
+                    raise NBTLimitError(
+                        f"NBT array has {length} elements. The maximum is {max_array_len}"
+                    )
+                context.seek(position)
+            tag = TAG_CLASSES[child_id].load_from(context, little_endian)
+
+        if frame[1] is None:
+            frame[0][frame[3]] = tag
+        else:
+            frame[0].append(tag)
+
+
 @overload
 def load(
     filepath_or_buffer: Union[str, bytes, memoryview, BinaryIO],
@@ -46,6 +321,10 @@ def load(
     count: None = None,
     offset=False,  # Literal[False] = False,
     little_endian: bool = False,
+    share_identical: Union[bool, InternPool] = False,
+    raw_paths: Iterable[Union[str, Sequence[str]]] = None,
+    max_depth: int = MAX_DEPTH,
+    limits: Optional[Limits] = None,
 ) -> NBTFile:
     ...
 
@@ -57,6 +336,10 @@ def load(
     count: None = None,
     offset=False,  # Literal[True] = False,
     little_endian: bool = False,
+    share_identical: Union[bool, InternPool] = False,
+    raw_paths: Iterable[Union[str, Sequence[str]]] = None,
+    max_depth: int = MAX_DEPTH,
+    limits: Optional[Limits] = None,
 ) -> Tuple[NBTFile, int]:
     ...
 
@@ -68,6 +351,10 @@ def load(
     count: int = None,
     offset=False,  # Literal[False] = False,
     little_endian: bool = False,
+    share_identical: Union[bool, InternPool] = False,
+    raw_paths: Iterable[Union[str, Sequence[str]]] = None,
+    max_depth: int = MAX_DEPTH,
+    limits: Optional[Limits] = None,
 ) -> List[NBTFile]:
     ...
 
@@ -79,6 +366,10 @@ def load(
     count: int = None,
     offset=False,  # Literal[True] = False,
     little_endian: bool = False,
+    share_identical: Union[bool, InternPool] = False,
+    raw_paths: Iterable[Union[str, Sequence[str]]] = None,
+    max_depth: int = MAX_DEPTH,
+    limits: Optional[Limits] = None,
 ) -> Tuple[List[NBTFile], int]:
     ...
 
@@ -89,6 +380,10 @@ def load(
     count: Optional[int] = None,
     offset: bool = False,
     little_endian: bool = False,
+    share_identical: Union[bool, InternPool] = False,
+    raw_paths: Iterable[Union[str, Sequence[str]]] = None,
+    max_depth: int = MAX_DEPTH,
+    limits: Optional[Limits] = None,
 ):
     """Read binary NBT from a file or bytes.
 
@@ -97,12 +392,22 @@ def load(
     :param count: If None only one NBTFile is returned. If int a list of `NBTFile`s is returned.
     :param offset: If True return Tuple[data, pointer] where pointer is the int pointer location. Useful when reading multiple from one file.
     :param little_endian: Should the binary NBT read in little endian format.
+    :param share_identical: If True or an :class:`InternPool` identical subtrees are shared.
+    :param raw_paths: The compound entries to load as :class:`RawTag`. A path is a string of keys separated by dots or a sequence of keys. Lists are passed through.
+    :param max_depth: The number of lists and compounds that may be nested in each other. Deeper data raises an NBTLimitError.
+    :param limits: Bounds on the work done for untrusted input. Its max_depth replaces max_depth.
     :return: The NBTFile data. The output varies based on inputs.
     """
+    max_bytes = None
+    if limits is not None:
+        max_bytes = limits.max_bytes
+        max_depth = limits.max_depth
     if isinstance(filepath_or_buffer, str):
         # if a string load from the file path
         if not os.path.isfile(filepath_or_buffer):
             raise NBTLoadError(f"There is no file at {filepath_or_buffer}")
+        if max_bytes is not None and os.path.getsize(filepath_or_buffer) > max_bytes:
+            raise NBTLimitError(f"NBT is larger than the maximum of {max_bytes} bytes")
         with open(filepath_or_buffer, "rb") as f:
             data_in = f.read()
 
@@ -113,7 +418,11 @@ def load(
         data_in = filepath_or_buffer
 
     elif hasattr(filepath_or_buffer, "read"):
-        data_in = filepath_or_buffer.read()
+        if max_bytes is None:
+            data_in = filepath_or_buffer.read()
+        else:
+            # never read more than one byte past the limit
+            data_in = filepath_or_buffer.read(max_bytes + 1)
         if not isinstance(data_in, bytes):
             raise NBTLoadError(
                 f"buffer.read() must return a bytes object. Got {type(data_in)} instead."
@@ -132,15 +441,22 @@ def load(
     if not type(data_in) is bytes and not type(data_in) is memoryview:
         raise ValueError("Expected a bytes or memoryview object.")
 
-    if compressed and data_in[:2] == b"\x1f\x8b":
-        # if the first two bytes are this it should be gzipped
-        try:
-            data_in = gzip.GzipFile(fileobj=BytesIO(data_in)).read()
-        except IOError as e:
-            pass
+    if max_bytes is not None and len(data_in) > max_bytes:
+        raise NBTLimitError(f"NBT is larger than the maximum of {max_bytes} bytes")
+
+    if compressed:
+        data_in = _gunzip(data_in, None if limits is None else limits.max_decompressed)
 
     context = BytesIO(data_in)
     results = []
+    if isinstance(share_identical, InternPool):
+        pool = share_identical
+    elif share_identical:
+        pool = InternPool()
+    else:
+        pool = None
+    raw_tree = None if raw_paths is None else _raw_path_tree(raw_paths)
+    nodes = 0
 
     for i in range(1 if count is None else count):
         tag_type = context.read(1)[0]
@@ -150,7 +466,13 @@ def load(
             )
 
         tag_name = TAG_Compound.load_string(context, little_endian)
-        tag: TAG_Compound = TAG_Compound.load_from(context, little_endian)
+        tag, nodes = _load_container(
+            context, TAG_COMPOUND, little_endian, max_depth, limits, nodes
+        )
+        if raw_tree:
+            _make_raw(tag, raw_tree, little_endian)
+        if pool is not None:
+            pool._share_children(tag)
 
         results.append(NBTFile(tag, tag_name))
 
@@ -163,6 +485,123 @@ def load(
     return results
 
 
+_FIXED_WIDTH = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
+_ARRAY_WIDTH = {7: 1, 11: 4, 12: 8}
+_short_be = Struct(">H")
+_short_le = Struct("<H")
+_int_be = Struct(">i")
+_int_le = Struct("<i")
+
+
+def _skip_tag(data: memoryview, offset: int, tag_id: int, little_endian: bool) -> int:
+    """The offset of the end of the tag value that starts at offset."""
+    short = _short_le if little_endian else _short_be
+    int_ = _int_le if little_endian else _int_be
+    if tag_id in _FIXED_WIDTH:
+        offset += _FIXED_WIDTH[tag_id]
+    elif tag_id == TAG_String.tag_id:
+        offset += 2 + short.unpack_from(data, offset)[0]
+    elif tag_id in _ARRAY_WIDTH:
+        offset += 4 + _ARRAY_WIDTH[tag_id] * max(int_.unpack_from(data, offset)[0], 0)
+    elif tag_id == TAG_List.tag_id:
+        list_type = data[offset]
+        length = max(int_.unpack_from(data, offset + 1)[0], 0)
+        offset += 5
+        if list_type in _FIXED_WIDTH:
+            offset += _FIXED_WIDTH[list_type] * length
+        else:
+            for _ in range(length):
+                offset = _skip_tag(data, offset, list_type, little_endian)
+    elif tag_id == TAG_COMPOUND:
+        child_id = data[offset]
+        while child_id:
+            offset += 3 + short.unpack_from(data, offset + 1)[0]
+            offset = _skip_tag(data, offset, child_id, little_endian)
+            child_id = data[offset]
+        offset += 1
+    else:
+        raise NBTFormatError(f"Unknown tag id {tag_id}")
+    if offset > len(data):
+        raise NBTFormatError("NBT Stream too short.")
+    return offset
+
+
+def _find_child(
+    data: memoryview, offset: int, tag_id: int, key: str, little_endian: bool
+) -> Tuple[int, int]:
+    """The offset and tag id of the value of the child key of the compound or list value at offset."""
+    if tag_id == TAG_COMPOUND:
+        name = key.encode("utf-8")
+        short = _short_le if little_endian else _short_be
+        while True:
+            child_id = data[offset]
+            if not child_id:
+                raise KeyError(key)
+            name_length = short.unpack_from(data, offset + 1)[0]
+            offset += 3 + name_length
+            if data[offset - name_length : offset] == name:
+                return offset, child_id
+            offset = _skip_tag(data, offset, child_id, little_endian)
+    elif tag_id == TAG_List.tag_id:
+        child_id = data[offset]
+        int_struct = _int_le if little_endian else _int_be
+        length = int_struct.unpack_from(data, offset + 1)[0]
+        offset += 5
+        index = int(key)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f"List index {key} out of range")
+        if child_id in _FIXED_WIDTH:
+            offset += _FIXED_WIDTH[child_id] * index
+        else:
+            for _ in range(index):
+                offset = _skip_tag(data, offset, child_id, little_endian)
+        return offset, child_id
+    raise NBTError(f"Patch path goes through a tag with id {tag_id}")
+
+
+def patch_inplace(
+    buffer,
+    path: Union[str, Sequence[str]],
+    tag: AnyNBT,
+    little_endian: bool = False,
+    offset: int = 0,
+):
+    """Overwrite the value at path inside uncompressed binary NBT without decoding the rest of it.
+
+    :param buffer: A writable buffer holding the NBT, for example a bytearray or mmap.
+    :param path: A string of keys separated by dots or a sequence of keys from the root compound. List elements are selected by index.
+    :param tag: The new value. It must have the same type and encoded size as the old one so that nothing after it moves. This is always true of numbers and of arrays with the same length.
+    :param little_endian: Is the NBT little endian.
+    :param offset: Where the NBT starts in buffer.
+    """
+    data = memoryview(buffer).cast("B")
+    if data.readonly:
+        raise BufferError("Object is not writable.")
+    if data[offset] != TAG_COMPOUND:
+        raise NBTFormatError(f"Expecting tag type {TAG_COMPOUND} at offset {offset}")
+    # skip the name of the root
+    offset = _skip_tag(data, offset + 1, TAG_String.tag_id, little_endian)
+    tag_id = TAG_COMPOUND
+    for key in path.split(".") if isinstance(path, str) else path:
+        offset, tag_id = _find_child(data, offset, tag_id, str(key), little_endian)
+    end = _skip_tag(data, offset, tag_id, little_endian)
+
+    if tag.tag_id != tag_id:
+        raise TypeError(
+            f"Expected the tag with id {tag_id} at {path} but got {tag.__class__.__name__}"
+        )
+    encoded = BytesIO()
+    tag.write_value(encoded, little_endian)
+    encoded = encoded.getvalue()
+    if len(encoded) != end - offset:
+        raise ValueError(
+            f"The value at {path} is {end - offset} bytes but the new value is {len(encoded)}"
+        )
+    data[offset:end] = encoded
+
+
 # this is going to be rather slow but should exist as a starting point for functionality
 
 whitespace = re.compile("[ \t\r\n]*")
@@ -171,10 +610,58 @@ float_numeric = re.compile("-?[0-9]+\.?[0-9]*[fFdD]?")
 alnumplus = re.compile("[-.a-zA-Z0-9_]*")
 comma = re.compile("[ \t\r\n]*,[ \t\r\n]*")
 colon = re.compile("[ \t\r\n]*:[ \t\r\n]*")
+slot_name = re.compile("[a-zA-Z_][a-zA-Z0-9_]*")
 array_lookup = {"B": TAG_Byte_Array, "I": TAG_Int_Array, "L": TAG_Long_Array}
+# the contents of a valid array between the type prefix and the closing bracket
+array_body = {
+    array_type_chr: re.compile(
+        f"[ \t\r\n]*(?:-?[0-9]+{marker}(?:[ \t\r\n]*,[ \t\r\n]*-?[0-9]+{marker})*(?:[ \t\r\n]*,)?)?[ \t\r\n]*"
+    )
+    for array_type_chr, marker in (("B", "B?"), ("I", ""), ("L", "L?"))
+}
+# the rest of a quoted string up to and including the closing quote
+quoted_string = {
+    '"': re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL),
+    "'": re.compile(r"[^'\\]*(?:\\.[^'\\]*)*'", re.DOTALL),
+}
+
+
+def parse_array(body: str, array_type_chr: str) -> Optional[AnyNBT]:
+    """Convert the contents of an array in one step.
+    Returns None if the contents are not valid or may not fit the array type.
+    The caller must then parse it one element at a time to find the error."""
+    array_type = array_lookup[array_type_chr]
+    data_type = array_type.big_endian_data_type
+    if array_body[array_type_chr].fullmatch(body) is None:
+        return None
+    body = body.replace(array_type_chr, "").rstrip(" \t\r\n")
+    if body.endswith(","):
+        body = body[:-1]
+    # the contents are validated so the numpy text parser can read them all at once
+    values = np.fromstring(body, dtype=np.int64, sep=",")
+    if values.size:
+        limits = np.iinfo(data_type)
+        if array_type_chr == "L":
+            # the numpy parser saturates numbers that do not fit in 64 bits
+            if values.min() == limits.min or values.max() == limits.max:
+                return None
+        elif values.min() < limits.min or values.max() > limits.max:
+            return None
+    return array_type(values.astype(data_type))
+
+
+class _SNBTSlot(TAG_String):
+    """Where a value is filled in by an :class:`SNBTTemplate`. The value of the string is the slot name."""
+
+
+def from_snbt(snbt: SNBTType, max_depth: int = MAX_DEPTH) -> AnyNBT:
+    """Parse SNBT. More than max_depth lists and compounds nested in each other raise an SNBTParseError."""
+    return _parse_snbt(snbt, max_depth, False)
+
+
+def _parse_snbt(snbt: SNBTType, max_depth: int, template: bool) -> AnyNBT:
+    """Parse SNBT. If template is true values written as $name are parsed as _SNBTSlot."""
 
-
-def from_snbt(snbt: SNBTType) -> AnyNBT:
     def strip_whitespace(index) -> int:
         match = whitespace.match(snbt, index)
         if match is None:
@@ -208,17 +695,14 @@ def from_snbt(snbt: SNBTType) -> AnyNBT:
             quote = snbt[index]
             strict_str = True
             index += 1
-            end_index = index
-            while not (  # keep running this until
-                snbt[end_index]
-                == quote  # the last character is a quote of the same type
-                and not (  # and there is an even number of backslashes before it (including 0)
-                    len(snbt[:end_index]) - len(snbt[:end_index].rstrip("\\"))
-                )
-            ):
-                end_index += 1
-
-            val = TAG_String.unescape(snbt[index:end_index])
+            # a single pass that steps over the character after each backslash
+            match = quoted_string[quote].match(snbt, index)
+            if match is None:
+                raise IndexError
+            end_index = match.end() - 1
+            val = snbt[index:end_index]
+            if "\\" in val:
+                val = TAG_String.unescape(val)
             index = end_index + 1
         else:
             strict_str = False
@@ -228,9 +712,16 @@ def from_snbt(snbt: SNBTType) -> AnyNBT:
 
         return val, strict_str, index
 
-    def parse_snbt_recursive(index=0) -> Tuple[AnyNBT, int]:
+    def check_depth(index, depth):
+        if depth > max_depth:
+            raise SNBTParseError(
+                f"SNBT is nested deeper than the maximum depth of {max_depth} at {index}"
+            )
+
+    def parse_snbt_recursive(index=0, depth=1) -> Tuple[AnyNBT, int]:
         index = strip_whitespace(index)
         if snbt[index] == "{":
+            check_depth(index, depth)
             data_: Dict[str, AnyNBT] = {}
             index += 1
             index = strip_whitespace(index)
@@ -242,7 +733,7 @@ def from_snbt(snbt: SNBTType) -> AnyNBT:
                 index = strip_colon(index)
 
                 # load the data and save it to the dictionary
-                nested_data, index = parse_snbt_recursive(index)
+                nested_data, index = parse_snbt_recursive(index, depth + 1)
                 data_[key] = nested_data
 
                 index = strip_comma(index, "}")
@@ -251,6 +742,7 @@ def from_snbt(snbt: SNBTType) -> AnyNBT:
             index += 1
 
         elif snbt[index] == "[":
+            start = index
             index += 1
             index = strip_whitespace(index)
             if snbt[index : index + 2] in {"B;", "I;", "L;"}:
@@ -261,53 +753,74 @@ def from_snbt(snbt: SNBTType) -> AnyNBT:
                 index += 2
                 index = strip_whitespace(index)
 
-                while snbt[index] != "]":
-                    match = int_numeric.match(snbt, index)
-                    if match is None:
-                        raise SNBTParseError(
-                            f"Expected an integer value or ] at {index} but got ->{snbt[index:index + 10]} instead"
-                        )
-                    else:
-                        val = match.group()
-                        if val[-1].isalpha():
-                            if val[-1] == array_type_chr:
-                                val = val[:-1]
-                            else:
-                                raise SNBTParseError(
-                                    f'Expected the datatype marker "{array_type_chr}" at {index} but got ->{snbt[index:index + 10]} instead'
-                                )
-                        array.append(int(val))
-                        index = match.end()
-
-                    index = strip_comma(index, "]")
-                data = array_type(
-                    np.asarray(array, dtype=array_type.big_endian_data_type)
+                end = snbt.find("]", index)
+                data = (
+                    None if end == -1 else parse_array(snbt[index:end], array_type_chr)
                 )
+                if data is not None:
+                    index = end
+                else:
+                    # parse one element at a time to report where it is invalid
+                    while snbt[index] != "]":
+                        match = int_numeric.match(snbt, index)
+                        if match is None:
+                            raise SNBTParseError(
+                                f"Expected an integer value or ] at {index} but got ->{snbt[index:index + 10]} instead"
+                            )
+                        else:
+                            val = match.group()
+                            if val[-1].isalpha():
+                                if val[-1] == array_type_chr:
+                                    val = val[:-1]
+                                else:
+                                    raise SNBTParseError(
+                                        f'Expected the datatype marker "{array_type_chr}" at {index} but got ->{snbt[index:index + 10]} instead'
+                                    )
+                            array.append(int(val))
+                            index = match.end()
+
+                        index = strip_comma(index, "]")
+                    data = array_type(
+                        np.asarray(array, dtype=array_type.big_endian_data_type)
+                    )
             else:
                 # list
+                check_depth(start, depth)
                 array = []
                 first_data_type = None
                 while snbt[index] != "]":
-                    nested_data, index_ = parse_snbt_recursive(index)
-                    if first_data_type is None:
+                    nested_data, index_ = parse_snbt_recursive(index, depth + 1)
+                    if template and type(nested_data) is _SNBTSlot:
+                        # the type of a slot is checked when the template is filled in
+                        pass
+                    elif first_data_type is None:
                         first_data_type = nested_data.__class__
-                    if not isinstance(nested_data, first_data_type):
+                    elif not isinstance(nested_data, first_data_type):
                         raise SNBTParseError(
                             f"Expected type {first_data_type.__name__} but got {nested_data.__class__.__name__} at {index}"
                         )
-                    else:
-                        index = index_
+                    index = index_
                     array.append(nested_data)
                     index = strip_comma(index, "]")
 
-                if first_data_type is None:
+                if not array:
                     data = TAG_List()
                 else:
-                    data = TAG_List(array, list_data_type=first_data_type.tag_id)
+                    # the elements were checked above. Slots are checked when a template is filled in
+                    data = TAG_List.from_trusted(array, array[0].tag_id)
 
             # skip the ]
             index += 1
 
+        elif snbt[index] == "$" and template:
+            match = slot_name.match(snbt, index + 1)
+            if match is None:
+                raise SNBTParseError(
+                    f"Expected a slot name at {index + 1} but got ->{snbt[index + 1:index + 11]} instead"
+                )
+            data = _SNBTSlot(match.group())
+            index = match.end()
+
         else:
             val, strict_str, index = capture_string(index)
             if strict_str:
@@ -348,3 +861,127 @@ def from_snbt(snbt: SNBTType) -> AnyNBT:
         raise SNBTParseError(
             "SNBT string is incomplete. Reached the end of the string."
         )
+
+
+class _SNBTSplitter:
+    """Finds the top level values in SNBT text that arrives in pieces.
+    Values are containers, quoted strings or bare values that end at whitespace or the start of the next value.
+    Only the text of the value being read is kept."""
+
+    # the next character that changes the state
+    _container = re.compile(r"[\[\]{}\"']")
+    _quoted = {'"': re.compile(r'[\\"]'), "'": re.compile(r"[\\']")}
+    _bare_end = re.compile(r"[ \t\r\n{\[\"']")
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._started = False
+        self._bare = False
+        self._depth = 0
+        self._quote = ""
+        self._escaped = False
+
+    def feed(self, text: str) -> List[str]:
+        """The text of the values that end in the next piece of text."""
+        values = []
+        index = start = 0
+        while index < len(text):
+            if not self._started:
+                index = whitespace.match(text, index).end()
+                if index == len(text):
+                    break
+                self._started = True
+                start = index
+                c = text[index]
+                if c in "{[":
+                    self._depth = 1
+                elif c in "\"'":
+                    self._quote = c
+                else:
+                    self._bare = True
+                index += 1
+            elif self._escaped:
+                self._escaped = False
+                index += 1
+            elif self._quote:
+                match = self._quoted[self._quote].search(text, index)
+                if match is None:
+                    break
+                index = match.end()
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._quote = ""
+                    if not self._depth:
+                        values.append(self._finish(text[start:index]))
+            elif self._bare:
+                match = self._bare_end.search(text, index)
+                if match is None:
+                    break
+                # the character may start the next value
+                index = match.start()
+                values.append(self._finish(text[start:index]))
+            else:
+                match = self._container.search(text, index)
+                if match is None:
+                    break
+                index = match.end()
+                c = match.group()
+                if c in "{[":
+                    self._depth += 1
+                elif c in "}]":
+                    self._depth -= 1
+                    if not self._depth:
+                        values.append(self._finish(text[start:index]))
+                else:
+                    self._quote = c
+        if self._started:
+            self._parts.append(text[start:])
+        return values
+
+    def _finish(self, text: str) -> str:
+        self._parts.append(text)
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._started = self._bare = False
+        return text
+
+    def close(self) -> Optional[str]:
+        """The text of the value that is still being read at the end of the input or None."""
+        if self._started:
+            return self._finish("")
+        return None
+
+
+def from_snbt_stream(
+    fp: Union[TextIO, Iterable[str]],
+    callback: Optional[Callable[[AnyNBT], None]] = None,
+    max_depth: int = MAX_DEPTH,
+) -> Union[Iterator[AnyNBT], int]:
+    """Parse a series of SNBT values from a text file object or an iterable of strings.
+
+    Values can be one per line or written one after another. The text is read in pieces and only the
+    text of the value being parsed is kept in memory. If callback is given each value is passed to it
+    as soon as it has been parsed and the number of values is returned. Otherwise this returns an
+    iterator of the values. max_depth is passed to :func:`from_snbt`."""
+    values = _iter_snbt_stream(fp, max_depth)
+    if callback is None:
+        return values
+    count = 0
+    for value in values:
+        callback(value)
+        count += 1
+    return count
+
+
+def _iter_snbt_stream(
+    fp: Union[TextIO, Iterable[str]], max_depth: int
+) -> Iterator[AnyNBT]:
+    splitter = _SNBTSplitter()
+    chunks = iter(partial(fp.read, SNBT_CHUNK_SIZE), "") if hasattr(fp, "read") else fp
+    for text in chunks:
+        for snbt in splitter.feed(text):
+            yield from_snbt(snbt, max_depth)
+    snbt = splitter.close()
+    if snbt is not None:
+        yield from_snbt(snbt, max_depth)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence, Union
+from io import BytesIO
+from functools import lru_cache
+
+from .nbt_types import (
+    TAG_Int,
+    TAG_Double,
+    TAG_String,
+    TAG_List,
+    TAG_Compound,
+    BaseValueType,
+    AnyNBT,
+)
+from .nbt_types.value import TAG_Value
+from ._load import _parse_snbt, _SNBTSlot
+from .const import MAX_DEPTH
+
+
+class Template:
+    """Binary NBT that is encoded once and rendered many times with different values in a few slots.
+
+    slots are the paths of compound entries from the root. A path is a string of keys separated by dots
+    or a sequence of keys. Slot names are the paths as strings. Everything outside the slots is encoded
+    when the template is created so rendering only encodes the new slot values. NBT containers do not
+    store their size so no other bytes need to change."""
+
+    def __init__(
+        self,
+        tree: AnyNBT,
+        slots: Iterable[Union[str, Sequence[str]]] = (),
+        name: str = "",
+        little_endian: bool = False,
+    ):
+        paths = {}
+        for slot in slots:
+            keys = slot.split(".") if isinstance(slot, str) else list(slot)
+            if not keys:
+                raise ValueError("A template slot must not be empty")
+            node = paths
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+                if type(node) is not dict:
+                    raise ValueError("Template slots must not be inside other slots")
+            if keys[-1] in node:
+                raise ValueError("Template slots must not be inside other slots")
+            node[keys[-1]] = ".".join(keys)
+        self.little_endian = bool(little_endian)
+
+        chunks = []
+        found = []
+        buffer = BytesIO()
+        tree.write_tag_id(buffer)
+        tree.write_string(buffer, name, little_endian)
+        if paths:
+            if not isinstance(tree, TAG_Compound):
+                raise TypeError(
+                    f"Template slots must be in a TAG_Compound. Got {tree.__class__.__name__}"
+                )
+            buffer = self._encode(tree, paths, buffer, chunks, found)
+        else:
+            tree.write_value(buffer, little_endian)
+        chunks.append(buffer.getvalue())
+
+        self._chunks = tuple(chunks)
+        self.slots = tuple(slot[0] for slot in found)
+        self._types = tuple(slot[1] for slot in found)
+        self._defaults = tuple(slot[2] for slot in found)
+        self._index = {name: i for i, name in enumerate(self.slots)}
+        self._check_found(paths)
+
+    def _encode(
+        self,
+        tag: TAG_Compound,
+        paths: dict,
+        buffer: BytesIO,
+        chunks: List[bytes],
+        found: list,
+    ) -> BytesIO:
+        """Write the value of a compound with slots in it and return the buffer to continue writing to."""
+        for key, child in tag.value.items():
+            node = paths.get(key)
+            child.write_tag_id(buffer)
+            child.write_string(buffer, key, self.little_endian)
+            if type(node) is str:
+                chunks.append(buffer.getvalue())
+                buffer = BytesIO()
+                default = BytesIO()
+                child.write_value(default, self.little_endian)
+                found.append((node, type(child), default.getvalue()))
+            elif node is not None:
+                if not isinstance(child, TAG_Compound):
+                    raise TypeError(
+                        f"Template slot path goes through a {child.__class__.__name__} at {key}"
+                    )
+                buffer = self._encode(child, node, buffer, chunks, found)
+            else:
+                child.write_value(buffer, self.little_endian)
+        buffer.write(b"\x00")
+        return buffer
+
+    def _check_found(self, paths: dict):
+        for node in paths.values():
+            if type(node) is dict:
+                self._check_found(node)
+            elif node not in self._index:
+                raise KeyError(f"Template slot {node} is not in the tree")
+
+    def render(self, values: Dict[str, object] = None, **kwargs) -> bytes:
+        """The binary NBT of the tree with new values in some of the slots.
+        Values are given by slot name either in values or as keyword arguments. A value is a tag of the
+        same type as the one in the tree or anything that type accepts. Other slots keep the value from
+        the tree. The result is the same as saving the modified tree uncompressed."""
+        if values is not None:
+            kwargs.update(values)
+        for name in kwargs:
+            if name not in self._index:
+                raise KeyError(f"Unknown template slot {name}")
+        buffer = BytesIO()
+        for i, name in enumerate(self.slots):
+            buffer.write(self._chunks[i])
+            if name not in kwargs:
+                buffer.write(self._defaults[i])
+                continue
+            value = kwargs[name]
+            cls = self._types[i]
+            if not isinstance(value, BaseValueType):
+                value = cls(value)
+            elif value.tag_id != cls.tag_id:
+                raise TypeError(
+                    f"Expected {cls.__name__} for template slot {name} but got {value.__class__.__name__}"
+                )
+            value.write_value(buffer, self.little_endian)
+        buffer.write(self._chunks[-1])
+        return buffer.getvalue()
+
+
+# the kinds of node in a compiled SNBT template
+_NODE_CONSTANT = 0  # (kind, tag) a subtree without slots
+_NODE_SLOT = 1  # (kind, name)
+_NODE_COMPOUND = 2  # (kind, keys, nodes)
+_NODE_LIST = 3  # (kind, nodes)
+
+
+class SNBTTemplate:
+    """SNBT with $name slots that is parsed once and filled in many times. Create one with :func:`compile_snbt`.
+
+    Calling the template with the slot values returns a new tree. A value is a tag or an int, float or str
+    which become a TAG_Int, TAG_Double or TAG_String like the same number or text written without a suffix
+    in SNBT."""
+
+    def __init__(self, snbt: str):
+        slots = []
+        self._root = self._compile(_parse_snbt(snbt, MAX_DEPTH, True), slots)
+        self.slots = tuple(dict.fromkeys(slots))
+        self._names = frozenset(self.slots)
+
+    def _compile(self, tag: AnyNBT, slots: List[str]) -> tuple:
+        """The node that builds tag. Only the lists and compounds that contain slots are rebuilt.
+        The parser limits the depth of the tree so this recursion is bounded."""
+        if type(tag) is _SNBTSlot:
+            slots.append(tag.value)
+            return _NODE_SLOT, tag.value
+        elif isinstance(tag, TAG_Compound):
+            keys = tuple(tag.value)
+            nodes = tuple(self._compile(tag[key], slots) for key in keys)
+            if any(node[0] != _NODE_CONSTANT for node in nodes):
+                return _NODE_COMPOUND, keys, nodes
+        elif isinstance(tag, TAG_List):
+            nodes = tuple(self._compile(item, slots) for item in tag)
+            if any(node[0] != _NODE_CONSTANT for node in nodes):
+                return _NODE_LIST, nodes
+        return _NODE_CONSTANT, tag
+
+    def _build(self, node: tuple, values: Dict[str, AnyNBT]) -> AnyNBT:
+        kind = node[0]
+        if kind == _NODE_CONSTANT:
+            return node[1].deepcopy()
+        elif kind == _NODE_SLOT:
+            return values[node[1]].deepcopy()
+        elif kind == _NODE_COMPOUND:
+            return TAG_Compound(
+                {key: self._build(item, values) for key, item in zip(node[1], node[2])}
+            )
+        # TAG_List checks that the filled in slots have the same type as the other elements
+        return TAG_List([self._build(item, values) for item in node[1]])
+
+    def __call__(self, values: Dict[str, object] = None, **kwargs) -> AnyNBT:
+        """A new tree with values in the slots.
+        Values are given by slot name either in values or as keyword arguments. Every slot needs a value."""
+        if values is not None:
+            kwargs.update(values)
+        for name, value in kwargs.items():
+            if name not in self._names:
+                raise KeyError(f"Unknown template slot {name}")
+            kwargs[name] = _slot_value(name, value)
+        for name in self.slots:
+            if name not in kwargs:
+                raise KeyError(f"No value for template slot {name}")
+        return self._build(self._root, kwargs)
+
+    def __repr__(self):
+        return f"SNBTTemplate(slots={self.slots})"
+
+
+def _slot_value(name: str, value: object) -> AnyNBT:
+    if isinstance(value, TAG_Value):
+        return value
+    elif isinstance(value, bool):
+        pass
+    elif isinstance(value, int):
+        return TAG_Int(value)
+    elif isinstance(value, float):
+        return TAG_Double(value)
+    elif isinstance(value, str):
+        return TAG_String(value)
+    raise TypeError(
+        f"Template slot {name} needs a tag, int, float or str. Got {value.__class__.__name__}"
+    )
+
+
+@lru_cache(maxsize=1024)
+def compile_snbt(snbt: str) -> SNBTTemplate:
+    """Parse SNBT with $name slots in place of values into a template that can be filled in many times.
+    For example compile_snbt('{id: "minecraft:zombie", Pos: [$x, $y, $z]}')(x=1.5, y=64.0, z=-3.5).
+    Templates are cached by their text so a repeated SNBT string is only parsed once even without slots."""
+    return SNBTTemplate(snbt)
@@ -9,4 +9,7 @@ TAG_END = 0
 TAG_BYTE = 1
 TAG_COMPOUND = 10
 
+# how many lists and compounds may be nested in each other by default
+MAX_DEPTH = 512
+
 NON_QUOTED_KEY = re.compile(r"^[a-zA-Z0-9-]+$")
@@ -10,5 +10,9 @@ class NBTFormatError(NBTLoadError):
     """Indicates the NBT format is invalid."""
 
 
+class NBTLimitError(NBTFormatError):
+    """Indicates the NBT is larger than a limit set when loading it."""
+
+
 class SNBTParseError(NBTError):
     """Indicates the SNBT format is invalid."""
@@ -8,6 +8,8 @@ from .string import TAG_String
 from .list import TAG_List
 from .compound import TAG_Compound
 from .nbtfile import NBTFile
+from .frozen import FrozenTag
+from .raw import RawTag
 
 AnyNBT = Union[
     TAG_Byte,
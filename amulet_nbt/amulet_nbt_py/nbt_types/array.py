@@ -6,6 +6,7 @@ import numpy as np
 from amulet_nbt.amulet_nbt_py.const import SNBTType
 from .int import TAG_Int
 from .value import TAG_Value
+from .frozen import FrozenTag
 from ..const import CommaSpace
 
 
@@ -68,6 +69,16 @@ class ArrayTag(TAG_Value):
         )
         return cls(value)
 
+    def freeze(self) -> FrozenTag:
+        return FrozenTag(self)
+
+    def _write_digest_value(self, buffer: BinaryIO, algorithm: str):
+        buffer.write(TAG_Int.tag_format_be.pack(len(self._value)))
+        buffer.write(np.asarray(self._value, self.big_endian_data_type).tobytes())
+
+    def _write_digest_child(self, buffer: BinaryIO, algorithm: str):
+        buffer.write(self.digest(algorithm))
+
     def write_value(self, buffer: BinaryIO, little_endian=False):
         data_type = (
             self.little_endian_data_type if little_endian else self.big_endian_data_type
@@ -264,7 +275,7 @@ class TAG_Byte_Array(ArrayTag):
     tag_id: ClassVar[int] = 7
 
     def _to_snbt(self) -> SNBTType:
-        return f"[B;{'B, '.join(str(val) for val in self._value)}B]"
+        return f"[B;{CommaSpace.join(f'{val}B' for val in self._value)}]"
 
 
 class TAG_Int_Array(ArrayTag):
@@ -282,7 +293,7 @@ class TAG_Long_Array(ArrayTag):
     tag_id: ClassVar[int] = 12
 
     def _to_snbt(self) -> SNBTType:
-        return f"[L;{CommaSpace.join(str(val) for val in self._value)}]"
+        return f"[L;{CommaSpace.join(f'{val}L' for val in self._value)}]"
 
 
 BaseArrayType = ArrayTag
@@ -10,16 +10,22 @@ from typing import (
     Optional,
     Iterator,
     Iterable,
+    List,
+    Type,
 )
+import numpy as np
 
 from amulet_nbt.amulet_nbt_py.const import SNBTType
 
 from .value import TAG_Value
+from .frozen import FrozenTag
+from .raw import RawTag
 from ..const import TAG_END, NON_QUOTED_KEY, CommaSpace, CommaNewline
 from . import class_map
 
 if TYPE_CHECKING:
     from . import AnyNBT
+    from .list import TAG_List
 
 NBTDictType = Dict[str, "AnyNBT"]
 
@@ -32,6 +38,14 @@ class TAG_Compound(TAG_Value):
     def __init__(self, value: Union[NBTDictType, TAG_Compound, None] = None):
         super().__init__(value)
 
+    @classmethod
+    def from_trusted(cls, value: NBTDictType) -> TAG_Compound:
+        """Create a TAG_Compound that owns value without validating it.
+        The caller must guarantee that every key is a str and every value an NBT object."""
+        tag = cls.__new__(cls)
+        tag._value = value
+        return tag
+
     def _sanitise_value(self, value: Optional[Any]) -> Any:
         if value is None:
             return self._data_type()
@@ -56,7 +70,10 @@ class TAG_Compound(TAG_Value):
 
     @property
     def value(self) -> NBTDictType:
-        """The raw data stored in the object."""
+        """The raw data stored in the object. Raw entries are decoded."""
+        raw = [key for key, tag in self._value.items() if isinstance(tag, RawTag)]
+        for key in raw:
+            self._value[key] = self._value[key].decode()
         return self._value
 
     @classmethod
@@ -69,32 +86,72 @@ class TAG_Compound(TAG_Value):
             value[tag_name] = child_tag
             tag_id = context.read(1)[0]
 
-        return cls(value)
+        return cls.from_trusted(value)
 
     def write_value(self, buffer: BinaryIO, little_endian=False):
         for key, value in self._value.items():
             value.write_payload(buffer, key, little_endian)
         buffer.write(bytes((TAG_END,)))
 
+    def freeze(self) -> FrozenTag:
+        return FrozenTag(self)
+
+    def _write_digest_value(self, buffer: BinaryIO, algorithm: str):
+        for key in sorted(self._value):
+            item = self._value[key]
+            self.write_string(buffer, key)
+            item.write_tag_id(buffer)
+            item._write_digest_child(buffer, algorithm)
+
+    def _write_digest_child(self, buffer: BinaryIO, algorithm: str):
+        buffer.write(self.digest(algorithm))
+
     def _to_snbt(self) -> SNBTType:
         tags = []
         for name, elem in self._value.items():
-            if NON_QUOTED_KEY.match(name) is None:
-                tags.append(f'"{name}": {elem.to_snbt()}')
+            if NON_QUOTED_KEY.fullmatch(name) is None:
+                tags.append(f'"{class_map.TAG_String.escape(name)}": {elem._to_snbt()}')
             else:
-                tags.append(f"{name}: {elem.to_snbt()}")
+                tags.append(f"{name}: {elem._to_snbt()}")
         return f"{{{CommaSpace.join(tags)}}}"
 
     def _pretty_to_snbt(self, indent_chr="", indent_count=0, leading_indent=True):
         if self._value:
             tags = (
-                f'{indent_chr * (indent_count + 1)}"{name}": {elem._pretty_to_snbt(indent_chr, indent_count + 1, False)}'
+                f'{indent_chr * (indent_count + 1)}"{class_map.TAG_String.escape(name)}": {elem._pretty_to_snbt(indent_chr, indent_count + 1, False)}'
                 for name, elem in self._value.items()
             )
             return f"{indent_chr * indent_count * leading_indent}{{\n{CommaNewline.join(tags)}\n{indent_chr * indent_count}}}"
         else:
             return f"{indent_chr * indent_count * leading_indent}{{}}"
 
+    def _iter_snbt(self, indent_chr: Optional[str], indent_count: int) -> Iterator[str]:
+        yield "{"
+        for index, (name, elem) in enumerate(self._value.items()):
+            if indent_chr is None:
+                if index:
+                    yield CommaSpace
+                if NON_QUOTED_KEY.fullmatch(name) is None:
+                    yield f'"{class_map.TAG_String.escape(name)}": '
+                else:
+                    yield f"{name}: "
+            else:
+                yield f'{"," * bool(index)}\n{indent_chr * (indent_count + 1)}"{class_map.TAG_String.escape(name)}": '
+            yield from elem._iter_snbt(indent_chr, indent_count + 1)
+        if indent_chr is not None and self._value:
+            yield f"\n{indent_chr * indent_count}"
+        yield "}"
+
+    def _equals(self, other: TAG_Value, strict: bool) -> bool:
+        if (
+            not isinstance(other, TAG_Compound)
+            or self._value.keys() != other._value.keys()
+        ):
+            return False
+        return all(
+            tag.equals(other._value[key], strict) for key, tag in self._value.items()
+        )
+
     def __contains__(self, item: str) -> bool:
         return self._value.__contains__(item)
 
@@ -102,7 +159,22 @@ class TAG_Compound(TAG_Value):
         self._value.__delitem__(key)
 
     def __getitem__(self, key: str) -> AnyNBT:
-        return self._value.__getitem__(key)
+        tag = self._value.__getitem__(key)
+        if isinstance(tag, RawTag):
+            # raw entries are decoded the first time they are asked for
+            tag = self._value[key] = tag.decode()
+        return tag
+
+    def get(self, key: str, default=None) -> Optional[AnyNBT]:
+        if key in self._value:
+            return self[key]
+        return default
+
+    def get_raw(self, key: str, default=None) -> Optional[AnyNBT]:
+        """Get an entry without decoding it.
+        A :class:`RawTag` is returned for an entry loaded through raw_paths that has not been decoded yet.
+        Other entries are returned as by :meth:`get`."""
+        return self._value.get(key, default)
 
     def __iter__(self) -> Iterator[str]:
         return self._value.__iter__()
@@ -122,7 +194,108 @@ class TAG_Compound(TAG_Value):
 
     def setdefault(self, k: str, default: AnyNBT):
         self._check_entry(k, default)
-        return self._value.setdefault(k, default)
+        if k in self._value:
+            return self[k]
+        self._value[k] = default
+        return default
+
+    def pop(self, k: str, *default) -> AnyNBT:
+        tag = self._value.pop(k, *default)
+        if isinstance(tag, RawTag):
+            tag = tag.decode()
+        return tag
+
+    def popitem(self):
+        """Remove and return the first key and tag pair. Raises KeyError if the compound is empty."""
+        try:
+            key = next(iter(self._value))
+        except StopIteration:
+            raise KeyError("popitem(): TAG_Compound is empty") from None
+        return key, self.pop(key)
+
+    def values(self):
+        return self.value.values()
+
+    def items(self):
+        return self.value.items()
+
+    def _get_typed(self, key: str, tag_type: Type[TAG_Value], default):
+        tag = self._value.get(key)
+        if tag is None:
+            return default
+        if isinstance(tag, RawTag):
+            tag = self[key]
+        if not isinstance(tag, tag_type):
+            raise TypeError(
+                f'Expected {tag_type.__name__} for key "{key}" in TAG_Compound but got {tag.__class__.__name__}'
+            )
+        if isinstance(tag, (TAG_Compound, class_map.TAG_List)):
+            return tag
+        return tag.value
+
+    def _get_typed_many(self, keys: Iterable[str], tag_type: Type[TAG_Value], default):
+        return [self._get_typed(key, tag_type, default) for key in keys]
+
+    def get_byte(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, class_map.TAG_Byte, default)
+
+    def get_short(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, class_map.TAG_Short, default)
+
+    def get_int(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, class_map.TAG_Int, default)
+
+    def get_long(self, key: str, default=None) -> Optional[int]:
+        return self._get_typed(key, class_map.TAG_Long, default)
+
+    def get_float(self, key: str, default=None) -> Optional[float]:
+        return self._get_typed(key, class_map.TAG_Float, default)
+
+    def get_double(self, key: str, default=None) -> Optional[float]:
+        return self._get_typed(key, class_map.TAG_Double, default)
+
+    def get_str(self, key: str, default=None) -> Optional[str]:
+        return self._get_typed(key, class_map.TAG_String, default)
+
+    def get_byte_array(self, key: str, default=None) -> Optional[np.ndarray]:
+        return self._get_typed(key, class_map.TAG_Byte_Array, default)
+
+    def get_int_array(self, key: str, default=None) -> Optional[np.ndarray]:
+        return self._get_typed(key, class_map.TAG_Int_Array, default)
+
+    def get_long_array(self, key: str, default=None) -> Optional[np.ndarray]:
+        return self._get_typed(key, class_map.TAG_Long_Array, default)
+
+    def get_list(self, key: str, default=None) -> Optional[TAG_List]:
+        return self._get_typed(key, class_map.TAG_List, default)
+
+    def get_compound(self, key: str, default=None) -> Optional[TAG_Compound]:
+        return self._get_typed(key, TAG_Compound, default)
+
+    def get_bytes(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, class_map.TAG_Byte, default)
+
+    def get_shorts(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, class_map.TAG_Short, default)
+
+    def get_ints(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, class_map.TAG_Int, default)
+
+    def get_longs(self, keys: Iterable[str], default=None) -> List[Optional[int]]:
+        return self._get_typed_many(keys, class_map.TAG_Long, default)
+
+    def get_floats(self, keys: Iterable[str], default=None) -> List[Optional[float]]:
+        return self._get_typed_many(keys, class_map.TAG_Float, default)
+
+    def get_doubles(self, keys: Iterable[str], default=None) -> List[Optional[float]]:
+        return self._get_typed_many(keys, class_map.TAG_Double, default)
+
+    def get_strs(self, keys: Iterable[str], default=None) -> List[Optional[str]]:
+        return self._get_typed_many(keys, class_map.TAG_String, default)
+
+    def update_trusted(self, other: Union[NBTDictType, TAG_Compound]):
+        """Update the compound from a dictionary or TAG_Compound without validating the entries."""
+        self._value.update(self.get_primitive(other))
 
     def update(self, other: Union[NBTDictType, TAG_Compound]):
         other: NBTDictType = self.get_primitive(other)
@@ -2,12 +2,49 @@ from __future__ import annotations
 
 from struct import Struct
 from typing import ClassVar, Union
+import math
 import numpy as np
 
 from ..const import SNBTType
 from .numeric import NumericTAG
 
 
+def _positional(text: str) -> str:
+    """Rewrite a number given with an optional exponent in positional notation."""
+    mantissa, _, exponent = text.partition("e")
+    sign = "-" if mantissa.startswith("-") else ""
+    whole, _, fraction = mantissa.lstrip("-").partition(".")
+    digits = (whole + fraction).lstrip("0")
+    point = len(whole) + int(exponent or 0) - (len(whole + fraction) - len(digits))
+    digits = digits.rstrip("0")
+    if not digits:
+        return f"{sign}0.0"
+    elif point <= 0:
+        return f"{sign}0.{'0' * -point}{digits}"
+    elif point >= len(digits):
+        return f"{sign}{digits}{'0' * (point - len(digits))}.0"
+    return f"{sign}{digits[:point]}.{digits[point:]}"
+
+
+def format_float(value: float, single: bool) -> str:
+    """The shortest decimal that reads back as the same value without an exponent."""
+    if math.isinf(value):
+        return "-inf" if value < 0 else "inf"
+    elif math.isnan(value):
+        return "nan"
+    if single:
+        # the shortest precision that survives the parser's double to float conversion
+        low, high = 1, 9
+        while low < high:
+            precision = (low + high) // 2
+            if np.float32(float(f"{value:.{precision - 1}e}")) == np.float32(value):
+                high = precision
+            else:
+                low = precision + 1
+        return _positional(f"{value:.{low - 1}e}")
+    return _positional(repr(value))
+
+
 class BaseFloatTAG(NumericTAG):
     _value: np.floating
     _data_type: ClassVar = np.floating
@@ -24,7 +61,9 @@ class BaseFloatTAG(NumericTAG):
         return float(self._value)
 
     def _to_snbt(self) -> SNBTType:
-        return self.fstring.format(f"{self._value:.20f}".rstrip("0"))
+        return self.fstring.format(
+            format_float(float(self._value), self._data_type is np.float32)
+        )
 
 
 class TAG_Float(BaseFloatTAG):
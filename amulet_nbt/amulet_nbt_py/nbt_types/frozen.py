@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+import numpy as np
+
+from .value import TAG_Value
+
+if TYPE_CHECKING:
+    from . import AnyNBT
+
+
+def _structural_hash(tag: AnyNBT) -> int:
+    """A hash consistent with strict structural equality."""
+    tag = tag._decoded()
+    tag_id = tag.tag_id
+    if tag_id == 10:
+        # entries are combined so that the order does not matter
+        entries = 0
+        for key, item in tag._value.items():
+            entries ^= hash((key, _structural_hash(item)))
+        return hash((tag_id, len(tag._value), entries))
+    elif tag_id == 9:
+        # the type of an empty list does not take part in equality
+        return hash((tag_id, tuple(_structural_hash(item) for item in tag._value)))
+    elif tag_id in (7, 11, 12):
+        return hash(
+            (tag_id, np.asarray(tag._value, tag.big_endian_data_type).tobytes())
+        )
+    return hash((tag_id, tag.value))
+
+
+def _freeze_child(tag: AnyNBT):
+    if tag.tag_id in (7, 9, 10, 11, 12):
+        return FrozenTag._wrap(tag)
+    return tag
+
+
+class FrozenTag:
+    """An immutable container or array created by :meth:`freeze`.
+    Frozen tags are hashable and compare structurally so they can be used as dictionary keys.
+    Items of a frozen container are frozen. Use :meth:`thaw` to get a modifiable tag."""
+
+    __slots__ = ("_tag", "_hash")
+
+    def __init__(self, tag: AnyNBT):
+        if not isinstance(tag, TAG_Value) or tag.tag_id not in (7, 9, 10, 11, 12):
+            raise TypeError(
+                f"Only containers and arrays can be frozen. Got {tag.__class__.__name__}"
+            )
+        self._tag = tag.deepcopy()
+        self._hash = _structural_hash(self._tag)
+
+    @classmethod
+    def _wrap(cls, tag: AnyNBT) -> FrozenTag:
+        """Wrap a tag that nothing else can modify."""
+        frozen = cls.__new__(cls)
+        frozen._tag = tag
+        frozen._hash = _structural_hash(tag)
+        return frozen
+
+    @property
+    def tag_id(self) -> int:
+        return self._tag.tag_id
+
+    def thaw(self) -> AnyNBT:
+        """A modifiable copy of the frozen tag."""
+        return self._tag.deepcopy()
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenTag):
+            return NotImplemented
+        return self._hash == other._hash and self._tag.equals(other._tag)
+
+    def __len__(self) -> int:
+        return len(self._tag._value)
+
+    def __getitem__(self, item) -> Any:
+        value = self._tag._value[item]
+        if self._tag.tag_id == 9 and isinstance(item, slice):
+            return tuple(_freeze_child(tag) for tag in value)
+        elif isinstance(value, TAG_Value):
+            return _freeze_child(value)
+        elif isinstance(value, np.ndarray):
+            return value.copy()
+        return value
+
+    def __iter__(self):
+        if self._tag.tag_id == 10:
+            return iter(list(self._tag._value))
+        elif self._tag.tag_id == 9:
+            return (_freeze_child(tag) for tag in list(self._tag._value))
+        return iter(self._tag._value.copy())
+
+    def __contains__(self, item) -> bool:
+        return item in self._tag._value
+
+    def keys(self):
+        return self._tag._value.keys()
+
+    def to_snbt(self, indent_chr=None) -> str:
+        return self._tag.to_snbt(indent_chr)
+
+    def digest(self, algorithm="blake2b") -> bytes:
+        return self._tag.digest(algorithm)
+
+    def __repr__(self):
+        return f"FrozenTag({self._tag.to_snbt()})"
+
+    def __reduce__(self):
+        return FrozenTag, (self._tag,)
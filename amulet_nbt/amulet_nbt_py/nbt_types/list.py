@@ -18,12 +18,15 @@ import numpy as np
 from amulet_nbt.amulet_nbt_py.const import SNBTType
 
 from .value import TAG_Value
+from .frozen import FrozenTag
+from .raw import RawTag
 from . import class_map
 from ..const import TAG_BYTE, CommaSpace, CommaNewline
 from .int import TAG_Int
 
 if TYPE_CHECKING:
     from . import AnyNBT
+    from .compound import TAG_Compound
 
 NBTListType = List["AnyNBT"]
 
@@ -41,6 +44,17 @@ class TAG_List(TAG_Value):
         self.list_data_type = list_data_type
         super().__init__(value)
 
+    @classmethod
+    def from_trusted(
+        cls, value: NBTListType, list_data_type: int = TAG_BYTE
+    ) -> TAG_List:
+        """Create a TAG_List that owns value without validating it.
+        The caller must guarantee that every element is an NBT object of type list_data_type."""
+        tag = cls.__new__(cls)
+        tag._value = value
+        tag.list_data_type = list_data_type
+        return tag
+
     def _sanitise_value(self, value: Optional[Any]) -> Any:
         self._value = self._data_type()
         if value:
@@ -63,6 +77,8 @@ class TAG_List(TAG_Value):
             raise TypeError(
                 f"Invalid type {value.__class__.__name__} for TAG_List. Must be an NBT object."
             )
+        if isinstance(value, RawTag):
+            raise TypeError("A RawTag can only be stored in a TAG_Compound")
         if fix_if_empty and not self._value:
             self.list_data_type = value.tag_id
         if value.tag_id != self.list_data_type:
@@ -96,7 +112,7 @@ class TAG_List(TAG_Value):
             )
             value.append(child_tag)
 
-        return cls(value, list_data_type)
+        return cls.from_trusted(value, list_data_type)
 
     def write_value(self, buffer: BinaryIO, little_endian=False):
         buffer.write(bytes((self.list_data_type,)))
@@ -108,6 +124,18 @@ class TAG_List(TAG_Value):
         for item in self._value:
             item.write_value(buffer, little_endian)
 
+    def freeze(self) -> FrozenTag:
+        return FrozenTag(self)
+
+    def _write_digest_value(self, buffer: BinaryIO, algorithm: str):
+        buffer.write(bytes((self.list_data_type,)))
+        buffer.write(TAG_Int.tag_format_be.pack(len(self._value)))
+        for item in self._value:
+            item._write_digest_child(buffer, algorithm)
+
+    def _write_digest_child(self, buffer: BinaryIO, algorithm: str):
+        buffer.write(self.digest(algorithm))
+
     def _to_snbt(self) -> SNBTType:
         return f"[{CommaSpace.join(elem._to_snbt() for elem in self._value)}]"
 
@@ -117,6 +145,19 @@ class TAG_List(TAG_Value):
         else:
             return f"{indent_chr * indent_count * leading_indent}[]"
 
+    def _iter_snbt(self, indent_chr: Optional[str], indent_count: int) -> Iterator[str]:
+        yield "["
+        for index, elem in enumerate(self._value):
+            if indent_chr is None:
+                if index:
+                    yield CommaSpace
+            else:
+                yield f'{"," * bool(index)}\n{indent_chr * (indent_count + 1)}'
+            yield from elem._iter_snbt(indent_chr, indent_count + 1)
+        if indent_chr is not None and self._value:
+            yield f"\n{indent_chr * indent_count}"
+        yield "]"
+
     def __eq__(self, other):
         if (
             isinstance(other, TAG_List)
@@ -126,6 +167,13 @@ class TAG_List(TAG_Value):
             return False
         return self._value.__eq__(self.get_primitive(other))
 
+    def _equals(self, other: TAG_Value, strict: bool) -> bool:
+        if not isinstance(other, TAG_List) or len(self._value) != len(other._value):
+            return False
+        if strict and self._value and self.list_data_type != other.list_data_type:
+            return False
+        return all(a.equals(b, strict) for a, b in zip(self._value, other._value))
+
     def __add__(self, other):
         other = self.get_primitive(other)
         self._check_tag_iterable(other)
@@ -189,7 +237,13 @@ class TAG_List(TAG_Value):
 
     def __setitem__(self, item, value):
         if isinstance(item, slice):
-            self._check_tag_iterable(value)
+            value = list(value)
+            replaced = len(range(*item.indices(len(self._value))))
+            if value and replaced == len(self._value):
+                # the new tags replace every element so they may change the list type
+                self.list_data_type = TAG_List(value).list_data_type
+            else:
+                self._check_tag_iterable(value)
         else:
             self._check_tag(value)
         self._value.__setitem__(item, value)
@@ -210,3 +264,90 @@ class TAG_List(TAG_Value):
     def insert(self, index: int, value: AnyNBT):
         self._check_tag(value)
         self._value.insert(index, value)
+
+    def _check_type(self, tag_id: int):
+        if self.list_data_type != tag_id:
+            raise TypeError(
+                f"Expected a TAG_List of {class_map.TAG_CLASSES[tag_id].__name__} but it contains {class_map.TAG_CLASSES[self.list_data_type].__name__}"
+            )
+
+    @staticmethod
+    def _native_value(tag: TAG_Value):
+        if isinstance(tag, (TAG_List, class_map.TAG_Compound)):
+            return tag
+        return tag.value
+
+    def _get_typed(self, index: int, tag_id: int):
+        self._check_type(tag_id)
+        tag = self._value[index]
+        if not isinstance(tag, TAG_Value) or tag.tag_id != tag_id:
+            raise TypeError(
+                f"Invalid type {tag.__class__.__name__} at index {index} of TAG_List"
+            )
+        return self._native_value(tag)
+
+    def _get_typed_all(self, tag_id: int) -> list:
+        self._check_type(tag_id)
+        values = []
+        for tag in self._value:
+            if not isinstance(tag, TAG_Value) or tag.tag_id != tag_id:
+                raise TypeError(f"Invalid type {tag.__class__.__name__} in TAG_List")
+            values.append(self._native_value(tag))
+        return values
+
+    def get_byte(self, index: int) -> int:
+        return self._get_typed(index, class_map.TAG_Byte.tag_id)
+
+    def get_short(self, index: int) -> int:
+        return self._get_typed(index, class_map.TAG_Short.tag_id)
+
+    def get_int(self, index: int) -> int:
+        return self._get_typed(index, class_map.TAG_Int.tag_id)
+
+    def get_long(self, index: int) -> int:
+        return self._get_typed(index, class_map.TAG_Long.tag_id)
+
+    def get_float(self, index: int) -> float:
+        return self._get_typed(index, class_map.TAG_Float.tag_id)
+
+    def get_double(self, index: int) -> float:
+        return self._get_typed(index, class_map.TAG_Double.tag_id)
+
+    def get_str(self, index: int) -> str:
+        return self._get_typed(index, class_map.TAG_String.tag_id)
+
+    def get_byte_array(self, index: int) -> np.ndarray:
+        return self._get_typed(index, class_map.TAG_Byte_Array.tag_id)
+
+    def get_int_array(self, index: int) -> np.ndarray:
+        return self._get_typed(index, class_map.TAG_Int_Array.tag_id)
+
+    def get_long_array(self, index: int) -> np.ndarray:
+        return self._get_typed(index, class_map.TAG_Long_Array.tag_id)
+
+    def get_list(self, index: int) -> TAG_List:
+        return self._get_typed(index, TAG_List.tag_id)
+
+    def get_compound(self, index: int) -> TAG_Compound:
+        return self._get_typed(index, class_map.TAG_Compound.tag_id)
+
+    def get_bytes(self) -> List[int]:
+        return self._get_typed_all(class_map.TAG_Byte.tag_id)
+
+    def get_shorts(self) -> List[int]:
+        return self._get_typed_all(class_map.TAG_Short.tag_id)
+
+    def get_ints(self) -> List[int]:
+        return self._get_typed_all(class_map.TAG_Int.tag_id)
+
+    def get_longs(self) -> List[int]:
+        return self._get_typed_all(class_map.TAG_Long.tag_id)
+
+    def get_floats(self) -> List[float]:
+        return self._get_typed_all(class_map.TAG_Float.tag_id)
+
+    def get_doubles(self) -> List[float]:
+        return self._get_typed_all(class_map.TAG_Double.tag_id)
+
+    def get_strs(self) -> List[str]:
+        return self._get_typed_all(class_map.TAG_String.tag_id)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, overload, BinaryIO, Optional
+from typing import TYPE_CHECKING, overload, BinaryIO, Optional, Iterator, TextIO
 from io import BytesIO
 import gzip
 
@@ -46,12 +46,19 @@ class NBTFile:
     def to_snbt(self, indent_chr=None) -> SNBTType:
         return self._value.to_snbt(indent_chr)
 
+    def write_snbt(self, fp: TextIO, indent_chr=None):
+        self._value.write_snbt(fp, indent_chr)
+
+    def iter_snbt(self, indent_chr=None) -> Iterator[SNBTType]:
+        return self._value.iter_snbt(indent_chr)
+
     @overload
     def save_to(
         self,
         filepath_or_buffer: None = None,
         compressed: bool = True,
         little_endian: bool = False,
+        incremental: bool = False,
     ) -> bytes:
         """If filepath_or_buffer is None the raw bytes will be returned."""
         ...
@@ -62,6 +69,7 @@ class NBTFile:
         filepath_or_buffer: str = None,
         compressed: bool = True,
         little_endian: bool = False,
+        incremental: bool = False,
     ) -> bytes:
         """If filepath_or_buffer is a valid file path in string form the data will be written to that file."""
         ...
@@ -72,11 +80,18 @@ class NBTFile:
         filepath_or_buffer: BinaryIO = None,
         compressed: bool = True,
         little_endian: bool = False,
+        incremental: bool = False,
     ) -> bytes:
         """If filepath_or_buffer is a file like object the bytes will be written to it using `write`."""
         ...
 
-    def save_to(self, filepath_or_buffer=None, compressed=True, little_endian=False):
+    def save_to(
+        self,
+        filepath_or_buffer=None,
+        compressed=True,
+        little_endian=False,
+        incremental=False,
+    ):
         """Save the data in binary NBT format.
         If filepath_or_buffer is None the raw bytes will be returned.
         If filepath_or_buffer is a valid file path in string form the data will be written to that file.
@@ -85,6 +100,7 @@ class NBTFile:
         :param filepath_or_buffer: A path or `write`able object to write the data to. If None the bytes will be returned.
         :param compressed: Should the bytes be compressed with gzip.
         :param little_endian: Should the bytes be saved in little endian format.
+        :param incremental: The Cython implementation caches the binary value of every container and array and reuses it in the next incremental save unless it was modified. Here it has no effect.
         :return: If filepath_or_buffer is None the raw bytes will be returned. None otherwise
         """
         buffer = BytesIO()
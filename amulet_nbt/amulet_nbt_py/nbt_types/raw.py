@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, BinaryIO
+from io import BytesIO
+
+from amulet_nbt.amulet_nbt_py.const import SNBTType
+
+from .value import TAG_Value
+from . import class_map
+from ..errors import NBTFormatError
+
+if TYPE_CHECKING:
+    from . import AnyNBT
+
+
+class RawTag(TAG_Value):
+    """The encoded value of a tag that is kept as it was loaded.
+
+    :func:`load` creates these for the entries at raw_paths. Saving one in the byte order it was loaded
+    with writes the bytes back unchanged without decoding them. Anything that needs the content
+    decodes it once. A RawTag can only be stored in a TAG_Compound. Getting it from the compound
+    with any method other than get_raw replaces it with the decoded tag."""
+
+    def __init__(self, tag_id: int, payload: bytes, little_endian: bool = False):
+        if not 7 <= tag_id <= 12:
+            raise ValueError(f"A RawTag cannot hold a tag with id {tag_id}")
+        self._tag_id = tag_id
+        self.payload = bytes(payload)
+        self.little_endian = bool(little_endian)
+        self._tree = None
+
+    @property
+    def tag_id(self) -> int:
+        """The id of the encoded tag."""
+        return self._tag_id
+
+    @property
+    def value(self):
+        return self.decode().value
+
+    @classmethod
+    def load_from(cls, context: BinaryIO, little_endian: bool) -> RawTag:
+        raise NotImplementedError("RawTags are created by load with raw_paths")
+
+    def decode(self) -> AnyNBT:
+        """The decoded tag. Each call returns a new copy so modifying it does not change this tag."""
+        return self._decoded().deepcopy()
+
+    def _decoded(self) -> AnyNBT:
+        if self._tree is None:
+            context = BytesIO(self.payload)
+            tag = class_map.TAG_CLASSES[self._tag_id].load_from(
+                context, self.little_endian
+            )
+            if context.tell() != len(self.payload):
+                raise NBTFormatError(
+                    f"RawTag payload has {len(self.payload) - context.tell()} bytes after the end of the tag"
+                )
+            self._tree = tag
+        return self._tree
+
+    def copy(self):
+        return self.decode()
+
+    def freeze(self):
+        return self._decoded().freeze()
+
+    def write_value(self, buffer: BinaryIO, little_endian=False):
+        if bool(little_endian) == self.little_endian:
+            buffer.write(self.payload)
+        else:
+            self._decoded().write_value(buffer, little_endian)
+
+    def _write_digest_value(self, buffer: BinaryIO, algorithm: str):
+        self._decoded()._write_digest_value(buffer, algorithm)
+
+    def _write_digest_child(self, buffer: BinaryIO, algorithm: str):
+        self._decoded()._write_digest_child(buffer, algorithm)
+
+    def _to_snbt(self) -> SNBTType:
+        return self._decoded()._to_snbt()
+
+    def _pretty_to_snbt(self, indent_chr="", indent_count=0, leading_indent=True):
+        return self._decoded()._pretty_to_snbt(indent_chr, indent_count, leading_indent)
+
+    def _iter_snbt(self, indent_chr, indent_count):
+        return self._decoded()._iter_snbt(indent_chr, indent_count)
+
+    def equals(self, other, strict=True) -> bool:
+        return self._decoded().equals(other, strict)
+
+    def __eq__(self, other):
+        if isinstance(other, TAG_Value):
+            other = other._decoded()
+        return self._decoded() == other
+
+    def __hash__(self):
+        return hash(self._decoded())
+
+    def __repr__(self):
+        return f"RawTag({class_map.TAG_CLASSES[self._tag_id].__name__}, {len(self.payload)} bytes)"
+
+    def __reduce__(self):
+        return RawTag, (self._tag_id, self.payload, self.little_endian)
+
+    def __deepcopy__(self, memo=None):
+        return self
+
+    def __copy__(self):
+        return self
@@ -8,15 +8,22 @@ from typing import (
     BinaryIO,
     Union,
     Optional,
+    Iterator,
+    TextIO,
 )
 from struct import Struct
 from copy import deepcopy, copy
+from io import BytesIO
+import hashlib
 
 from amulet_nbt.amulet_nbt_py.const import SNBTType
 
 if TYPE_CHECKING:
     from . import AnyNBT
 
+# the size of the pieces that iter_snbt joins its output into
+SNBT_CHUNK_SIZE = 65536
+
 _string_len_fmt_be = Struct(">H")
 _string_len_fmt_le = Struct("<H")
 
@@ -101,6 +108,30 @@ class TAG_Value(ABC):
         """Write the value to a file like object."""
         raise NotImplementedError
 
+    def freeze(self):
+        """An immutable and hashable version of this tag for use as a dictionary key or set member.
+        Numbers and strings are already immutable so they are returned as they are.
+        Containers and arrays return a :class:`FrozenTag` holding a copy of this tag."""
+        return self
+
+    def digest(self, algorithm="blake2b") -> bytes:
+        """A hash of the content of the tag that is the same across processes, platforms and file formats.
+        algorithm is any name accepted by hashlib.new.
+        The Cython implementation caches the digests of containers and arrays until they are modified."""
+        buffer = BytesIO()
+        self.write_tag_id(buffer)
+        self._write_digest_value(buffer, algorithm)
+        return hashlib.new(algorithm, buffer.getvalue()).digest()
+
+    def _write_digest_value(self, buffer: BinaryIO, algorithm: str):
+        """Write the value in the form that is hashed by digest."""
+        self.write_value(buffer)
+
+    def _write_digest_child(self, buffer: BinaryIO, algorithm: str):
+        """Write the value in the form that is hashed as part of a container.
+        Containers and arrays write their own digest."""
+        self._write_digest_value(buffer, algorithm)
+
     def to_snbt(self, indent_chr: Union[str, int, None] = None) -> SNBTType:
         """Return the NBT data in Stringified NBT format."""
         if isinstance(indent_chr, int):
@@ -109,6 +140,37 @@ class TAG_Value(ABC):
             return self._pretty_to_snbt(indent_chr)
         return self._to_snbt()
 
+    def write_snbt(self, fp: TextIO, indent_chr: Union[str, int, None] = None):
+        """Write the SNBT of the tag to a text file object a piece at a time.
+        The whole text is never held in memory. indent_chr works as in :meth:`to_snbt`."""
+        for chunk in self.iter_snbt(indent_chr):
+            fp.write(chunk)
+
+    def iter_snbt(self, indent_chr: Union[str, int, None] = None) -> Iterator[SNBTType]:
+        """Generate the SNBT of the tag in pieces that join to the output of :meth:`to_snbt`.
+        The tag must not be modified until the generator is exhausted."""
+        if isinstance(indent_chr, int):
+            indent_chr = " " * indent_chr
+        chunk = []
+        size = 0
+        for text in self._iter_snbt(indent_chr, 0):
+            chunk.append(text)
+            size += len(text)
+            if size >= SNBT_CHUNK_SIZE:
+                yield "".join(chunk)
+                chunk.clear()
+                size = 0
+        if chunk:
+            yield "".join(chunk)
+
+    def _iter_snbt(self, indent_chr: Optional[str], indent_count: int) -> Iterator[str]:
+        """Internal method to generate the SNBT without leading indentation.
+        indent_chr is None for compact output. Containers override this to generate their items."""
+        if indent_chr is None:
+            yield self._to_snbt()
+        else:
+            yield self._pretty_to_snbt(indent_chr, indent_count, False)
+
     @abstractmethod
     def _to_snbt(self) -> SNBTType:
         """Internal method to format the class data as SNBT."""
@@ -134,6 +196,23 @@ class TAG_Value(ABC):
     def __eq__(self, other):
         return self._value.__eq__(self.get_primitive(other))
 
+    def equals(self, other, strict=True) -> bool:
+        """Compare two tags structurally.
+        If strict is False numbers of different types and arrays of different types compare by value."""
+        if not isinstance(other, TAG_Value):
+            return False
+        other = other._decoded()
+        if strict and self.tag_id != other.tag_id:
+            return False
+        return self._equals(other, strict)
+
+    def _decoded(self) -> AnyNBT:
+        """The tag itself. A RawTag returns the tag it decodes to."""
+        return self
+
+    def _equals(self, other: TAG_Value, strict: bool) -> bool:
+        return self == other
+
     def strict_equals(self, other):
         """Extension of equals that also compares types."""
         return type(self) is type(other) and self == other
@@ -160,6 +239,15 @@ class TAG_Value(ABC):
         Else obj is returned."""
         return obj.value if isinstance(obj, TAG_Value) else obj
 
+    def deepcopy(self):
+        """A deep copy of the tag."""
+        return deepcopy(self)
+
+    def snapshot(self):
+        """A copy of the tag that is independent of this tag.
+        The Cython implementation shares structure between the two until either is modified."""
+        return deepcopy(self)
+
     def __deepcopy__(self, memo=None):
         return self.__class__(deepcopy(self._value, memo=memo))
 
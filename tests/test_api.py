@@ -1,5 +1,8 @@
 import unittest
 import numpy
+import pickle
+import gzip
+from io import BytesIO
 
 import amulet_nbt.amulet_nbt_py as pynbt
 
@@ -616,6 +619,767 @@ class AbstractNBTTest:
                             TypeError, lambda: tag_list.append(nbt_type2())
                         )
 
+        def test_list_methods(self):
+            tag_list = self.nbt.TAG_List()
+            tag_list.extend([self.nbt.TAG_Int(i) for i in range(4)])
+            tag_list += [self.nbt.TAG_Int(4)]
+            self.assertEqual(tag_list, [0, 1, 2, 3, 4])
+            self.assertEqual(tag_list.index(self.nbt.TAG_Int(3)), 3)
+            self.assertEqual(tag_list.count(self.nbt.TAG_Int(1)), 1)
+            self.assertEqual(list(reversed(tag_list)), [4, 3, 2, 1, 0])
+            self.assertEqual(tag_list.pop(), self.nbt.TAG_Int(4))
+            self.assertEqual(tag_list.pop(0), self.nbt.TAG_Int(0))
+            tag_list.remove(self.nbt.TAG_Int(2))
+            self.assertRaises(ValueError, lambda: tag_list.remove(self.nbt.TAG_Int(2)))
+            tag_list.reverse()
+            self.assertEqual(tag_list, [3, 1])
+
+            # a bad element anywhere in the input rejects the whole call
+            self.assertRaises(
+                TypeError,
+                lambda: tag_list.extend([self.nbt.TAG_Int(5), self.nbt.TAG_Short(6)]),
+            )
+            self.assertEqual(tag_list, [3, 1])
+
+            def set_slice():
+                tag_list[0:1] = [self.nbt.TAG_Int(5), self.nbt.TAG_String("6")]
+
+            self.assertRaises(TypeError, set_slice)
+            self.assertEqual(tag_list, [3, 1])
+            tag_list[0:1] = [self.nbt.TAG_Int(5), self.nbt.TAG_Int(6)]
+            self.assertEqual(tag_list, [5, 6, 1])
+
+            # replacing every element may change the list type
+            self.assertRaises(TypeError, set_slice)
+            tag_list[:] = (self.nbt.TAG_Byte(i) for i in range(2))
+            self.assertEqual(tag_list.list_data_type, self.nbt.TAG_Byte.tag_id)
+            self.assertEqual(tag_list, [0, 1])
+            tag_list[::-1] = [self.nbt.TAG_String("a"), self.nbt.TAG_String("b")]
+            self.assertEqual(tag_list.list_data_type, self.nbt.TAG_String.tag_id)
+
+            def set_all():
+                tag_list[:] = [self.nbt.TAG_Int(5), self.nbt.TAG_String("6")]
+
+            self.assertRaises(TypeError, set_all)
+            self.assertEqual(tag_list.list_data_type, self.nbt.TAG_String.tag_id)
+            self.assertEqual(len(tag_list), 2)
+
+        def test_from_trusted(self):
+            value = {"a": self.nbt.TAG_Int(1)}
+            compound = self.nbt.TAG_Compound.from_trusted(value)
+            self.assertIsInstance(compound, self.nbt.TAG_Compound)
+            self.assertIs(compound.value, value)
+            compound.update_trusted({"b": self.nbt.TAG_Int(2)})
+            compound.update_trusted(self.nbt.TAG_Compound({"c": self.nbt.TAG_Int(3)}))
+            self.assertEqual(compound, {"a": 1, "b": 2, "c": 3})
+
+            value = [self.nbt.TAG_Short(1), self.nbt.TAG_Short(2)]
+            tag_list = self.nbt.TAG_List.from_trusted(value, self.nbt.TAG_Short.tag_id)
+            self.assertIsInstance(tag_list, self.nbt.TAG_List)
+            self.assertIs(tag_list.value, value)
+            self.assertEqual(tag_list.list_data_type, self.nbt.TAG_Short.tag_id)
+            tag_list.append(self.nbt.TAG_Short(3))
+            self.assertRaises(TypeError, lambda: tag_list.append(self.nbt.TAG_Int(4)))
+
+        def test_equals(self):
+            for t in self._nbt_types:
+                self.assertTrue(t().equals(t()))
+            self.assertFalse(self.nbt.TAG_Int(1).equals(self.nbt.TAG_Byte(1)))
+            self.assertTrue(
+                self.nbt.TAG_Int(1).equals(self.nbt.TAG_Byte(1), strict=False)
+            )
+            self.assertFalse(
+                self.nbt.TAG_Int(1).equals(self.nbt.TAG_Int(2), strict=False)
+            )
+            self.assertFalse(self.nbt.TAG_Int(1).equals(1))
+            self.assertFalse(
+                self.nbt.TAG_String("1").equals(self.nbt.TAG_Int(1), strict=False)
+            )
+            self.assertTrue(
+                self.nbt.TAG_Int_Array([1, 2]).equals(self.nbt.TAG_Int_Array([1, 2]))
+            )
+            self.assertFalse(
+                self.nbt.TAG_Int_Array([1, 2]).equals(self.nbt.TAG_Int_Array([1, 3]))
+            )
+            self.assertFalse(
+                self.nbt.TAG_Int_Array([1, 2]).equals(self.nbt.TAG_Long_Array([1, 2]))
+            )
+            self.assertTrue(
+                self.nbt.TAG_Int_Array([1, 2]).equals(
+                    self.nbt.TAG_Long_Array([1, 2]), strict=False
+                )
+            )
+
+            def make(value):
+                return self.nbt.TAG_Compound(
+                    {
+                        "value": value,
+                        "string": self.nbt.TAG_String("a"),
+                        "list": self.nbt.TAG_List(
+                            [self.nbt.TAG_Compound({"value": value})]
+                        ),
+                    }
+                )
+
+            compound = make(self.nbt.TAG_Int(1))
+            loaded = self.nbt.load(self.nbt.NBTFile(compound).save_to()).value
+            self.assertTrue(compound.equals(loaded))
+            self.assertTrue(loaded.equals(compound))
+            self.assertTrue(loaded.equals(loaded.copy()))
+            self.assertFalse(loaded.equals(make(self.nbt.TAG_Int(2))))
+            self.assertFalse(loaded.equals(make(self.nbt.TAG_Short(1))))
+            self.assertTrue(loaded.equals(make(self.nbt.TAG_Short(1)), strict=False))
+            del compound["string"]
+            self.assertFalse(loaded.equals(compound))
+            self.assertFalse(compound.equals(loaded))
+
+            # deep trees are compared without native recursion
+            self.assertTrue(self._deep_tree(1) == self._deep_tree(1))
+            self.assertTrue(self._deep_tree(1).equals(self._deep_tree(1)))
+            self.assertFalse(self._deep_tree(1) == self._deep_tree(2))
+
+        def _deep_tree(self, value: int):
+            """Lists and compounds nested inside each other. The pure Python implementation recurses."""
+            depth = 100000 if self.nbt is cynbt else 200
+            root = leaf = self.nbt.TAG_Compound()
+            for i in range(1, depth + 1):
+                child = self.nbt.TAG_List() if i % 2 else self.nbt.TAG_Compound()
+                if isinstance(leaf, self.nbt.TAG_List):
+                    leaf.append(child)
+                else:
+                    leaf["a"] = child
+                leaf = child
+            leaf["value"] = self.nbt.TAG_Int(value)
+            return root
+
+        def test_digest(self):
+            def make():
+                return self.nbt.TAG_Compound(
+                    {
+                        "int": self.nbt.TAG_Int(1),
+                        "string": self.nbt.TAG_String("a"),
+                        "array": self.nbt.TAG_Long_Array([1, 2, 3]),
+                        "list": self.nbt.TAG_List(
+                            [self.nbt.TAG_Compound({"short": self.nbt.TAG_Short(2)})]
+                        ),
+                    }
+                )
+
+            compound = make()
+            digest = compound.digest()
+            self.assertIsInstance(digest, bytes)
+            self.assertEqual(digest, make().digest())
+            self.assertEqual(len(compound.digest("sha256")), 32)
+            # independent of the key order and the byte order of the source
+            self.assertEqual(
+                digest,
+                self.nbt.TAG_Compound(dict(reversed(make().items()))).digest(),
+            )
+            for little_endian in (False, True):
+                loaded = self.nbt.load(
+                    self.nbt.NBTFile(compound).save_to(little_endian=little_endian),
+                    little_endian=little_endian,
+                ).value
+                self.assertEqual(loaded.digest(), digest)
+            # the same as the other implementation
+            other = pynbt if self.nbt is not pynbt else cynbt
+            if other is not None:
+                self.assertEqual(other.from_snbt(compound.to_snbt()).digest(), digest)
+
+            # modifications are seen through the cache
+            compound["list"][0]["short"] = self.nbt.TAG_Short(3)
+            self.assertNotEqual(compound.digest(), digest)
+            compound["list"][0]["short"] = self.nbt.TAG_Short(2)
+            self.assertEqual(compound.digest(), digest)
+            compound["array"][0] = 5
+            self.assertNotEqual(compound.digest(), digest)
+            compound["array"].value[0] = 1
+            self.assertEqual(compound.digest(), digest)
+            array = compound["array"].value
+            self.assertEqual(compound.digest(), digest)
+            array[0] = 42
+            self.assertNotEqual(compound.digest(), digest)
+            array[0] = 1
+            self.assertEqual(compound.digest(), digest)
+            compound["list"].append(self.nbt.TAG_Compound())
+            self.assertNotEqual(compound.digest(), digest)
+            snapshot = make().snapshot()
+            snapshot["string"] = self.nbt.TAG_String("b")
+            self.assertNotEqual(snapshot.digest(), digest)
+
+            self.assertNotEqual(
+                self.nbt.TAG_Int(1).digest(), self.nbt.TAG_Byte(1).digest()
+            )
+            self.assertNotEqual(
+                self.nbt.TAG_List([self.nbt.TAG_Int(1)]).digest(),
+                self.nbt.TAG_Int_Array([1]).digest(),
+            )
+
+        def test_digest_deep(self):
+            tree = self._deep_tree(1)
+            digest = tree.digest()
+            self.assertEqual(self._deep_tree(1).digest(), digest)
+            self.assertNotEqual(self._deep_tree(2).digest(), digest)
+            self.assertEqual(tree.digest(), digest)
+
+        def test_freeze(self):
+            def block(name, **properties):
+                return self.nbt.TAG_Compound(
+                    {
+                        "Name": self.nbt.TAG_String(name),
+                        "Properties": self.nbt.TAG_Compound(
+                            {
+                                key: self.nbt.TAG_String(value)
+                                for key, value in properties.items()
+                            }
+                        ),
+                    }
+                )
+
+            stone = block("stone")
+            frozen = stone.freeze()
+            self.assertIsInstance(frozen, self.nbt.FrozenTag)
+            self.assertEqual(frozen.tag_id, self.nbt.TAG_Compound.tag_id)
+            self.assertIs(self.nbt.TAG_Int(1).freeze().__class__, self.nbt.TAG_Int)
+
+            palette = {frozen: 0, block("log", axis="y").freeze(): 1}
+            self.assertEqual(palette[block("stone").freeze()], 0)
+            self.assertEqual(palette[block("log", axis="y").freeze()], 1)
+            self.assertNotIn(block("log", axis="x").freeze(), palette)
+            loaded = self.nbt.load(
+                self.nbt.NBTFile(block("log", axis="y")).save_to()
+            ).value
+            self.assertIn(loaded.freeze(), palette)
+            # key order does not matter but types do
+            self.assertEqual(
+                self.nbt.TAG_Compound(
+                    {"a": self.nbt.TAG_Int(1), "b": self.nbt.TAG_Int(2)}
+                ).freeze(),
+                self.nbt.TAG_Compound(
+                    {"b": self.nbt.TAG_Int(2), "a": self.nbt.TAG_Int(1)}
+                ).freeze(),
+            )
+            self.assertNotEqual(
+                self.nbt.TAG_Compound({"a": self.nbt.TAG_Int(1)}).freeze(),
+                self.nbt.TAG_Compound({"a": self.nbt.TAG_Byte(1)}).freeze(),
+            )
+            self.assertEqual(
+                {
+                    self.nbt.TAG_Int_Array([1, 2]).freeze(),
+                    self.nbt.TAG_Int_Array([1, 2]).freeze(),
+                    self.nbt.TAG_List([self.nbt.TAG_Int(1)]).freeze(),
+                    self.nbt.TAG_List().freeze(),
+                },
+                {
+                    self.nbt.TAG_Int_Array([1, 2]).freeze(),
+                    self.nbt.TAG_List([self.nbt.TAG_Int(1)]).freeze(),
+                    self.nbt.TAG_List([], self.nbt.TAG_String.tag_id).freeze(),
+                },
+            )
+
+            # frozen tags are independent of the tag they came from
+            stone["Name"] = self.nbt.TAG_String("dirt")
+            self.assertEqual(frozen["Name"], self.nbt.TAG_String("stone"))
+            self.assertIsInstance(frozen["Properties"], self.nbt.FrozenTag)
+            self.assertEqual(list(frozen), ["Name", "Properties"])
+            self.assertEqual(len(frozen), 2)
+            self.assertIn("Name", frozen)
+
+            def f():
+                frozen["Name"] = stone
+
+            self.assertRaises(TypeError, f)
+
+            thawed = frozen.thaw()
+            self.assertIsInstance(thawed, self.nbt.TAG_Compound)
+            self.assertTrue(thawed.equals(block("stone")))
+            thawed["Properties"]["a"] = self.nbt.TAG_String("b")
+            self.assertEqual(len(frozen["Properties"]), 0)
+            self.assertEqual(frozen, pickle.loads(pickle.dumps(frozen)))
+
+        def test_freeze_held_child(self):
+            log = self.nbt.TAG_Compound(
+                {
+                    "Name": self.nbt.TAG_String("log"),
+                    "Properties": self.nbt.TAG_Compound(
+                        {"axis": self.nbt.TAG_String("y")}
+                    ),
+                    "Items": self.nbt.TAG_List([self.nbt.TAG_Compound()]),
+                }
+            )
+            loaded = self.nbt.load(self.nbt.NBTFile(log).save_to()).value
+            for block in (log, loaded):
+                # children referenced before freezing must not change the frozen tag
+                properties = block["Properties"]
+                item = block["Items"][0]
+                frozen = block.freeze()
+                frozen_hash = hash(frozen)
+                palette = {frozen: 0}
+                properties["axis"] = self.nbt.TAG_String("x")
+                item["Count"] = self.nbt.TAG_Byte(1)
+                self.assertEqual(frozen["Properties"]["axis"], self.nbt.TAG_String("y"))
+                self.assertEqual(len(frozen["Items"][0]), 0)
+                self.assertEqual(hash(frozen), frozen_hash)
+                self.assertIn(frozen, palette)
+                self.assertNotEqual(block.freeze(), frozen)
+                self.assertIs(block["Properties"], properties)
+
+        def test_freeze_deep(self):
+            frozen = self._deep_tree(1).freeze()
+            self.assertEqual(hash(frozen), hash(self._deep_tree(1).freeze()))
+            self.assertEqual(frozen, self._deep_tree(1).freeze())
+            self.assertNotEqual(frozen, self._deep_tree(2).freeze())
+            self.assertTrue(frozen.thaw().equals(self._deep_tree(1)))
+
+        def test_share_identical(self):
+            def item(count):
+                return self.nbt.TAG_Compound(
+                    {
+                        "id": self.nbt.TAG_String("minecraft:stone"),
+                        "Count": self.nbt.TAG_Byte(count),
+                        "tag": self.nbt.TAG_Compound({"Damage": self.nbt.TAG_Int(0)}),
+                        "data": self.nbt.TAG_Int_Array([1, 2]),
+                    }
+                )
+
+            root = self.nbt.TAG_Compound(
+                {"items": self.nbt.TAG_List([item(1), item(1), item(2)])}
+            )
+            for little_endian in (False, True):
+                data = self.nbt.NBTFile(root).save_to(little_endian=little_endian)
+                loaded = self.nbt.load(
+                    data, little_endian=little_endian, share_identical=True
+                ).value
+                self.assertTrue(loaded.equals(root))
+                items = loaded["items"]
+                if self.nbt is cynbt:
+                    self.assertIs(items[0]["id"], items[2]["id"])
+
+                # shared subtrees are still independent
+                items[0]["tag"]["Damage"] = self.nbt.TAG_Int(5)
+                items[0]["data"][0] = 10
+                self.assertEqual(items[1]["tag"]["Damage"], self.nbt.TAG_Int(0))
+                self.assertEqual(items[2]["tag"]["Damage"], self.nbt.TAG_Int(0))
+                self.assertEqual(items[1]["data"][0], 1)
+                reloaded = self.nbt.load(
+                    data, little_endian=little_endian, share_identical=True
+                ).value
+                self.assertTrue(reloaded.equals(root))
+
+            pool = self.nbt.InternPool(max_entries=2)
+            self.nbt.load(self.nbt.NBTFile(root).save_to(), share_identical=pool)
+            self.assertEqual(len(pool), 2)
+            pool.clear()
+            self.assertEqual(len(pool), 0)
+            pool = self.nbt.InternPool(max_size=0)
+            loaded = self.nbt.load(
+                self.nbt.NBTFile(root).save_to(), share_identical=pool
+            ).value
+            self.assertEqual(len(pool), 0)
+            self.assertTrue(loaded.equals(root))
+
+        def test_raw_paths(self):
+            root = self.nbt.TAG_Compound(
+                {
+                    "Level": self.nbt.TAG_Compound(
+                        {
+                            "Sections": self.nbt.TAG_List(
+                                [
+                                    self.nbt.TAG_Compound(
+                                        {
+                                            "Y": self.nbt.TAG_Byte(y),
+                                            "BlockStates": self.nbt.TAG_Long_Array(
+                                                [y] * 4
+                                            ),
+                                        }
+                                    )
+                                    for y in range(3)
+                                ]
+                            ),
+                            "Entities": self.nbt.TAG_List(
+                                [
+                                    self.nbt.TAG_Compound(
+                                        {"id": self.nbt.TAG_String("pig")}
+                                    )
+                                ]
+                            ),
+                            "x": self.nbt.TAG_Int(1),
+                        }
+                    )
+                }
+            )
+            paths = ["Level.Entities", ("Level", "Sections", "BlockStates"), "Level.x"]
+            for little_endian in (False, True):
+                data = self.nbt.NBTFile(root).save_to(
+                    compressed=False, little_endian=little_endian
+                )
+                loaded = self.nbt.load(
+                    data, little_endian=little_endian, raw_paths=paths
+                ).value
+                level = loaded.get_raw("Level")
+                entities = level.get_raw("Entities")
+                self.assertIsInstance(entities, self.nbt.RawTag)
+                self.assertEqual(entities.tag_id, self.nbt.TAG_List.tag_id)
+                self.assertIsInstance(
+                    level.get_raw("Sections")[2].get_raw("BlockStates"),
+                    self.nbt.RawTag,
+                )
+                # numbers are never raw
+                self.assertIsInstance(level.get_raw("x"), self.nbt.TAG_Int)
+                self.assertIsNone(level.get_raw("y"))
+
+                # raw entries are written back as they were loaded
+                self.assertEqual(
+                    self.nbt.NBTFile(loaded).save_to(
+                        compressed=False, little_endian=little_endian
+                    ),
+                    data,
+                )
+                self.assertEqual(
+                    self.nbt.NBTFile(loaded).save_to(
+                        compressed=False, little_endian=not little_endian
+                    ),
+                    self.nbt.NBTFile(root).save_to(
+                        compressed=False, little_endian=not little_endian
+                    ),
+                )
+                self.assertTrue(loaded.equals(root))
+                self.assertTrue(root.equals(loaded))
+                self.assertEqual(loaded.digest(), root.digest())
+                self.assertEqual(loaded.to_snbt(), root.to_snbt())
+                self.assertEqual(len(self.nbt.diff(root, loaded)), 0)
+                self.assertEqual(loaded.freeze(), root.freeze())
+
+                # decoding returns an independent tag
+                decoded = entities.decode()
+                decoded.append(self.nbt.TAG_Compound())
+                self.assertEqual(len(entities.decode()), 1)
+
+                # getting the entry by key replaces it with the decoded tag
+                level["Entities"].append(self.nbt.TAG_Compound())
+                self.assertIsInstance(level.value["Entities"], self.nbt.TAG_List)
+                self.assertEqual(len(level.get_list("Entities")), 2)
+                self.assertEqual(
+                    level["Sections"][1].get_long_array("BlockStates").tolist(),
+                    [1] * 4,
+                )
+
+            # every other accessor decodes raw entries
+            data = self.nbt.NBTFile(root).save_to(compressed=False)
+            for get in (
+                lambda level: level.pop("Entities"),
+                lambda level: level.setdefault("Entities", self.nbt.TAG_List()),
+                lambda level: dict(level.items())["Entities"],
+                lambda level: list(level.values())[1],
+                lambda level: level.value["Entities"],
+                lambda level: dict([level.popitem(), level.popitem()])["Entities"],
+            ):
+                level = self.nbt.load(data, raw_paths=["Level.Entities"])["Level"]
+                level.pop("x")
+                self.assertIsInstance(level.get_raw("Entities"), self.nbt.RawTag)
+                self.assertIsInstance(get(level), self.nbt.TAG_List)
+
+            # comparing against a dictionary compares the decoded entries
+            level = self.nbt.load(data, raw_paths=["Level.Entities"])["Level"]
+            self.assertEqual(level, dict(root["Level"].items()))
+
+            raw = self.nbt.RawTag(
+                self.nbt.TAG_Int_Array.tag_id, b"\x00\x00\x00\x01\x00\x00\x00\x05"
+            )
+            self.assertEqual(raw.value.tolist(), [5])
+            self.assertEqual(pickle.loads(pickle.dumps(raw)).payload, raw.payload)
+            self.assertRaises(ValueError, lambda: self.nbt.RawTag(1, b"\x00"))
+            self.assertRaises(TypeError, lambda: self.nbt.TAG_List([raw]))
+
+        def test_patch_inplace(self):
+            root = self.nbt.TAG_Compound(
+                {
+                    "Name": self.nbt.TAG_String("world"),
+                    "Data": self.nbt.TAG_Compound(
+                        {
+                            "Players": self.nbt.TAG_List(
+                                [
+                                    self.nbt.TAG_Compound(
+                                        {"Score": self.nbt.TAG_Int(i)}
+                                    )
+                                    for i in range(3)
+                                ]
+                            ),
+                            "Time": self.nbt.TAG_Long(100),
+                            "Heights": self.nbt.TAG_Int_Array([1, 2, 3]),
+                            "Weights": self.nbt.TAG_List(
+                                [self.nbt.TAG_Float(i) for i in range(3)]
+                            ),
+                        }
+                    ),
+                }
+            )
+            for little_endian in (False, True):
+                buffer = bytearray(
+                    self.nbt.NBTFile(root, "name").save_to(
+                        compressed=False, little_endian=little_endian
+                    )
+                )
+                expected = root.deepcopy()
+                for path, tag in (
+                    ("Data.Time", self.nbt.TAG_Long(2**40)),
+                    (("Data", "Players", "1", "Score"), self.nbt.TAG_Int(-5)),
+                    ("Data.Players.-1.Score", self.nbt.TAG_Int(7)),
+                    ("Data.Heights", self.nbt.TAG_Int_Array([4, 5, 6])),
+                    ("Data.Weights.2", self.nbt.TAG_Float(0.5)),
+                    ("Name", self.nbt.TAG_String("other")),
+                ):
+                    self.nbt.patch_inplace(buffer, path, tag, little_endian)
+                    self._set_path(expected, path, tag)
+                loaded = self.nbt.load(
+                    bytes(buffer), compressed=False, little_endian=little_endian
+                )
+                self.assertTrue(loaded.value.equals(expected))
+                self.assertEqual(
+                    loaded.value.get_compound("Data").get_long("Time"), 2**40
+                )
+
+                for path, tag, error in (
+                    ("Data.Time", self.nbt.TAG_Int(1), TypeError),
+                    ("Data.Heights", self.nbt.TAG_Int_Array([1]), ValueError),
+                    ("Name", self.nbt.TAG_String("a"), ValueError),
+                    ("Data.Missing", self.nbt.TAG_Int(1), KeyError),
+                    ("Data.Players.3.Score", self.nbt.TAG_Int(1), IndexError),
+                    ("Data.Time.x", self.nbt.TAG_Int(1), Exception),
+                ):
+                    self.assertRaises(
+                        error,
+                        lambda: self.nbt.patch_inplace(
+                            buffer, path, tag, little_endian
+                        ),
+                    )
+            self.assertRaises(
+                BufferError,
+                lambda: self.nbt.patch_inplace(
+                    bytes(buffer), "Data.Time", self.nbt.TAG_Long(1)
+                ),
+            )
+
+        def test_incremental_save(self):
+            root = self.nbt.TAG_Compound(
+                {
+                    "Entities": self.nbt.TAG_List(
+                        [
+                            self.nbt.TAG_Compound(
+                                {
+                                    "id": self.nbt.TAG_String("pig"),
+                                    "Pos": self.nbt.TAG_List(
+                                        [self.nbt.TAG_Double(i)] * 3
+                                    ),
+                                    "Health": self.nbt.TAG_Float(10),
+                                }
+                            )
+                            for i in range(4)
+                        ]
+                    ),
+                    "Heights": self.nbt.TAG_Int_Array([1, 2, 3]),
+                    "Time": self.nbt.TAG_Long(0),
+                }
+            )
+            nbt_file = self.nbt.NBTFile(root, "chunk")
+
+            def check(little_endian=False):
+                self.assertEqual(
+                    nbt_file.save_to(
+                        compressed=False, little_endian=little_endian, incremental=True
+                    ),
+                    nbt_file.save_to(compressed=False, little_endian=little_endian),
+                )
+
+            check()
+            check()
+            root["Time"] = self.nbt.TAG_Long(1)
+            check()
+            root["Entities"][2]["Health"] = self.nbt.TAG_Float(5)
+            check()
+            root["Entities"][1]["Pos"][0] = self.nbt.TAG_Double(-1)
+            check()
+            root["Heights"][1] = 20
+            check()
+            # arrays can be modified through their numpy array
+            heights = root["Heights"].value
+            check()
+            heights[0] = 42
+            check()
+            check(True)
+            heights[0] = 1
+            check(True)
+            root["Entities"].append(root["Entities"][0].deepcopy())
+            check()
+            check(True)
+            root.digest()
+            root["Entities"][4]["id"] = self.nbt.TAG_String("cow")
+            check(True)
+            check()
+            snapshot = root.snapshot()
+            snapshot["Entities"][0]["Pos"].pop()
+            check()
+            self.assertNotEqual(
+                self.nbt.NBTFile(snapshot).save_to(compressed=False, incremental=True),
+                nbt_file.save_to(compressed=False, incremental=True),
+            )
+
+        def test_incremental_save_deep(self):
+            root = self._deep_tree(1)
+            nbt_file = self.nbt.NBTFile(root)
+
+            def check():
+                self.assertEqual(
+                    nbt_file.save_to(compressed=False, incremental=True),
+                    nbt_file.save_to(compressed=False),
+                )
+
+            check()
+            check()
+            leaf = root
+            while "value" not in leaf:
+                leaf = leaf[0] if isinstance(leaf, self.nbt.TAG_List) else leaf["a"]
+            leaf["value"] = self.nbt.TAG_Int(2)
+            check()
+            root["b"] = self.nbt.TAG_Int(3)
+            check()
+
+        @staticmethod
+        def _set_path(tree, path, tag):
+            keys = path.split(".") if isinstance(path, str) else path
+            parent = tree
+            for key in keys[:-1]:
+                parent = parent[int(key)] if key.lstrip("-").isdigit() else parent[key]
+            key = keys[-1]
+            if key.lstrip("-").isdigit():
+                parent[int(key)] = tag
+            else:
+                parent[key] = tag
+
+        @staticmethod
+        def _nested_lists(count):
+            """Binary NBT of a root compound holding count lists nested in each other."""
+            return (
+                b"\x0a\x00\x00\x09\x00\x01a"
+                + b"\x09\x00\x00\x00\x01" * (count - 1)
+                + b"\x00\x00\x00\x00\x00\x00"
+            )
+
+        def test_max_depth(self):
+            data = self._nested_lists(599)
+            self.assertRaises(Exception, lambda: self.nbt.load(data, compressed=False))
+            self.assertRaises(
+                Exception,
+                lambda: self.nbt.load(data, compressed=False, max_depth=599),
+            )
+            nbt_file = self.nbt.load(data, compressed=False, max_depth=600)
+            self.assertEqual(nbt_file.save_to(compressed=False), data)
+            self.assertEqual(
+                self.nbt.load(self._nested_lists(511), compressed=False).save_to(
+                    compressed=False
+                ),
+                self._nested_lists(511),
+            )
+
+            # deep data is decoded without recursion
+            tag = self.nbt.load(
+                self._nested_lists(100_000), compressed=False, max_depth=100_001
+            )["a"]
+            depth = 1
+            while len(tag):
+                tag = tag[0]
+                depth += 1
+            self.assertEqual(depth, 100_000)
+
+            compound = self.nbt.TAG_Compound()
+            tag = compound
+            for i in range(300):
+                tag["a"] = self.nbt.TAG_Compound({"b": self.nbt.TAG_Int(i)})
+                tag = tag["a"]
+            data = self.nbt.NBTFile(compound).save_to(compressed=False)
+            self.assertRaises(
+                Exception,
+                lambda: self.nbt.load(data, compressed=False, max_depth=300),
+            )
+            self.assertEqual(
+                self.nbt.load(data, compressed=False, max_depth=301).save_to(
+                    compressed=False
+                ),
+                data,
+            )
+
+        def test_limits(self):
+            limits = self.nbt.Limits(
+                max_bytes=10_000,
+                max_decompressed=10_000,
+                max_nodes=100,
+                max_array_len=1000,
+            )
+            self.assertEqual(limits.max_depth, 512)
+            self.assertRaises(ValueError, lambda: self.nbt.Limits(max_nodes=-1))
+            self.assertEqual(repr(pickle.loads(pickle.dumps(limits))), repr(limits))
+
+            nbt_file = self.nbt.NBTFile(
+                self.nbt.TAG_Compound(
+                    {
+                        "list": self.nbt.TAG_List(
+                            [self.nbt.TAG_Int(i) for i in range(97)]
+                        ),
+                        "array": self.nbt.TAG_Long_Array([0] * 1000),
+                    }
+                )
+            )
+            data = nbt_file.save_to()
+            self.assertEqual(self.nbt.load(data, limits=limits), nbt_file)
+            raw = nbt_file.save_to(compressed=False)
+            self.assertEqual(
+                self.nbt.load(
+                    gzip.compress(raw[:20]) + gzip.compress(raw[20:]),
+                    limits=limits,
+                ),
+                nbt_file,
+            )
+            for kwargs in (
+                {"max_nodes": 99},
+                {"max_array_len": 999},
+                {"max_decompressed": 8000},
+                {"max_bytes": len(data) - 1},
+                {"max_depth": 1},
+            ):
+                with self.subTest(**kwargs):
+                    self.assertRaisesRegex(
+                        Exception,
+                        "maximum",
+                        lambda: self.nbt.load(data, limits=self.nbt.Limits(**kwargs)),
+                    )
+                    self.assertRaisesRegex(
+                        Exception,
+                        "maximum",
+                        lambda: self.nbt.load(
+                            BytesIO(data), limits=self.nbt.Limits(**kwargs)
+                        ),
+                    )
+
+            # a gzip bomb is rejected without decompressing all of it
+            bomb = gzip.compress(
+                b"\x0a\x00\x00\x07\x00\x01a\x7f\xff\xff\xff" + bytes(50_000_000)
+            )
+            self.assertRaisesRegex(
+                Exception, "maximum", lambda: self.nbt.load(bomb, limits=limits)
+            )
+            # counts are checked before anything is allocated for them
+            for header in (
+                b"\x0a\x00\x00\x0b\x00\x01a\x7f\xff\xff\xff",
+                b"\x0a\x00\x00\x09\x00\x01a\x0a\x7f\xff\xff\xff",
+            ):
+                self.assertRaisesRegex(
+                    Exception,
+                    "maximum",
+                    lambda: self.nbt.load(
+                        header + bytes(16), compressed=False, limits=limits
+                    ),
+                )
+
         def test_compound(self):
             self.assertEqual(self.nbt.TAG_Compound(), {})
             for t in self._nbt_types:
@@ -648,6 +1412,44 @@ class AbstractNBTTest:
 
                 self.assertRaises(TypeError, f)
 
+        def test_scalar_load(self):
+            values = (-(2**7), -129, -128, -1, 0, 1, 127, 1023, 1024, 2**7 - 1)
+            for nbt_type, extra in (
+                (self.nbt.TAG_Short, (-(2**15), 2**15 - 1)),
+                (self.nbt.TAG_Int, (-(2**31), 2**31 - 1)),
+                (self.nbt.TAG_Long, (-(2**63), 2**63 - 1)),
+            ):
+                compound = self.nbt.TAG_Compound(
+                    {str(v): nbt_type(v) for v in values + extra}
+                )
+                loaded = self.nbt.load(self.nbt.NBTFile(compound).save_to()).value
+                for v in values + extra:
+                    self.assertIsInstance(loaded[str(v)], nbt_type)
+                    self.assertEqual(loaded[str(v)].value, v)
+
+            compound = self.nbt.TAG_Compound(
+                {str(v): self.nbt.TAG_Byte(v) for v in range(-128, 128)}
+            )
+            loaded = self.nbt.load(self.nbt.NBTFile(compound).save_to()).value
+            for v in range(-128, 128):
+                self.assertIsInstance(loaded[str(v)], self.nbt.TAG_Byte)
+                self.assertEqual(loaded[str(v)].value, v)
+
+            # decoded values may be shared so re-initialising one must not change the others
+            for snbt, value in (
+                ("5b", 5),
+                ("-128b", -128),
+                ("5s", 5),
+                ("5", 5),
+                ("5L", 5),
+            ):
+                tag = self.nbt.from_snbt(snbt)
+                try:
+                    tag.__init__(7)
+                except TypeError:
+                    pass
+                self.assertEqual(self.nbt.from_snbt(snbt).value, value)
+
         def test_init(self):
             for inp in (
                 5,
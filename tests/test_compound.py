@@ -0,0 +1,115 @@
+import unittest
+
+try:
+    import amulet_nbt.amulet_cy_nbt as cynbt
+except (ImportError, ModuleNotFoundError) as e:
+    cynbt = None
+
+
+@unittest.skipUnless(cynbt, "Cythonized library not available")
+class CythonUnboxedCompoundTest(unittest.TestCase):
+    def setUp(self):
+        self.nbt = cynbt
+        self.compound = self.nbt.TAG_Compound(
+            {
+                "byte": self.nbt.TAG_Byte(1),
+                "short": self.nbt.TAG_Short(2),
+                "string": self.nbt.TAG_String("value"),
+                "int": self.nbt.TAG_Int(3),
+                "long": self.nbt.TAG_Long(4),
+                "float": self.nbt.TAG_Float(5.5),
+                "double": self.nbt.TAG_Double(6.5),
+                "list": self.nbt.TAG_List([self.nbt.TAG_Int(7)]),
+            }
+        )
+        self.data = self.nbt.NBTFile(self.compound).save_to(compressed=False)
+
+    def _load(self):
+        return self.nbt.load(self.data, compressed=False).value
+
+    def test_getitem(self):
+        loaded = self._load()
+        self.assertEqual(list(loaded), list(self.compound))
+        for key, tag in self.compound.value.items():
+            self.assertIsInstance(loaded[key], tag.__class__)
+            self.assertEqual(loaded[key], tag)
+        self.assertIs(loaded["float"], loaded["float"])
+        self.assertEqual(loaded, self.compound)
+
+    def test_value(self):
+        loaded = self._load()
+        value = loaded.value
+        self.assertIsInstance(value, dict)
+        for key, tag in value.items():
+            self.assertIsInstance(tag, self.compound[key].__class__)
+
+    def test_save(self):
+        loaded = self._load()
+        self.assertEqual(self.nbt.NBTFile(loaded).save_to(compressed=False), self.data)
+        loaded["int"] = self.nbt.TAG_Int(10)
+        del loaded["short"]
+        loaded["short"] = self.nbt.TAG_Short(20)
+        resaved = self.nbt.load(
+            self.nbt.NBTFile(loaded).save_to(compressed=False), compressed=False
+        ).value
+        self.assertEqual(resaved["int"], self.nbt.TAG_Int(10))
+        self.assertEqual(resaved["short"], self.nbt.TAG_Short(20))
+        self.assertEqual(list(resaved)[-1], "short")
+
+    def test_mapping_methods(self):
+        loaded = self._load()
+        self.assertIsInstance(loaded.keys(), type({}.keys()))
+        self.assertEqual(list(loaded.keys()), list(self.compound.keys()))
+        self.assertEqual(list(loaded.values()), list(self.compound.values()))
+        self.assertEqual(dict(loaded.items()), dict(self.compound.items()))
+        self.assertEqual(loaded.get("int"), self.nbt.TAG_Int(3))
+        self.assertIs(loaded.get("int"), loaded["int"])
+        self.assertIsNone(loaded.get("missing"))
+
+        self.assertEqual(loaded.pop("short"), self.nbt.TAG_Short(2))
+        self.assertNotIn("short", loaded)
+        self.assertIsNone(loaded.pop("short", None))
+        self.assertRaises(KeyError, lambda: loaded.pop("short"))
+
+        self.assertEqual(
+            loaded.setdefault("byte", self.nbt.TAG_Byte(9)), self.nbt.TAG_Byte(1)
+        )
+        self.assertEqual(
+            loaded.setdefault("new", self.nbt.TAG_Byte(9)), self.nbt.TAG_Byte(9)
+        )
+        self.assertRaises(TypeError, lambda: loaded.setdefault("bad", 5))
+
+        loaded.update({"a": self.nbt.TAG_Int(1)}, b=self.nbt.TAG_Int(2))
+        loaded.update([("c", self.nbt.TAG_Int(3))])
+        loaded.update(self.nbt.TAG_Compound({"d": self.nbt.TAG_Int(4)}))
+        self.assertEqual(loaded.get_ints(["a", "b", "c", "d"]), [1, 2, 3, 4])
+        self.assertRaises(TypeError, lambda: loaded.update({"e": 5}))
+        self.assertNotIn("e", loaded)
+
+        # the first entry is removed like the MutableMapping method
+        self.assertEqual(loaded.popitem(), ("byte", self.nbt.TAG_Byte(1)))
+        self.assertNotIn("byte", loaded)
+        self.assertNotEqual(loaded, self.compound)
+        loaded.clear()
+        self.assertEqual(len(loaded), 0)
+        self.assertEqual(loaded, self.nbt.TAG_Compound())
+        self.assertRaises(KeyError, loaded.popitem)
+
+    def test_typed_getters(self):
+        for compound in (self.compound, self._load()):
+            self.assertEqual(compound.get_byte("byte"), 1)
+            self.assertEqual(compound.get_short("short"), 2)
+            self.assertEqual(compound.get_int("int"), 3)
+            self.assertEqual(compound.get_long("long"), 4)
+            self.assertEqual(compound.get_float("float"), 5.5)
+            self.assertEqual(compound.get_double("double"), 6.5)
+            self.assertIsInstance(compound.get_int("int"), int)
+            self.assertIsInstance(compound.get_double("double"), float)
+            self.assertIsNone(compound.get_int("missing"))
+            self.assertEqual(compound.get_int("missing", 5), 5)
+            self.assertRaises(TypeError, lambda: compound.get_int("long"))
+            self.assertRaises(TypeError, lambda: compound.get_int("string"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -41,6 +41,136 @@ class AbstractNBTTest:
             self._test_copy(self.nbt.TAG_Long_Array([1, 2, 3]))
             self._test_copy(self.nbt.NBTFile())
 
+        def test_deepcopy(self):
+            tag = self.nbt.TAG_Compound(
+                {
+                    "int": self.nbt.TAG_Int(1),
+                    "string": self.nbt.TAG_String("value"),
+                    "array": self.nbt.TAG_Int_Array([1, 2, 3]),
+                    "list": self.nbt.TAG_List(
+                        [self.nbt.TAG_Compound({"int": self.nbt.TAG_Int(2)})]
+                    ),
+                    "scalars": self.nbt.TAG_List([self.nbt.TAG_Float(3)]),
+                }
+            )
+            for obj in (tag, self.nbt.load(self.nbt.NBTFile(tag).save_to()).value):
+                obj2 = obj.deepcopy()
+                self.assertIsInstance(obj2, self.nbt.TAG_Compound)
+                self.assertIsNot(obj, obj2)
+                self.assertEqual(obj, obj2)
+                self.assertIsNot(obj["array"].value, obj2["array"].value)
+                self.assertIsNot(obj["list"], obj2["list"])
+                self.assertIsNot(obj["list"][0], obj2["list"][0])
+                self.assertIsNot(obj["scalars"], obj2["scalars"])
+
+                obj2["int"] = self.nbt.TAG_Int(10)
+                obj2["array"][0] = 10
+                obj2["list"][0]["int"] = self.nbt.TAG_Int(20)
+                obj2["scalars"].append(self.nbt.TAG_Float(4))
+                self.assertEqual(obj, tag)
+                self.assertEqual(
+                    self.nbt.NBTFile(obj).save_to(), self.nbt.NBTFile(tag).save_to()
+                )
+
+        def test_deepcopy_deep(self):
+            # the pure Python implementation recurses
+            depth = 100000 if self.nbt is cynbt else 200
+            root = leaf = self.nbt.TAG_Compound()
+            for i in range(1, depth + 1):
+                child = self.nbt.TAG_List() if i % 2 else self.nbt.TAG_Compound()
+                if isinstance(leaf, self.nbt.TAG_List):
+                    leaf.append(child)
+                else:
+                    leaf["a"] = child
+                leaf = child
+            leaf["value"] = self.nbt.TAG_Int(1)
+            copied = root.deepcopy()
+            self.assertTrue(copied.equals(root))
+            leaf["value"] = self.nbt.TAG_Int(2)
+            self.assertFalse(copied.equals(root))
+
+        def test_snapshot(self):
+            def make():
+                return self.nbt.TAG_Compound(
+                    {
+                        "int": self.nbt.TAG_Int(1),
+                        "array": self.nbt.TAG_Long_Array([1, 2, 3]),
+                        "list": self.nbt.TAG_List(
+                            [
+                                self.nbt.TAG_Compound(
+                                    {
+                                        "int": self.nbt.TAG_Int(2),
+                                        "list": self.nbt.TAG_List(
+                                            [self.nbt.TAG_Int(3)]
+                                        ),
+                                    }
+                                )
+                            ]
+                        ),
+                    }
+                )
+
+            original = self.nbt.load(self.nbt.NBTFile(make()).save_to()).value
+            snapshot = original.snapshot()
+            self.assertIsNot(original, snapshot)
+            self.assertEqual(original, snapshot)
+
+            # modifications to either side must not be visible from the other
+            original["int"] = self.nbt.TAG_Int(10)
+            original["array"][0] = 10
+            original["list"][0]["list"].append(self.nbt.TAG_Int(10))
+            self.assertEqual(snapshot, make())
+
+            snapshot2 = snapshot.snapshot()
+            snapshot["list"][0]["int"] = self.nbt.TAG_Int(20)
+            snapshot["list"].append(self.nbt.TAG_Compound())
+            snapshot.get_long_array("array")[1] = 20
+            del snapshot["int"]
+            self.assertEqual(snapshot2, make())
+            self.assertEqual(original["list"][0]["int"], self.nbt.TAG_Int(2))
+            self.assertEqual(len(original["list"]), 1)
+            self.assertEqual(original["array"][1], 2)
+            self.assertEqual(original["int"], self.nbt.TAG_Int(10))
+            self.assertEqual(len(snapshot["list"]), 2)
+            self.assertEqual(snapshot["array"][1], 20)
+
+            # children held before the snapshot stay part of the original only
+            for tree in (
+                make(),
+                self.nbt.load(self.nbt.NBTFile(make()).save_to()).value,
+            ):
+                element = tree["list"][0]
+                inner = element["list"]
+                snapshot = tree.snapshot()
+                element["int"] = self.nbt.TAG_Int(30)
+                inner.append(self.nbt.TAG_Int(30))
+                self.assertEqual(snapshot, make())
+                self.assertIs(tree["list"][0], element)
+                self.assertIs(tree["list"][0]["list"], inner)
+                self.assertEqual(len(tree["list"][0]["list"]), 2)
+                snapshot["list"][0]["list"].append(self.nbt.TAG_Int(40))
+                self.assertEqual(len(inner), 2)
+
+            array = self.nbt.TAG_Int_Array([1, 2, 3])
+            array_snapshot = array.snapshot()
+            array.value[0] = 5
+            numpy.testing.assert_array_equal(array_snapshot, [1, 2, 3])
+
+            # arrays held before the snapshot stay part of the original only
+            array = self.nbt.TAG_Int_Array([1, 2, 3])
+            value = array.value
+            array_snapshot = array.snapshot()
+            value[0] = 5
+            numpy.testing.assert_array_equal(array_snapshot, [1, 2, 3])
+            numpy.testing.assert_array_equal(array, [5, 2, 3])
+
+            tree = self.nbt.TAG_Compound({"a": self.nbt.TAG_Int_Array([1, 2, 3])})
+            value = tree["a"].value
+            snapshot = tree.snapshot()
+            value[0] = 5
+            numpy.testing.assert_array_equal(snapshot["a"], [1, 2, 3])
+            numpy.testing.assert_array_equal(tree["a"], [5, 2, 3])
+
 
 @unittest.skipUnless(cynbt, "Cythonized library not available")
 class CythonCopyNBTTest(AbstractNBTTest.CopyNBTTests):
@@ -0,0 +1,173 @@
+import unittest
+import numpy
+import amulet_nbt.amulet_nbt_py as pynbt
+
+try:
+    import amulet_nbt.amulet_cy_nbt as cynbt
+except (ImportError, ModuleNotFoundError) as e:
+    cynbt = None
+
+
+class AbstractNBTTest:
+    class DiffTests(unittest.TestCase):
+        def _setUp(self, nbt_library):
+            self.nbt = nbt_library
+            self.tree = self.nbt.TAG_Compound(
+                {
+                    "int": self.nbt.TAG_Int(1),
+                    "string": self.nbt.TAG_String("value"),
+                    "removed": self.nbt.TAG_Byte(1),
+                    "list": self.nbt.TAG_List([self.nbt.TAG_Int(i) for i in range(6)]),
+                    "entities": self.nbt.TAG_List(
+                        [
+                            self.nbt.TAG_Compound({"id": self.nbt.TAG_String("a")}),
+                            self.nbt.TAG_Compound({"id": self.nbt.TAG_String("b")}),
+                        ]
+                    ),
+                    "array": self.nbt.TAG_Long_Array(numpy.arange(10)),
+                }
+            )
+
+        def _check(self, a, b):
+            ops = self.nbt.diff(a, b)
+            self.assertIsInstance(ops, self.nbt.TAG_List)
+            patched = self.nbt.patch(a.deepcopy(), ops)
+            self.assertTrue(patched.equals(b))
+            return ops
+
+        def test_equal(self):
+            self.assertEqual(len(self.nbt.diff(self.tree, self.tree.deepcopy())), 0)
+
+        def test_compound(self):
+            b = self.tree.deepcopy()
+            b["int"] = self.nbt.TAG_Int(2)
+            b["new"] = self.nbt.TAG_Short(3)
+            del b["removed"]
+            b["entities"][1]["id"] = self.nbt.TAG_String("c")
+            ops = self._check(self.tree, b)
+            self.assertEqual(
+                [(op.get_str("op"), op["path"].get_strs()) for op in ops],
+                [
+                    ("delete", ["removed"]),
+                    ("set", ["int"]),
+                    ("set", ["entities", "1", "id"]),
+                    ("set", ["new"]),
+                ],
+            )
+
+        def test_type_change(self):
+            b = self.tree.deepcopy()
+            b["int"] = self.nbt.TAG_Long(1)
+            ops = self._check(self.tree, b)
+            self.assertEqual(len(ops), 1)
+            self.assertIsInstance(ops[0]["value"], self.nbt.TAG_Long)
+            self._check(self.tree, self.nbt.TAG_String("root"))
+
+        def test_list(self):
+            b = self.tree.deepcopy()
+            b["list"].pop(1)
+            b["list"].insert(4, self.nbt.TAG_Int(10))
+            self._check(self.tree, b)
+            b["list"] = self.nbt.TAG_List([self.nbt.TAG_Int(0)])
+            self._check(self.tree, b)
+            b["list"] = self.nbt.TAG_List([self.nbt.TAG_Int(i) for i in range(10)])
+            self._check(self.tree, b)
+            b["list"] = self.nbt.TAG_List([self.nbt.TAG_String("a")])
+            self._check(self.tree, b)
+
+        def test_array(self):
+            b = self.tree.deepcopy()
+            b["array"] = self.nbt.TAG_Long_Array([0, 1, 2, 20, 21, 8, 9])
+            ops = self._check(self.tree, b)
+            self.assertEqual(len(ops), 1)
+            self.assertEqual(ops[0].get_int("start"), 3)
+            self.assertEqual(ops[0].get_int("stop"), 8)
+            numpy.testing.assert_array_equal(ops[0]["value"].value, [20, 21])
+            b["array"].value[5] = 50
+            self._check(self.tree, b)
+            b["array"] = self.nbt.TAG_Long_Array([])
+            self._check(self.tree, b)
+
+        def test_root_array(self):
+            a = self.nbt.TAG_Int_Array([1, 2, 3])
+            for b in (
+                self.nbt.TAG_Int_Array([1, 9, 3]),
+                self.nbt.TAG_Int_Array([1, 9, 9, 3]),
+                self.nbt.TAG_Int_Array([]),
+            ):
+                ops = self._check(a, b)
+                self.assertEqual(len(ops), 1)
+                self.assertEqual(ops[0].get_str("op"), "array")
+                self.assertEqual(len(ops[0]["path"]), 0)
+            numpy.testing.assert_array_equal(a, [1, 2, 3])
+
+        def test_serialise(self):
+            b = self.tree.deepcopy()
+            b["list"].pop(0)
+            b["array"].value[0] = 5
+            b["string"] = self.nbt.TAG_String("other")
+            ops = self.nbt.diff(self.tree, b)
+            data = self.nbt.NBTFile(self.nbt.TAG_Compound({"ops": ops})).save_to()
+            loaded = self.nbt.load(data).value["ops"]
+            self.assertTrue(self.nbt.patch(self.tree.deepcopy(), loaded).equals(b))
+
+        def test_independent(self):
+            b = self.tree.deepcopy()
+            b["new"] = self.nbt.TAG_List([self.nbt.TAG_Int(1)])
+            patched = self.nbt.patch(self.tree.deepcopy(), self.nbt.diff(self.tree, b))
+            patched["new"].append(self.nbt.TAG_Int(2))
+            self.assertEqual(len(b["new"]), 1)
+
+        def test_deep(self):
+            ops = self.nbt.diff(self._deep_tree(1), self._deep_tree(2))
+            self.assertEqual(len(ops), 1)
+            self.assertEqual(ops[0].get_int("value"), 2)
+            patched = self.nbt.patch(self._deep_tree(1), ops)
+            self.assertTrue(patched.equals(self._deep_tree(2)))
+            self.assertEqual(
+                len(self.nbt.diff(self._deep_tree(1), self._deep_tree(1))), 0
+            )
+
+        def _deep_tree(self, value: int):
+            """Lists and compounds nested inside each other. The pure Python implementation recurses."""
+            depth = 100000 if self.nbt is cynbt else 200
+            root = leaf = self.nbt.TAG_Compound()
+            for i in range(1, depth + 1):
+                child = self.nbt.TAG_List() if i % 2 else self.nbt.TAG_Compound()
+                if isinstance(leaf, self.nbt.TAG_List):
+                    leaf.append(child)
+                else:
+                    leaf["a"] = child
+                leaf = child
+            leaf["value"] = self.nbt.TAG_Int(value)
+            return root
+
+        def test_errors(self):
+            op = self.nbt.TAG_Compound(
+                {
+                    "op": self.nbt.TAG_String("unknown"),
+                    "path": self.nbt.TAG_List([self.nbt.TAG_String("int")]),
+                }
+            )
+            self.assertRaises(
+                Exception, lambda: self.nbt.patch(self.tree.deepcopy(), [op])
+            )
+            op["op"] = self.nbt.TAG_String("array")
+            self.assertRaises(
+                Exception, lambda: self.nbt.patch(self.tree.deepcopy(), [op])
+            )
+
+
+@unittest.skipUnless(cynbt, "Cythonized library not available")
+class CythonDiffTest(AbstractNBTTest.DiffTests):
+    def setUp(self):
+        self._setUp(cynbt)
+
+
+class PythonDiffTest(AbstractNBTTest.DiffTests):
+    def setUp(self):
+        self._setUp(pynbt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+import unittest
+from io import StringIO
+import amulet_nbt.amulet_nbt_py as pynbt
+
+try:
+    import amulet_nbt.amulet_cy_nbt as cynbt
+except (ImportError, ModuleNotFoundError) as e:
+    cynbt = None
+
+
+class AbstractNBTTest:
+    class SNBTTests(unittest.TestCase):
+        def _setUp(self, nbt_library):
+            self.nbt = nbt_library
+
+        def test_quoted_strings(self):
+            for snbt, value in (
+                ('""', ""),
+                ('"value"', "value"),
+                ("'value'", "value"),
+                ('"say \\"hi\\""', 'say "hi"'),
+                ('"back\\\\slash"', "back\\slash"),
+                ('"ends with \\\\"', "ends with \\"),
+                ('"\\\\\\""', '\\"'),
+                ('"it\'s"', "it's"),
+                ("'\"quoted\"'", '"quoted"'),
+                ('"line\nbreak"', "line\nbreak"),
+            ):
+                self.assertEqual(self.nbt.from_snbt(snbt), self.nbt.TAG_String(value))
+            compound = self.nbt.from_snbt('{"a\\"b": "c\\\\", d: "}"}')
+            self.assertEqual(compound['a"b'], self.nbt.TAG_String("c\\"))
+            self.assertEqual(compound["d"], self.nbt.TAG_String("}"))
+
+        def test_incomplete(self):
+            for snbt in ('"value', '"value\\"', "{a: 'b}"):
+                self.assertRaises(Exception, lambda: self.nbt.from_snbt(snbt))
+
+        def test_round_trip(self):
+            tag = self.nbt.TAG_Compound(
+                {
+                    "quote": self.nbt.TAG_String('"'),
+                    "backslash": self.nbt.TAG_String("\\"),
+                    "mixed": self.nbt.TAG_String('a\\"b\\\\"'),
+                }
+            )
+            self.assertEqual(self.nbt.from_snbt(tag.to_snbt()), tag)
+
+        def test_large(self):
+            # quoted strings used to be parsed in quadratic time
+            tag = self.nbt.TAG_List(
+                [self.nbt.TAG_String(f'value "{i}"\\') for i in range(50000)]
+            )
+            self.assertEqual(self.nbt.from_snbt(tag.to_snbt()), tag)
+
+        def test_arrays(self):
+            for snbt, cls, value in (
+                ("[B;]", self.nbt.TAG_Byte_Array, []),
+                ("[I; ]", self.nbt.TAG_Int_Array, []),
+                ("[B; 1B, -2B,3]", self.nbt.TAG_Byte_Array, [1, -2, 3]),
+                ("[B;127B,-128B,]", self.nbt.TAG_Byte_Array, [127, -128]),
+                ("[ I;\n\t1 ,\r\n-2, 3 ,\n]", self.nbt.TAG_Int_Array, [1, -2, 3]),
+                (
+                    "[I; 2147483647, -2147483648]",
+                    self.nbt.TAG_Int_Array,
+                    [2**31 - 1, -(2**31)],
+                ),
+                ("[L; 1L, -2, 003L]", self.nbt.TAG_Long_Array, [1, -2, 3]),
+                (
+                    "[L; 9223372036854775807L, -9223372036854775808L]",
+                    self.nbt.TAG_Long_Array,
+                    [2**63 - 1, -(2**63)],
+                ),
+            ):
+                with self.subTest(snbt):
+                    self.assertEqual(self.nbt.from_snbt(snbt), cls(value))
+            tag = self.nbt.TAG_Compound(
+                {
+                    "a": self.nbt.TAG_Long_Array(list(range(-50000, 50000, 7))),
+                    "b": self.nbt.TAG_List([self.nbt.TAG_Byte_Array([1, 2])]),
+                }
+            )
+            self.assertEqual(self.nbt.from_snbt(tag.to_snbt()), tag)
+
+        def test_array_errors(self):
+            for snbt, position in (
+                ("[I; 1, 2, x]", 10),
+                ("[I; 1, 2I]", 8),
+                ("[B; 1B, 2L]", 8),
+                ("[L; 1L 2L]", 7),
+                ("[B; 1B,, 2B]", 7),
+            ):
+                with self.subTest(snbt):
+                    with self.assertRaisesRegex(Exception, f" at {position} "):
+                        self.nbt.from_snbt(snbt)
+            self.assertRaises(Exception, lambda: self.nbt.from_snbt("[I; 1, 2"))
+            for snbt in ("[L; 9223372036854775808L]", "[L; -99999999999999999999]"):
+                with self.subTest(snbt):
+                    self.assertRaises(Exception, lambda: self.nbt.from_snbt(snbt))
+
+        def test_numbers(self):
+            for tag, snbt in (
+                (self.nbt.TAG_Byte(-5), "-5b"),
+                (self.nbt.TAG_Short(300), "300s"),
+                (self.nbt.TAG_Int(-(2**31)), "-2147483648"),
+                (self.nbt.TAG_Long(-(2**63)), "-9223372036854775808L"),
+                (self.nbt.TAG_Float(0.1), "0.1f"),
+                (self.nbt.TAG_Float(1), "1.0f"),
+                (self.nbt.TAG_Float(-0.0), "-0.0f"),
+                (self.nbt.TAG_Float(1e-5), "0.00001f"),
+                (self.nbt.TAG_Float(16777216), "16777216.0f"),
+                (self.nbt.TAG_Double(0.1), "0.1d"),
+                (self.nbt.TAG_Double(2.5e-7), "0.00000025d"),
+                (self.nbt.TAG_Double(1e20), "100000000000000000000.0d"),
+                (self.nbt.TAG_Double(float("inf")), "infd"),
+            ):
+                with self.subTest(snbt):
+                    self.assertEqual(tag.to_snbt(), snbt)
+            for value in (0.1, 1 / 3, 3.4028235e38, 1.4e-45, -123.456, 5e-324):
+                for cls in (self.nbt.TAG_Float, self.nbt.TAG_Double):
+                    tag = cls(value)
+                    self.assertEqual(self.nbt.from_snbt(tag.to_snbt()), tag)
+
+        def test_containers(self):
+            tag = self.nbt.TAG_Compound(
+                {
+                    "key": self.nbt.TAG_List(
+                        [self.nbt.TAG_Int_Array([1, -2]), self.nbt.TAG_Int_Array()]
+                    ),
+                    'say "hi"': self.nbt.TAG_Compound(),
+                    "long": self.nbt.TAG_Long_Array([3]),
+                    "list": self.nbt.TAG_List(),
+                }
+            )
+            self.assertEqual(
+                tag.to_snbt(),
+                '{key: [[I;1, -2], [I;]], "say \\"hi\\"": {}, long: [L;3L], list: []}',
+            )
+            self.assertEqual(
+                tag.to_snbt(2),
+                "{\n"
+                '  "key": [\n'
+                "    [I;1, -2],\n"
+                "    [I;]\n"
+                "  ],\n"
+                '  "say \\"hi\\"": {},\n'
+                '  "long": [L;3L],\n'
+                '  "list": []\n'
+                "}",
+            )
+            self.assertEqual(self.nbt.from_snbt(tag.to_snbt()), tag)
+            self.assertEqual(self.nbt.from_snbt(tag.to_snbt("\t")), tag)
+
+            # a trailing newline must be quoted
+            tag = self.nbt.TAG_Compound({"ZZ\n": self.nbt.TAG_Int(1)})
+            self.assertEqual(tag.to_snbt(), '{"ZZ\n": 1}')
+            self.assertEqual("".join(tag.iter_snbt()), '{"ZZ\n": 1}')
+            self.assertEqual(self.nbt.from_snbt(tag.to_snbt()), tag)
+
+        def test_iter_snbt(self):
+            tag = self.nbt.TAG_Compound(
+                {
+                    f"entry {i}": self.nbt.TAG_Compound(
+                        {
+                            "pos": self.nbt.TAG_List(
+                                [self.nbt.TAG_Double(i / 3), self.nbt.TAG_Double(-i)]
+                            ),
+                            "data": self.nbt.TAG_Long_Array(list(range(i % 50))),
+                            "name": self.nbt.TAG_String(f"name {i}"),
+                            "empty": self.nbt.TAG_List(),
+                        }
+                    )
+                    for i in range(2000)
+                }
+            )
+            for indent in (None, 4, "\t"):
+                with self.subTest(indent=indent):
+                    chunks = list(tag.iter_snbt(indent))
+                    self.assertGreater(len(chunks), 1)
+                    self.assertTrue(all(chunks))
+                    self.assertEqual("".join(chunks), tag.to_snbt(indent))
+                    fp = StringIO()
+                    self.nbt.NBTFile(tag).write_snbt(fp, indent)
+                    self.assertEqual(fp.getvalue(), tag.to_snbt(indent))
+            self.assertEqual(list(self.nbt.TAG_Int(5).iter_snbt()), ["5"])
+            self.assertEqual("".join(self.nbt.TAG_List().iter_snbt(2)), "[]")
+
+        def test_stream(self):
+            snbt = (
+                '{a: 1b}\n{b: "x}]y", c: [I; 1, 2]}["\\"[", \'{\']'
+                "'it\\'s' bare 5b\n\t[1.5d]{d: {e: []}}last"
+            )
+            expected = [
+                self.nbt.from_snbt("{a: 1b}"),
+                self.nbt.from_snbt('{b: "x}]y", c: [I; 1, 2]}'),
+                self.nbt.TAG_List(
+                    [self.nbt.TAG_String('"['), self.nbt.TAG_String("{")]
+                ),
+                self.nbt.from_snbt("'it\\'s'"),
+                self.nbt.TAG_String("bare"),
+                self.nbt.TAG_Byte(5),
+                self.nbt.TAG_List([self.nbt.TAG_Double(1.5)]),
+                self.nbt.from_snbt("{d: {e: []}}"),
+                self.nbt.TAG_String("last"),
+            ]
+            for size in range(1, len(snbt) + 1):
+                pieces = [snbt[i : i + size] for i in range(0, len(snbt), size)]
+                self.assertEqual(list(self.nbt.from_snbt_stream(pieces)), expected)
+            values = []
+            count = self.nbt.from_snbt_stream(StringIO(snbt), values.append)
+            self.assertEqual(count, len(expected))
+            self.assertEqual(values, expected)
+            self.assertEqual(list(self.nbt.from_snbt_stream(StringIO(" \n "))), [])
+            self.assertRaises(
+                Exception, lambda: list(self.nbt.from_snbt_stream(["{a: 1b}{b: "]))
+            )
+
+        def test_max_depth(self):
+            for snbt in ("[" * 600 + "]" * 600, "{a: " * 599 + "{}" + "}" * 599):
+                with self.subTest(snbt=snbt[:10]):
+                    self.assertRaises(Exception, lambda: self.nbt.from_snbt(snbt))
+                    self.assertRaises(
+                        Exception, lambda: self.nbt.from_snbt(snbt, max_depth=599)
+                    )
+                    self.nbt.from_snbt(snbt, max_depth=600)
+                    self.assertEqual(
+                        self.nbt.from_snbt_stream([snbt, snbt], lambda tag: None, 600),
+                        2,
+                    )
+                    self.assertRaises(
+                        Exception, lambda: list(self.nbt.from_snbt_stream([snbt]))
+                    )
+            self.assertEqual(
+                self.nbt.from_snbt("[[B; 1], [B;]]", max_depth=1),
+                self.nbt.from_snbt("[[B; 1], [B;]]"),
+            )
+            self.assertRaises(
+                Exception, lambda: self.nbt.from_snbt("[[B; 1], [B;]]", max_depth=0)
+            )
+
+        def test_templates(self):
+            template = self.nbt.compile_snbt(
+                '{id: "minecraft:zombie", Pos: [$x, 64.0d, $z], Health: $hp, Tags: ["$x"]}'
+            )
+            self.assertEqual(template.slots, ("x", "z", "hp"))
+            self.assertIs(
+                self.nbt.compile_snbt(
+                    '{id: "minecraft:zombie", Pos: [$x, 64.0d, $z], Health: $hp, Tags: ["$x"]}'
+                ),
+                template,
+            )
+            tag = template({"x": 1.5}, z=-3.5, hp=self.nbt.TAG_Float(20))
+            self.assertEqual(
+                tag,
+                self.nbt.from_snbt(
+                    '{id: "minecraft:zombie", Pos: [1.5d, 64.0d, -3.5d], Health: 20.0f, Tags: ["$x"]}'
+                ),
+            )
+            tag["Pos"].append(self.nbt.TAG_Double(0))
+            self.assertEqual(len(template(x=0.0, z=0.0, hp=1)["Pos"]), 3)
+            self.assertEqual(
+                template(x=0.0, z=0.0, hp="a")["Health"], self.nbt.TAG_String("a")
+            )
+
+            self.assertRaises(TypeError, lambda: template(x=1, z=0.0, hp=1))
+            self.assertRaises(TypeError, lambda: template(x=0.0, z=0.0, hp=None))
+            self.assertRaises(KeyError, lambda: template(x=0.0, z=0.0))
+            self.assertRaises(KeyError, lambda: template(x=0.0, z=0.0, hp=1, y=0.0))
+            self.assertRaises(Exception, lambda: self.nbt.compile_snbt("[$1]"))
+            self.assertRaises(Exception, lambda: self.nbt.from_snbt("[$x]"))
+
+            constant = self.nbt.compile_snbt("{a: [1b, 2b]}")
+            self.assertEqual(constant.slots, ())
+            constant()["a"].append(self.nbt.TAG_Byte(3))
+            self.assertEqual(constant(), self.nbt.from_snbt("{a: [1b, 2b]}"))
+
+
+@unittest.skipUnless(cynbt, "Cythonized library not available")
+class CythonSNBTTest(AbstractNBTTest.SNBTTests):
+    def setUp(self):
+        self._setUp(cynbt)
+
+
+class PythonSNBTTest(AbstractNBTTest.SNBTTests):
+    def setUp(self):
+        self._setUp(pynbt)
+
+
+if __name__ == "__main__":
+    unittest.main()
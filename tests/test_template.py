@@ -0,0 +1,99 @@
+import unittest
+import amulet_nbt.amulet_nbt_py as pynbt
+
+try:
+    import amulet_nbt.amulet_cy_nbt as cynbt
+except (ImportError, ModuleNotFoundError) as e:
+    cynbt = None
+
+
+class AbstractNBTTest:
+    class TemplateTests(unittest.TestCase):
+        def _setUp(self, nbt_library):
+            self.nbt = nbt_library
+            self.tree = self.nbt.TAG_Compound(
+                {
+                    "id": self.nbt.TAG_String("minecraft:pig"),
+                    "Pos": self.nbt.TAG_List([self.nbt.TAG_Double(0)] * 3),
+                    "Health": self.nbt.TAG_Float(10),
+                    "UUID": self.nbt.TAG_Int_Array([0, 0, 0, 0]),
+                    "Item": self.nbt.TAG_Compound(
+                        {
+                            "id": self.nbt.TAG_String("minecraft:stone"),
+                            "Count": self.nbt.TAG_Byte(1),
+                        }
+                    ),
+                }
+            )
+
+        def _save(self, tree, little_endian=False):
+            return self.nbt.NBTFile(tree, "entity").save_to(
+                compressed=False, little_endian=little_endian
+            )
+
+        def test_render(self):
+            for little_endian in (False, True):
+                template = self.nbt.Template(
+                    self.tree,
+                    ["Pos", "UUID", ("Item", "Count")],
+                    "entity",
+                    little_endian,
+                )
+                self.assertEqual(template.slots, ("Pos", "UUID", "Item.Count"))
+                self.assertEqual(
+                    template.render(), self._save(self.tree, little_endian)
+                )
+
+                pos = self.nbt.TAG_List([self.nbt.TAG_Double(i) for i in (1, 64, -3)])
+                expected = self.tree.deepcopy()
+                expected["Pos"] = pos
+                expected["UUID"] = self.nbt.TAG_Int_Array([1, 2, 3, 4, 5])
+                expected["Item"]["Count"] = self.nbt.TAG_Byte(64)
+                self.assertEqual(
+                    template.render({"Item.Count": 64}, Pos=pos, UUID=[1, 2, 3, 4, 5]),
+                    self._save(expected, little_endian),
+                )
+                self.assertTrue(
+                    self.nbt.load(
+                        template.render(Pos=pos),
+                        compressed=False,
+                        little_endian=little_endian,
+                    )
+                    .value["Pos"]
+                    .equals(pos)
+                )
+
+        def test_no_slots(self):
+            self.assertEqual(
+                self.nbt.Template(self.tree, name="entity").render(),
+                self._save(self.tree),
+            )
+
+        def test_errors(self):
+            template = self.nbt.Template(self.tree, ["Health"])
+            self.assertRaises(KeyError, lambda: template.render(Missing=1))
+            self.assertRaises(
+                TypeError, lambda: template.render(Health=self.nbt.TAG_Int(1))
+            )
+            for slots, error in (
+                (["Missing"], KeyError),
+                (["Pos.x"], TypeError),
+                (["Item", "Item.Count"], ValueError),
+                (["Item.Count", "Item"], ValueError),
+            ):
+                self.assertRaises(error, lambda: self.nbt.Template(self.tree, slots))
+
+
+@unittest.skipUnless(cynbt, "Cythonized library not available")
+class CythonTemplateTest(AbstractNBTTest.TemplateTests):
+    def setUp(self):
+        self._setUp(cynbt)
+
+
+class PythonTemplateTest(AbstractNBTTest.TemplateTests):
+    def setUp(self):
+        self._setUp(pynbt)
+
+
+if __name__ == "__main__":
+    unittest.main()
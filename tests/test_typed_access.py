@@ -0,0 +1,106 @@
+import unittest
+import numpy
+import amulet_nbt.amulet_nbt_py as pynbt
+
+try:
+    import amulet_nbt.amulet_cy_nbt as cynbt
+except (ImportError, ModuleNotFoundError) as e:
+    cynbt = None
+
+
+class AbstractNBTTest:
+    class TypedAccessTests(unittest.TestCase):
+        def _setUp(self, nbt_library):
+            self.nbt = nbt_library
+            self.compound = self.nbt.TAG_Compound(
+                {
+                    "byte": self.nbt.TAG_Byte(1),
+                    "short": self.nbt.TAG_Short(2),
+                    "int": self.nbt.TAG_Int(3),
+                    "int2": self.nbt.TAG_Int(4),
+                    "long": self.nbt.TAG_Long(5),
+                    "float": self.nbt.TAG_Float(6.5),
+                    "double": self.nbt.TAG_Double(7.5),
+                    "string": self.nbt.TAG_String("value"),
+                    "byte_array": self.nbt.TAG_Byte_Array([1, 2]),
+                    "int_array": self.nbt.TAG_Int_Array([3, 4]),
+                    "long_array": self.nbt.TAG_Long_Array([5, 6]),
+                    "list": self.nbt.TAG_List(
+                        [self.nbt.TAG_Double(1.0), self.nbt.TAG_Double(2.0)]
+                    ),
+                    "compound": self.nbt.TAG_Compound(),
+                }
+            )
+
+        def test_compound_getters(self):
+            c = self.compound
+            self.assertEqual(c.get_byte("byte"), 1)
+            self.assertEqual(c.get_short("short"), 2)
+            self.assertEqual(c.get_int("int"), 3)
+            self.assertEqual(c.get_long("long"), 5)
+            self.assertEqual(c.get_float("float"), 6.5)
+            self.assertEqual(c.get_double("double"), 7.5)
+            self.assertEqual(c.get_str("string"), "value")
+            self.assertIsInstance(c.get_int("int"), int)
+            self.assertIsInstance(c.get_float("float"), float)
+            self.assertIsInstance(c.get_str("string"), str)
+            numpy.testing.assert_array_equal(c.get_byte_array("byte_array"), [1, 2])
+            numpy.testing.assert_array_equal(c.get_int_array("int_array"), [3, 4])
+            numpy.testing.assert_array_equal(c.get_long_array("long_array"), [5, 6])
+            self.assertIsInstance(c.get_long_array("long_array"), numpy.ndarray)
+            self.assertIs(c.get_list("list"), c["list"])
+            self.assertIs(c.get_compound("compound"), c["compound"])
+
+        def test_compound_defaults(self):
+            self.assertIsNone(self.compound.get_int("missing"))
+            self.assertEqual(self.compound.get_int("missing", 10), 10)
+            self.assertEqual(self.compound.get_str("missing", "default"), "default")
+
+        def test_compound_type_errors(self):
+            c = self.compound
+            self.assertRaises(TypeError, lambda: c.get_int("long"))
+            self.assertRaises(TypeError, lambda: c.get_long("int"))
+            self.assertRaises(TypeError, lambda: c.get_double("float"))
+            self.assertRaises(TypeError, lambda: c.get_str("int"))
+            self.assertRaises(TypeError, lambda: c.get_long_array("int_array"))
+            self.assertRaises(TypeError, lambda: c.get_compound("list"))
+            self.assertRaises(TypeError, lambda: c.get_ints(["int", "long"]))
+
+        def test_compound_batch(self):
+            self.assertEqual(self.compound.get_ints(["int", "int2"]), [3, 4])
+            self.assertEqual(self.compound.get_ints(["int", "missing"], 0), [3, 0])
+            self.assertEqual(self.compound.get_strs(["string"]), ["value"])
+
+        def test_list_getters(self):
+            tag_list = self.compound["list"]
+            self.assertEqual(tag_list.get_double(0), 1.0)
+            self.assertEqual(tag_list.get_double(-1), 2.0)
+            self.assertEqual(tag_list.get_doubles(), [1.0, 2.0])
+            self.assertRaises(TypeError, lambda: tag_list.get_float(0))
+            self.assertRaises(TypeError, lambda: tag_list.get_floats())
+            self.assertRaises(IndexError, lambda: tag_list.get_double(2))
+
+            tag_list = self.nbt.TAG_List(
+                [self.nbt.TAG_String("a"), self.nbt.TAG_String("b")]
+            )
+            self.assertEqual(tag_list.get_str(1), "b")
+            self.assertEqual(tag_list.get_strs(), ["a", "b"])
+
+            compound = self.nbt.TAG_Compound()
+            tag_list = self.nbt.TAG_List([compound])
+            self.assertIs(tag_list.get_compound(0), compound)
+
+
+@unittest.skipUnless(cynbt, "Cythonized library not available")
+class CythonTypedAccessTest(AbstractNBTTest.TypedAccessTests):
+    def setUp(self):
+        self._setUp(cynbt)
+
+
+class PythonTypedAccessTest(AbstractNBTTest.TypedAccessTests):
+    def setUp(self):
+        self._setUp(pynbt)
+
+
+if __name__ == "__main__":
+    unittest.main()